@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import time
+
+from pymongo.errors import BulkWriteError
+
+from app.db.results import results_repository, to_document
+
+RESULT_WRITER_QUEUE_SIZE = int(os.getenv("RESULT_WRITER_QUEUE_SIZE", "1000"))
+RESULT_WRITER_BATCH_SIZE = int(os.getenv("RESULT_WRITER_BATCH_SIZE", "50"))
+RESULT_WRITER_FLUSH_INTERVAL = float(os.getenv("RESULT_WRITER_FLUSH_INTERVAL", "0.5"))
+RESULT_WRITER_MAX_RETRIES = int(os.getenv("RESULT_WRITER_MAX_RETRIES", "5"))
+# Results that still can't be saved after the retries, one JSON document per line
+RESULT_WRITER_DEAD_LETTER_FILE = os.getenv(
+    "RESULT_WRITER_DEAD_LETTER_FILE", "./data/unsaved_results.jsonl"
+)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class ResultWriter:
+    """
+    Persists Correction, Vocabulary, Breakdown and General results off the WebSocket hot path.
+    Documents are buffered in a bounded queue and flushed with insert_many once a batch
+    is full or the flush interval has passed. A full queue makes `enqueue` wait (backpressure).
+    Until `start` is called (e.g. tests without lifespan) documents are inserted directly.
+    `wait_for(result_id)` waits until a queued result has been flushed, for callers
+    that update it right after. Results that still fail after the retries are appended to
+    a dead-letter file instead of the logs, since they hold user text and profiles.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = RESULT_WRITER_QUEUE_SIZE,
+        batch_size: int = RESULT_WRITER_BATCH_SIZE,
+        flush_interval: float = RESULT_WRITER_FLUSH_INTERVAL,
+        max_retries: int = RESULT_WRITER_MAX_RETRIES,
+        dead_letter_file: str = RESULT_WRITER_DEAD_LETTER_FILE,
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.dead_letter_file = dead_letter_file
+        self._queue = None
+        self._task = None
+        self._current_batch = []
+        self._pending = {}  # result id -> Event set once its batch was flushed
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.flush_ms_total = 0.0
+        self.last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued, then stop."""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        batch = self._current_batch
+        self._current_batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        for i in range(0, len(batch), self.batch_size):
+            await self._flush(batch[i : i + self.batch_size])
+
+    async def enqueue(self, result):
+        if not self.running:
+            await results_repository.insert(result)
+            self.written += 1
+            return
+        document = to_document(result)
+        self._pending[str(document["_id"])] = asyncio.Event()
+        await self._queue.put(document)
+
+    async def wait_for(self, result_id: str):
+        """Wait until the result, if it is still queued, has been flushed."""
+        event = self._pending.get(result_id)
+        if event is not None:
+            await event.wait()
+
+    async def _run(self):
+        while True:
+            # Kept on self until written so stop() can flush it after cancelling
+            batch = self._current_batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+            self._current_batch = []
+
+    async def _flush(self, batch: list[dict]):
+        try:
+            await self._write(batch)
+        finally:
+            for document in batch:
+                event = self._pending.pop(str(document["_id"]), None)
+                if event is not None:
+                    event.set()
+
+    async def _write(self, batch: list[dict]):
+        start = time.perf_counter()
+        remaining = batch
+        for attempt in range(self.max_retries + 1):
+            try:
+                await results_repository.insert_many(remaining)
+                self.written += len(remaining)
+                remaining = []
+            except BulkWriteError as e:
+                # Unordered, so everything that didn't error was inserted
+                self.written += e.details.get("nInserted", 0)
+                error = e
+                if not e.details.get("writeConcernErrors"):
+                    # Duplicate keys were written by an earlier attempt, retry the rest
+                    remaining = [
+                        remaining[write_error["index"]]
+                        for write_error in e.details.get("writeErrors", [])
+                        if write_error.get("code") != DUPLICATE_KEY_ERROR
+                    ]
+                # Otherwise the inserts may not be durable, retry them all: the ones
+                # that were kept come back as duplicate keys and aren't counted twice
+            except Exception as e:
+                error = e
+            if not remaining:
+                break
+
+            if attempt == self.max_retries:
+                self.failed += len(remaining)
+                print(
+                    f"Could not save {len(remaining)} results after {attempt + 1} attempts, "
+                    f"kept in {self.dead_letter_file}: {error}"
+                )
+                self._dead_letter(remaining)
+                return
+            self.retries += 1
+            await asyncio.sleep(min(0.1 * 2**attempt, 5))
+
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        self.flush_ms_total += self.last_flush_ms
+        self.batches += 1
+
+    def _dead_letter(self, documents: list[dict]):
+        """Append unsaved results to the dead-letter file so they can be re-inserted later."""
+        try:
+            os.makedirs(os.path.dirname(self.dead_letter_file) or ".", exist_ok=True)
+            with open(self.dead_letter_file, "a") as f:
+                for document in documents:
+                    f.write(json.dumps(document, default=str) + "\n")
+        except OSError as e:
+            print(f"Could not write the dead-letter file {self.dead_letter_file}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queueDepth": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "failed": self.failed,
+            "retries": self.retries,
+            "batches": self.batches,
+            "lastFlushMs": round(self.last_flush_ms, 2),
+            "avgFlushMs": round(self.flush_ms_total / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+result_writer = ResultWriter()
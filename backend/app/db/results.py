@@ -0,0 +1,140 @@
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.db.mongodb import main_db
+from app.tracing import tracer
+
+# Keep only the latest follow-up questions of a result
+EXTRA_QUESTIONS_LIMIT = int(os.getenv("EXTRA_QUESTIONS_LIMIT", "100"))
+
+# History items leave out the long bodies (breakdown, answer, examples, ...)
+HISTORY_PROJECTION = {
+    "type": 1,
+    "userId": 1,
+    "input": 1,
+    "createdAt": 1,
+    "correctedText": 1,
+    "definition": 1,
+    "translated_vocabulary": 1,
+    "paraphrase": 1,
+}
+
+
+def to_document(result) -> dict:
+    result_dict = result.model_dump()
+    result_dict["_id"] = result_dict.pop("id")
+    return result_dict
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(item: dict) -> str:
+    payload = json.dumps([item["createdAt"].isoformat(), str(item["_id"])])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), ObjectId(id)
+    except (ValueError, TypeError, InvalidId) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+class ResultsRepository:
+    """
+    All reads and writes of the results collection.
+    """
+
+    @property
+    def collection(self):
+        return main_db.results
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("userId", 1), ("createdAt", -1), ("_id", -1)]
+        )
+        await self.collection.create_index(
+            [("userId", 1), ("type", 1), ("createdAt", -1), ("_id", -1)]
+        )
+
+    async def insert(self, result):
+        with tracer.span("mongo.results.insert_one", kind="mongo"):
+            await self.collection.insert_one(to_document(result))
+
+    async def insert_many(self, documents: list[dict]):
+        # Unordered so one bad document doesn't block the rest of the batch
+        with tracer.span(
+            "mongo.results.insert_many", kind="mongo", documents=len(documents)
+        ):
+            await self.collection.insert_many(documents, ordered=False)
+
+    async def exists(self, result_id: str) -> bool:
+        with tracer.span("mongo.results.find_one", kind="mongo"):
+            document = await self.collection.find_one(
+                {"_id": ObjectId(result_id)}, projection={"_id": 1}
+            )
+        return document is not None
+
+    async def append_extra_question(
+        self, result_id: str, question: str, answer: str
+    ) -> bool:
+        """
+        Append a follow-up question with a single atomic $push.
+        Returns False when the result doesn't exist.
+        """
+        with tracer.span("mongo.results.update_one", kind="mongo"):
+            update_result = await self.collection.update_one(
+                {"_id": ObjectId(result_id)},
+                {
+                    "$push": {
+                        "extraQuestions": {
+                            "$each": [{"question": question, "answer": answer}],
+                            "$slice": -EXTRA_QUESTIONS_LIMIT,
+                        }
+                    }
+                },
+            )
+        return update_result.matched_count > 0
+
+    async def list_history(
+        self,
+        user_id: str,
+        type: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        Newest first, keyset-paginated on (createdAt, _id).
+        Returns the page and the cursor of the next page (None on the last page).
+        """
+        query = {"userId": user_id}
+        if type:
+            query["type"] = type
+        if cursor:
+            created_at, id = decode_cursor(cursor)
+            query["$or"] = [
+                {"createdAt": {"$lt": created_at}},
+                {"createdAt": created_at, "_id": {"$lt": id}},
+            ]
+
+        with tracer.span("mongo.results.find", kind="mongo"):
+            items = (
+                await self.collection.find(query, HISTORY_PROJECTION)
+                .sort([("createdAt", -1), ("_id", -1)])
+                .limit(limit + 1)
+                .to_list(length=limit + 1)
+            )
+        next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+        return items[:limit], next_cursor
+
+
+results_repository = ResultsRepository()
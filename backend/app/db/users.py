@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.db.mongodb import main_db
+from app.tracing import tracer
+
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+
+def to_profile(user_id: str, user: dict) -> dict:
+    return {
+        "id": user_id,
+        "aboutMe": user.get("aboutMe", ""),
+        "englishLevel": user.get("englishLevel", ""),
+        "motherTongue": user.get("motherTongue", ""),
+    }
+
+
+class UserProfileService:
+    """
+    Bounded LRU + TTL cache of user profiles keyed by googleId.
+    Concurrent lookups of the same googleId share a single query.
+    Unknown users are not cached so a new sign-up is visible right away.
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_MAX_SIZE, ttl: float = USER_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._cache = OrderedDict()  # googleId -> (expires_at, profile)
+        self._inflight = {}  # googleId -> Future
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, google_id: str) -> Optional[dict]:
+        cached = self._cache.get(google_id)
+        if cached and cached[0] > time.monotonic():
+            self._cache.move_to_end(google_id)
+            self.hits += 1
+            return cached[1]
+
+        if google_id in self._inflight:
+            self.coalesced += 1
+            future = self._inflight[google_id]
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The caller that owned the lookup went away, run our own
+                return await self.get(google_id)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[google_id] = future
+        try:
+            with tracer.span("mongo.users.find_one", kind="mongo"):
+                user = await main_db.users.find_one({"googleId": google_id})
+            profile = to_profile(google_id, user) if user else None
+            if profile and self._inflight.get(google_id) is future:
+                self._put(google_id, profile)
+            future.set_result(profile)
+            return profile
+        except asyncio.CancelledError:
+            # Waiters retry on their own instead of hanging on this lookup
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved so a lookup without waiters doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(google_id) is future:
+                del self._inflight[google_id]
+
+    def _put(self, google_id: str, profile: dict):
+        self._cache[google_id] = (time.monotonic() + self.ttl, profile)
+        self._cache.move_to_end(google_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, google_id: str):
+        self._cache.pop(google_id, None)
+        # A lookup started before the update must not repopulate the cache
+        self._inflight.pop(google_id, None)
+
+    def clear(self):
+        self._cache.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hitRate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+user_profiles = UserProfileService()
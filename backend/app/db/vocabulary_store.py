@@ -0,0 +1,133 @@
+import asyncio
+import os
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.db.mongodb import main_db
+from app.tracing import tracer
+
+VOCABULARY_STORE_ENABLED = os.getenv("VOCABULARY_STORE_ENABLED", "true") == "true"
+# Longer inputs are treated as sentences whose meaning depends on the context
+MAX_LEMMA_WORDS = 6
+
+
+def normalize_lemma(text: str) -> str:
+    text = text.replace("’", "'").replace("**", "")
+    text = re.sub(r"\s+", " ", text).strip().lower()
+    return text.strip(" .,!?;:\"")
+
+
+def language_key(language: str) -> str:
+    """
+    The profile's motherTongue as a field name under `translations`. It is user input,
+    so anything that could change the update path ("." or a leading "$") is replaced.
+    """
+    return re.sub(r"[^\w\- ]", "_", language.strip().lower())
+
+
+def is_word_or_phrase(text: str) -> bool:
+    """Only context-free lookups are shared, not sentences with a bolded word."""
+    if "**" in text or re.search(r"[.!?]\s*$", text.strip()):
+        return False
+    return 0 < len(normalize_lemma(text).split()) <= MAX_LEMMA_WORDS
+
+
+class WordEntryStore:
+    """
+    Shared word entries keyed by normalized lemma:
+        {_id: lemma, word, aliases: [...], definition, translations: {language: text}}
+    `aliases` holds the normalized misspellings that were corrected into this lemma.
+    Writes run in the background so they never delay a response.
+    """
+
+    def __init__(self, collection_name: str = "word_entries"):
+        self.collection_name = collection_name
+        self._pending = set()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def collection(self):
+        return main_db[self.collection_name]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("aliases")
+
+    async def find(self, text: str) -> Optional[dict]:
+        if not VOCABULARY_STORE_ENABLED or not is_word_or_phrase(text):
+            return None
+        key = normalize_lemma(text)
+        try:
+            with tracer.span("mongo.word_entries.find_one", kind="mongo"):
+                entry = await self.collection.find_one(
+                    {"$or": [{"_id": key}, {"aliases": key}]}
+                )
+        except Exception as e:
+            print(f"Vocabulary store lookup failed: {e}")
+            return None
+        if entry:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    async def save(
+        self,
+        word: str,
+        alias: Optional[str] = None,
+        definition: Optional[str] = None,
+        language: Optional[str] = None,
+        translation: Optional[str] = None,
+    ):
+        if not VOCABULARY_STORE_ENABLED or not is_word_or_phrase(word):
+            return
+        update = {
+            "$set": {"word": word, "updatedAt": datetime.now(timezone.utc)},
+        }
+        if definition:
+            update["$set"]["definition"] = definition
+        if language and translation:
+            update["$set"][f"translations.{language_key(language)}"] = translation
+        if alias and normalize_lemma(alias) != normalize_lemma(word):
+            update["$addToSet"] = {"aliases": normalize_lemma(alias)}
+        with tracer.span("mongo.word_entries.update_one", kind="mongo"):
+            await self.collection.update_one(
+                {"_id": normalize_lemma(word)}, update, upsert=True
+            )
+
+    def save_in_background(self, word: str, **fields):
+        async def write():
+            try:
+                await self.save(word, **fields)
+            except Exception as e:
+                print(f"Vocabulary store write failed: {e}")
+
+        if not VOCABULARY_STORE_ENABLED or not is_word_or_phrase(word):
+            return
+        task = asyncio.create_task(write())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def flush(self):
+        """Wait for the background writes, e.g. on shutdown."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "pendingWrites": len(self._pending),
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def get_translation(entry: Optional[dict], language: str) -> Optional[str]:
+    if not entry or not language:
+        return None
+    return entry.get("translations", {}).get(language_key(language))
+
+
+vocabulary_store = WordEntryStore()
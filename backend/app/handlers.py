@@ -0,0 +1,326 @@
+"""
+Request handlers shared by the single-request /ws/* endpoints and the multiplexed /ws/session.
+
+Each handler is an async generator that takes the user profile and the request frame,
+yields the response frames and persists the result when the workflow finishes.
+
+Correction and vocabulary requests may opt in to token deltas with `"stream": "delta"`.
+Text fields are then also sent while they are generated, as
+    {"id": ..., "type": ..., "delta": {"field": "definition", "text": "<token>"}}
+followed by the usual frame with the final value, e.g. {"definition": "<full text>"}.
+Streamed vocabulary examples only send what was appended to each item,
+    {"id": ..., "type": ..., "delta": {"field": "examples", "index": 0, "text": "<appended>"}}
+("replace": true when the item has to be replaced whole), and end with one
+consolidated {"examples": [...]} frame.
+
+Identical requests in flight at the same time share one workflow run (app.single_flight),
+keyed on the input and the profile fields the output depends on.
+"""
+
+import re
+from contextlib import aclosing
+
+from app.workflows.correction import g as correction_graph
+from app.workflows.vocabulary import g as vocabulary_graph, stream_examples
+from app.workflows.breakdown import g as breakdown_graph
+
+from app.db.result_writer import result_writer
+from app.utils.compile_graph import get_workflow
+from app.utils.streaming import list_deltas
+from app.models import (
+    Correction,
+    Vocabulary,
+    Breakdown,
+    General,
+    ResponseType,
+)
+from app.prompt_registry import get_chain
+from app.semantic_cache import semantic_cache
+from app.single_flight import flight_key, single_flight
+
+
+async def save_result(result):
+    await result_writer.enqueue(result)
+
+
+def wants_deltas(data: dict) -> bool:
+    return data.get("stream") == "delta"
+
+
+def workflow_input(input: str, thread_id: str, user: dict) -> dict:
+    return {
+        "input": input,
+        "thread_id": thread_id,
+        "aboutMe": user.get("aboutMe", ""),
+        "englishLevel": user.get("englishLevel", ""),
+        "motherTongue": user.get("motherTongue", ""),
+    }
+
+
+async def handle_correction(user: dict, data: dict):
+    """
+    correct the provided input and provide explanations for corrections.
+    """
+    type = ResponseType.CORRECTION.value
+    input = data.get("input")
+
+    if not input:
+        yield {"error": "No text provided"}
+        return
+
+    result = Correction(userId=user["id"], input=input)
+    workflow = await get_workflow(correction_graph, type)
+
+    result_id_str = str(result.id)
+
+    stream_deltas = wants_deltas(data)
+
+    flight = single_flight.join(
+        flight_key(type, input, user, ("englishLevel",)),
+        lambda: workflow.astream(
+            workflow_input(input, result_id_str, user),
+            stream_mode=["custom"],
+            config={"configurable": {"thread_id": result_id_str}},
+        ),
+    )
+
+    async for stream_mode, data in flight:
+        if "delta" in data.keys():
+            if stream_deltas:
+                yield {"id": result_id_str, "type": type, "delta": data["delta"]}
+            continue
+
+        response_data = {
+            "id": result_id_str,
+            "type": type,
+        }
+        if "correctedText" in data.keys():
+            correctedText = data["correctedText"]
+            result.correctedText = correctedText
+            response_data["correctedText"] = correctedText
+
+        if "correction" in data.keys():
+            correction = data["correction"]
+            result.corrections.append(correction)
+            response_data["correction"] = correction.model_dump()
+
+        yield response_data
+
+    await save_result(result)
+
+
+async def vocabulary_events(flight, examples_profile: tuple):
+    """
+    The events of a shared vocabulary run. When the run generates examples for another
+    profile, stop following it there and generate this user's own examples instead.
+    """
+    if flight.meta == examples_profile:
+        async for event in flight:
+            yield event
+        return
+
+    vocabulary, definition = "", ""
+    async with aclosing(aiter(flight)) as events:
+        async for stream_mode, data in events:
+            # generate_example runs last, so everything it needs has arrived
+            if "examples" in data.keys():
+                break
+            vocabulary = data.get("corrected_input", vocabulary)
+            definition = data.get("definition", definition)
+            yield stream_mode, data
+
+    # Students with the same profile share these as well
+    examples = single_flight.join(
+        ("vocabulary.generate_example", vocabulary, definition, *examples_profile),
+        lambda: stream_examples(vocabulary, definition, *examples_profile),
+    )
+    async for streaming_examples in examples:
+        yield "custom", {"examples": streaming_examples}
+
+
+async def handle_vocabulary(user: dict, data: dict):
+    """
+    Process vocabulary for the provided input.
+    """
+    type = ResponseType.VOCABULARY.value
+    input = data.get("input")
+
+    if not input:
+        yield {"error": "No text provided"}
+        return
+
+    result = Vocabulary(userId=user["id"], input=input)
+    workflow = await get_workflow(vocabulary_graph, type)
+
+    result_id_str = str(result.id)
+
+    stream_deltas = wants_deltas(data)
+
+    # Only the examples depend on these, the rest of the run can be shared
+    examples_profile = (user.get("aboutMe") or "", user.get("englishLevel") or "")
+    flight = single_flight.join(
+        flight_key(type, input, user, ("motherTongue",)),
+        lambda: workflow.astream(
+            workflow_input(input, result_id_str, user),
+            stream_mode=["custom"],
+            config={"configurable": {"thread_id": result_id_str}},
+        ),
+        meta=examples_profile,
+    )
+
+    async for stream_mode, data in vocabulary_events(flight, examples_profile):
+        if "delta" in data.keys():
+            if stream_deltas:
+                yield {"id": result_id_str, "type": type, "delta": data["delta"]}
+            continue
+
+        response_data = {
+            "id": result_id_str,
+            "type": type,
+        }
+        if "extracted_word" in data.keys():
+            extracted_word = data["extracted_word"]
+            result.input = extracted_word
+            response_data["input"] = extracted_word
+        elif "corrected_input" in data.keys():
+            corrected_input = data["corrected_input"]
+            result.input = corrected_input
+            response_data["input"] = corrected_input
+
+        if "definition" in data.keys():
+            definition = data["definition"]
+            result.definition = definition
+            response_data["definition"] = definition
+
+        if "translated_vocabulary" in data.keys():
+            translated_vocabulary = data["translated_vocabulary"]
+            result.translated_vocabulary = translated_vocabulary
+            response_data["translated_vocabulary"] = translated_vocabulary
+
+        if "examples" in data.keys():
+            streaming_examples = data["examples"]  # streaming the whole list
+            if stream_deltas:
+                for index, text, replace in list_deltas(result.examples, streaming_examples):
+                    delta = {"field": "examples", "index": index, "text": text}
+                    if replace:
+                        delta["replace"] = True
+                    yield {"id": result_id_str, "type": type, "delta": delta}
+                result.examples = list(streaming_examples)
+                continue
+            result.examples = streaming_examples  # update with the lastest value
+            response_data["examples"] = streaming_examples
+
+        yield response_data
+
+    if stream_deltas and result.examples:
+        yield {"id": result_id_str, "type": type, "examples": result.examples}
+
+    await save_result(result)
+
+
+async def handle_breakdown(user: dict, data: dict):
+    """
+    Process text breakdown for the provided input.
+    """
+    type = ResponseType.BREAKDOWN.value
+    input = data.get("input")
+
+    if not input:
+        yield {"error": "No text provided"}
+        return
+
+    result = Breakdown(userId=user["id"], input=input)
+    workflow = await get_workflow(breakdown_graph, type)
+
+    result_id_str = str(result.id)
+
+    flight = single_flight.join(
+        flight_key(type, input, user, ("englishLevel",)),
+        lambda: workflow.astream(
+            workflow_input(input, result_id_str, user),
+            stream_mode=["messages"],
+            config={"configurable": {"thread_id": result_id_str}},
+        ),
+    )
+
+    async for stream_mode, data in flight:
+        if stream_mode == "messages":
+            message, metadata = data
+            if not message.content:
+                continue
+
+            if metadata["langgraph_node"] == "generate_paraphrase":
+                result.paraphrase = result.paraphrase + message.content
+                yield {
+                    "id": result_id_str,
+                    "type": type,
+                    "paraphrase": message.content,
+                }
+            elif metadata["langgraph_node"] == "generate_breakdown":
+                result.breakdown = result.breakdown + message.content
+                yield {
+                    "id": result_id_str,
+                    "type": type,
+                    "breakdown": message.content,
+                }
+
+        else:
+            pass
+
+    await save_result(result)
+
+
+async def handle_general(user: dict, data: dict):
+    """
+    Process general questions.
+    """
+    type = ResponseType.GENERAL.value
+    input = data.get("input")
+
+    if not input:
+        yield {"error": "No text provided"}
+        return
+
+    result = General(userId=user["id"], input=input)
+    result_id_str = str(result.id)
+
+    # Near-identical questions replay a stored answer
+    cached = await semantic_cache.alookup(input) if semantic_cache is not None else None
+    if cached:
+        for token in re.findall(r"\s*\S+|\s+", cached["answer"]):
+            yield {
+                "id": result_id_str,
+                "type": type,
+                "answer": token,
+            }
+        result.answer = cached["answer"]
+        await save_result(result)
+        return
+
+    flight = single_flight.join(
+        flight_key(type, input, user),
+        lambda: get_chain("general", None).astream({"input": input}),
+    )
+
+    full_response = ""
+    async for chunk in flight:
+        full_response += chunk.content
+        yield {
+            "id": result_id_str,
+            "type": type,
+            "answer": chunk.content,
+        }
+
+    result.answer = full_response
+    if semantic_cache is not None and full_response and flight.leader:
+        await semantic_cache.aadd(input, full_response)
+
+    await save_result(result)
+
+
+HANDLERS = {
+    ResponseType.CORRECTION.value: handle_correction,
+    ResponseType.VOCABULARY.value: handle_vocabulary,
+    ResponseType.BREAKDOWN.value: handle_breakdown,
+    ResponseType.GENERAL.value: handle_general,
+}
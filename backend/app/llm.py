@@ -1,9 +1,300 @@
 import os
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
 from dotenv import load_dotenv
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
 from langchain_openai import ChatOpenAI
 
+from app.llm_cache import LLM_CACHE_STAGES, llm_cache, llm_cache_metrics, make_cache_key
+from app.llm_governor import LLM_EXPECTED_OUTPUT_TOKENS, llm_governor
+from app.llm_resilience import llm_resilience
+from app.model_router import llm_stage_metrics, model_router
+from app.tracing import tracer
+
 load_dotenv()
 
-chat_model = ChatOpenAI(
-    model_name="gpt-4o", temperature=0.7, api_key=os.getenv("OPENAI_API_KEY")
-)
+if os.getenv("LLM_PROVIDER") == "fake":
+    # Local deterministic model for benchmarks and offline development
+    from app.utils.fake_chat_model import FakeChatModel
+
+    chat_model = FakeChatModel(
+        token_latency=float(os.getenv("FAKE_LLM_TOKEN_LATENCY", "0.02"))
+    )
+else:
+    chat_model = ChatOpenAI(
+        model_name="gpt-4o", temperature=0.7, api_key=os.getenv("OPENAI_API_KEY")
+    )
+
+
+def build_openai_model(route: dict) -> ChatOpenAI:
+    return ChatOpenAI(
+        model_name=route["model"],
+        temperature=route["temperature"],
+        max_tokens=route["max_tokens"],
+        timeout=route["timeout"],
+        # Retries are up to app.llm_resilience
+        max_retries=0,
+        stream_usage=True,
+        api_key=os.getenv("OPENAI_API_KEY"),
+    )
+
+
+def usage_of(message) -> tuple[int, int]:
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+
+class StageChatModel(BaseChatModel):
+    """
+    The chat model as seen by one workflow stage.
+    With OpenAI, the model router picks the model and settings for the stage; any
+    other `chat_model` (e.g. the fake one) serves every stage. For stages that opt in,
+    repeated prompts are answered from the LLM cache. Cache hits are replayed as a
+    token stream so streaming consumers behave the same.
+    Every model call waits for a slot from the LLM governor, runs with the stage's
+    deadline, retries and hedging, and its latency and token usage are recorded per stage.
+    All of that is async, so the sync invoke/stream paths raise NotImplementedError.
+    """
+
+    stage: str
+    use_cache: bool = False
+
+    @property
+    def model(self) -> BaseChatModel:
+        if isinstance(chat_model, ChatOpenAI):
+            return model_router.model_for(self.stage, build_openai_model)
+        return chat_model
+
+    @property
+    def _llm_type(self) -> str:
+        return f"stage-{self.model._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"stage": self.stage, **self.model._identifying_params}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(**self.model.bind_tools(tools, **kwargs).kwargs)
+
+    # ===========================================
+    #                   CACHE
+    # ===========================================
+    def _cache_key(self, messages: List[BaseMessage], kwargs: dict) -> Optional[str]:
+        # Only plain text generations are cached, not tool calls
+        if not (self.use_cache and llm_cache) or kwargs.get("tools"):
+            return None
+        return make_cache_key(
+            messages,
+            getattr(self.model, "model_name", self.model._llm_type),
+            getattr(self.model, "temperature", None),
+            kwargs,
+        )
+
+    async def _cache_get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        try:
+            content = await llm_cache.get(key)
+        except Exception as e:
+            print(f"LLM cache lookup failed: {e}")
+            llm_cache_metrics.record(self.stage, "errors")
+            return None
+        llm_cache_metrics.record(self.stage, "hits" if content is not None else "misses")
+        return content
+
+    async def _cache_set(self, key: Optional[str], content: str):
+        if key is None or not content:
+            return
+        try:
+            await llm_cache.set(key, content)
+        except Exception as e:
+            print(f"LLM cache write failed: {e}")
+            llm_cache_metrics.record(self.stage, "errors")
+
+    def _estimate_tokens(self, messages: List[BaseMessage]) -> int:
+        """Roughly 4 characters per token, plus the output expected from the call."""
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        max_tokens = getattr(self.model, "max_tokens", None) or LLM_EXPECTED_OUTPUT_TOKENS
+        return prompt_tokens + min(max_tokens, LLM_EXPECTED_OUTPUT_TOKENS)
+
+    def _record(
+        self,
+        start_time_ns: int,
+        latency_ms: float,
+        ttft_ms: Optional[float],
+        input_tokens: int,
+        output_tokens: int,
+    ):
+        llm_stage_metrics.record(
+            self.stage, latency_ms, ttft_ms, input_tokens, output_tokens
+        )
+        tracer.record(
+            self.stage,
+            "llm",
+            start_time_ns,
+            latency_ms,
+            model=getattr(self.model, "model_name", self.model._llm_type),
+            ttftMs=round(ttft_ms, 3) if ttft_ms is not None else None,
+            inputTokens=input_tokens,
+            outputTokens=output_tokens,
+        )
+
+    # ===========================================
+    #                 GENERATION
+    # ===========================================
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        raise NotImplementedError(self._sync_error())
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        raise NotImplementedError(self._sync_error())
+
+    def _sync_error(self) -> str:
+        # The cache, governor, resilience, metrics and traces are all async
+        return (
+            f"{self.stage}: stage models are async only, use ainvoke/astream "
+            "so the call goes through the LLM cache, governor and resilience"
+        )
+
+    async def _generate_once(self, messages, stop, run_manager, kwargs) -> ChatResult:
+        """One model call, inside a governor slot."""
+        async with llm_governor.admit(self._estimate_tokens(messages)) as permit:
+            start_time_ns = time.time_ns()
+            start = time.perf_counter()
+            result = await self.model._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+            input_tokens, output_tokens = usage_of(result.generations[0].message)
+            if input_tokens or output_tokens:
+                permit.tokens = input_tokens + output_tokens
+        self._record(
+            start_time_ns,
+            (time.perf_counter() - start) * 1000,
+            None,
+            input_tokens,
+            output_tokens,
+        )
+        return result
+
+    async def _stream_once(self, messages, stop, run_manager, kwargs):
+        """One streamed model call, inside a governor slot."""
+        ttft_ms = None
+        input_tokens = output_tokens = 0
+        async with llm_governor.admit(self._estimate_tokens(messages)) as permit:
+            start_time_ns = time.time_ns()
+            start = time.perf_counter()
+            async for chunk in self.model._astream(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ):
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                chunk_input_tokens, chunk_output_tokens = usage_of(chunk.message)
+                input_tokens += chunk_input_tokens
+                output_tokens += chunk_output_tokens
+                yield chunk
+            if input_tokens or output_tokens:
+                permit.tokens = input_tokens + output_tokens
+        self._record(
+            start_time_ns,
+            (time.perf_counter() - start) * 1000,
+            ttft_ms,
+            input_tokens,
+            output_tokens,
+        )
+
+    def _can_hedge(self, messages: List[BaseMessage]):
+        # A duplicate call is only worth it if it doesn't have to queue
+        return lambda: llm_governor.has_capacity(self._estimate_tokens(messages))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._cache_key(messages, kwargs)
+        content = await self._cache_get(key)
+        if content is not None:
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+        result = await llm_resilience.call(
+            self.stage,
+            # Callbacks only hear from the first attempt of a hedged call
+            lambda hedged: self._generate_once(
+                messages, stop, None if hedged else run_manager, kwargs
+            ),
+            self._can_hedge(messages),
+        )
+        message = result.generations[0].message
+        if isinstance(message.content, str) and not getattr(message, "tool_calls", None):
+            await self._cache_set(key, message.content)
+        return result
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        key = self._cache_key(messages, kwargs)
+        content = await self._cache_get(key)
+        if content is not None:
+            for token in re.findall(r"\s*\S+|\s+", content):
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+                if run_manager:
+                    await run_manager.on_llm_new_token(token, chunk=chunk)
+                yield chunk
+            return
+
+        streamed = ""
+        has_tool_calls = False
+        async for chunk in llm_resilience.stream(
+            self.stage,
+            lambda hedged: self._stream_once(
+                messages, stop, None if hedged else run_manager, kwargs
+            ),
+            self._can_hedge(messages),
+        ):
+            if isinstance(chunk.message.content, str):
+                streamed += chunk.message.content
+            has_tool_calls = has_tool_calls or bool(
+                getattr(chunk.message, "tool_call_chunks", None)
+            )
+            yield chunk
+        if not has_tool_calls:
+            await self._cache_set(key, streamed)
+
+
+_stage_models = {}
+
+
+def get_chat_model(stage: str) -> StageChatModel:
+    """
+    Return the chat model for a workflow stage (usually the node name).
+    """
+    if stage not in _stage_models:
+        _stage_models[stage] = StageChatModel(
+            stage=stage, use_cache=stage in LLM_CACHE_STAGES
+        )
+    return _stage_models[stage]
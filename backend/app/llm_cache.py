@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+
+from langchain_core.messages import BaseMessage
+
+from app.tracing import tracer
+
+# "memory", "mongo" or "none"
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_MAX_SIZE = int(os.getenv("LLM_CACHE_MAX_SIZE", "10000"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Stages whose prompts repeat across users and whose output can be reused
+LLM_CACHE_STAGES = [
+    stage.strip()
+    for stage in os.getenv(
+        "LLM_CACHE_STAGES",
+        "vocabulary.correct_input,vocabulary.get_definition,vocabulary.translate_to_mother_tongue",
+    ).split(",")
+    if stage.strip()
+]
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_cache_key(
+    messages: list[BaseMessage], model_name: str, temperature, options: dict
+) -> str:
+    payload = json.dumps(
+        {
+            "messages": [
+                [message.type, normalize(str(message.content))] for message in messages
+            ],
+            "model": model_name,
+            "temperature": temperature,
+            "options": options,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class InMemoryLLMCache:
+    def __init__(self, max_size: int = LLM_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        if key not in self._items:
+            return None
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    async def set(self, key: str, content: str):
+        self._items[key] = content
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+
+class MongoLLMCache:
+    """
+    Shared across instances. Entries expire through a TTL index on createdAt.
+    """
+
+    def __init__(self, collection_name: str = "llm_cache", ttl: int = LLM_CACHE_TTL_SECONDS):
+        self.collection_name = collection_name
+        self.ttl = ttl
+
+    @property
+    def collection(self):
+        from app.db.mongodb import main_db
+
+        return main_db[self.collection_name]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("createdAt", expireAfterSeconds=self.ttl)
+
+    async def get(self, key: str) -> Optional[str]:
+        with tracer.span("mongo.llm_cache.find_one", kind="mongo"):
+            entry = await self.collection.find_one({"_id": key}, {"content": 1})
+        return entry["content"] if entry else None
+
+    async def set(self, key: str, content: str):
+        with tracer.span("mongo.llm_cache.update_one", kind="mongo"):
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": {"content": content, "createdAt": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+
+
+class LLMCacheMetrics:
+    def __init__(self):
+        self.stages = {}  # stage -> {"hits": int, "misses": int, "errors": int}
+
+    def record(self, stage: str, outcome: str):
+        counters = self.stages.setdefault(stage, {"hits": 0, "misses": 0, "errors": 0})
+        counters[outcome] += 1
+
+    def stats(self) -> dict:
+        stats = {}
+        for stage, counters in self.stages.items():
+            lookups = counters["hits"] + counters["misses"]
+            stats[stage] = {
+                **counters,
+                "hitRate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            }
+        return stats
+
+
+def make_llm_cache(backend: str = LLM_CACHE_BACKEND):
+    if backend == "memory":
+        return InMemoryLLMCache()
+    if backend == "mongo":
+        return MongoLLMCache()
+    return None
+
+
+llm_cache = make_llm_cache()
+llm_cache_metrics = LLMCacheMetrics()
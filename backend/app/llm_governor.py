@@ -0,0 +1,281 @@
+"""
+Admission control for chat model calls.
+
+Every call made through a StageChatModel first takes a slot from the governor:
+
+    async with llm_governor.admit(estimated_tokens) as permit:
+        ...
+        permit.tokens = input_tokens + output_tokens
+
+A call is admitted when fewer than LLM_MAX_CONCURRENT calls are running and the per-minute
+request and token budgets (refilled continuously) have room. Waiting calls are queued per
+user and served round-robin, so one user's burst can't starve everyone else. Queues are
+bounded; a call that can't be queued, or waits longer than LLM_QUEUE_TIMEOUT, fails with
+LLMOverloaded, which the WebSocket endpoints send as an error frame.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from app.tracing import tracer
+
+LLM_GOVERNOR_ENABLED = os.getenv("LLM_GOVERNOR_ENABLED", "true") == "true"
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "32"))
+# Provider limits; 0 disables a budget
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+# Output tokens reserved for a call until its actual usage is known
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "300"))
+LLM_QUEUE_MAX = int(os.getenv("LLM_QUEUE_MAX", "200"))
+LLM_QUEUE_MAX_PER_USER = int(os.getenv("LLM_QUEUE_MAX_PER_USER", "20"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "20"))
+
+# The user whose request is making LLM calls, set where the user is resolved
+current_user_id = ContextVar("current_user_id", default=None)
+
+
+class LLMOverloaded(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__("The tutor is busy right now, please try again in a moment")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def frame(self) -> dict:
+        return {"error": str(self), "code": "overloaded", "retryAfter": self.retry_after}
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def fits(self, amount: float) -> bool:
+        # A call larger than the whole budget goes through once the bucket is full
+        return self.available >= min(amount, self.capacity)
+
+    def seconds_until(self, amount: float) -> float:
+        missing = min(amount, self.capacity) - self.available
+        return max(missing / self.rate, 0.0)
+
+
+class Permit:
+    def __init__(self, user_id: str, tokens: int):
+        self.user_id = user_id
+        self.reserved = tokens
+        # Set to the actual usage once known, to correct the token budget
+        self.tokens = None
+
+
+class _Waiter:
+    def __init__(self, permit: Permit):
+        self.permit = permit
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.perf_counter()
+
+
+class LLMGovernor:
+    def __init__(
+        self,
+        max_concurrent: int = LLM_MAX_CONCURRENT,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_queue: int = LLM_QUEUE_MAX,
+        max_queue_per_user: int = LLM_QUEUE_MAX_PER_USER,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT,
+        enabled: bool = LLM_GOVERNOR_ENABLED,
+    ):
+        self.max_concurrent = max_concurrent
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+        self.enabled = enabled
+        self.active = 0
+        self._queues = OrderedDict()  # user id -> deque of waiters, in round-robin order
+        self._queued = 0
+        self._timer = None
+        self.admitted = 0
+        self.queued_total = 0
+        self.shed = {"queue_full": 0, "user_queue_full": 0, "timeout": 0}
+        self.wait_ms_total = 0.0
+        self.max_wait_ms = 0.0
+
+    # ===========================================
+    #                 ADMISSION
+    # ===========================================
+    def _wait_for_budget(self, permit: Permit) -> float:
+        """Seconds until the budgets have room for the permit, 0 if they have now."""
+        wait = 0.0
+        for bucket, amount in ((self.requests, 1), (self.tokens, permit.reserved)):
+            if bucket is not None:
+                bucket.refill()
+                if not bucket.fits(amount):
+                    wait = max(wait, bucket.seconds_until(amount))
+        return wait
+
+    def _take(self, permit: Permit):
+        if self.requests is not None:
+            self.requests.available -= 1
+        if self.tokens is not None:
+            self.tokens.available -= permit.reserved
+        self.active += 1
+        self.admitted += 1
+
+    def _dispatch(self):
+        """Admit queued calls, one user at a time in round-robin order."""
+        self._timer = None
+        while self._queues and self.active < self.max_concurrent:
+            user_id, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if waiter.future.done():  # timed out or cancelled
+                self._pop(user_id)
+                continue
+            wait = self._wait_for_budget(waiter.permit)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            self._pop(user_id)
+            self._take(waiter.permit)
+            waiter.future.set_result(waiter.permit)
+            if user_id in self._queues:
+                self._queues.move_to_end(user_id)
+
+    def _pop(self, user_id: str):
+        queue = self._queues[user_id]
+        queue.popleft()
+        self._queued -= 1
+        if not queue:
+            del self._queues[user_id]
+
+    def _remove(self, waiter: _Waiter):
+        queue = self._queues.get(waiter.permit.user_id)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[waiter.permit.user_id]
+
+    def _shed(self, reason: str) -> LLMOverloaded:
+        self.shed[reason] += 1
+        average_wait = self.wait_ms_total / self.queued_total / 1000 if self.queued_total else 1.0
+        return LLMOverloaded(reason, retry_after=round(max(average_wait, 1.0), 1))
+
+    def _record_wait(self, waiter: _Waiter):
+        wait_ms = (time.perf_counter() - waiter.enqueued_at) * 1000
+        self.wait_ms_total += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        tracer.histograms.observe("llm_queue", "wait", wait_ms)
+
+    async def acquire(self, estimated_tokens: int, user_id: Optional[str] = None) -> Permit:
+        user_id = user_id or current_user_id.get() or "anonymous"
+        permit = Permit(user_id, estimated_tokens)
+        if not self._queues and self.active < self.max_concurrent:
+            if self._wait_for_budget(permit) == 0:
+                self._take(permit)
+                tracer.histograms.observe("llm_queue", "wait", 0.0)
+                return permit
+
+        if self._queued >= self.max_queue:
+            raise self._shed("queue_full")
+        queue = self._queues.setdefault(user_id, deque())
+        if len(queue) >= self.max_queue_per_user:
+            raise self._shed("user_queue_full")
+        waiter = _Waiter(permit)
+        queue.append(waiter)
+        self._queued += 1
+        self.queued_total += 1
+        if self._timer is None:
+            self._dispatch()
+
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._remove(waiter)
+            self._record_wait(waiter)
+            raise self._shed("timeout")
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the caller went away
+                self.release(permit)
+            else:
+                self._remove(waiter)
+            raise
+        self._record_wait(waiter)
+        return permit
+
+    def release(self, permit: Permit):
+        self.active -= 1
+        if self.tokens is not None and permit.tokens is not None:
+            # Give back what was reserved but not used, or charge the excess
+            self.tokens.available += permit.reserved - permit.tokens
+        # The budgets may have room earlier than the pending timer assumed
+        if self._timer is not None:
+            self._timer.cancel()
+        self._dispatch()
+
+    def has_capacity(self, estimated_tokens: int = 0) -> bool:
+        """Whether a call would be admitted right away."""
+        if not self.enabled:
+            return True
+        if self._queues or self.active >= self.max_concurrent:
+            return False
+        return self._wait_for_budget(Permit("", estimated_tokens)) == 0
+
+    @asynccontextmanager
+    async def admit(self, estimated_tokens: int):
+        if not self.enabled:
+            yield Permit(current_user_id.get() or "anonymous", estimated_tokens)
+            return
+        permit = await self.acquire(estimated_tokens)
+        try:
+            yield permit
+        finally:
+            self.release(permit)
+
+    # ===========================================
+    #                  METRICS
+    # ===========================================
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queueDepth": self._queued,
+            "usersWaiting": len(self._queues),
+            "admitted": self.admitted,
+            "queued": self.queued_total,
+            "shed": dict(self.shed),
+            "avgWaitMs": round(self.wait_ms_total / self.queued_total, 2) if self.queued_total else 0.0,
+            "maxWaitMs": round(self.max_wait_ms, 2),
+            "requestBudget": round(self.requests.available, 1) if self.requests else None,
+            "tokenBudget": round(self.tokens.available) if self.tokens else None,
+        }
+
+    def prometheus(self) -> str:
+        lines = [
+            "# HELP englishtutor_llm_active Chat model calls running",
+            "# TYPE englishtutor_llm_active gauge",
+            f"englishtutor_llm_active {self.active}",
+            "# HELP englishtutor_llm_queue_depth Chat model calls waiting for a slot",
+            "# TYPE englishtutor_llm_queue_depth gauge",
+            f"englishtutor_llm_queue_depth {self._queued}",
+            "# HELP englishtutor_llm_shed_total Chat model calls rejected by the governor",
+            "# TYPE englishtutor_llm_shed_total counter",
+        ]
+        for reason, count in self.shed.items():
+            lines.append(f'englishtutor_llm_shed_total{{reason="{reason}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+llm_governor = LLMGovernor()
@@ -0,0 +1,266 @@
+"""
+Deadlines, retries and hedging for chat model calls.
+
+Each stage has a deadline (LLM_TIMEOUT, or its entry in LLM_STAGE_TIMEOUTS) for the whole
+call, retries included. A stage timeout of null means streams of that stage have no total
+deadline, since their length depends on the input; non-streamed calls use LLM_TIMEOUT. A streamed attempt that produces no first token within
+LLM_FIRST_TOKEN_TIMEOUT counts as failed. Failed attempts are retried with full-jitter
+exponential backoff when the error is retryable: timeouts, rate limits, connection errors
+and 5xx responses. Once tokens have been sent a stream can't be retried, so a stall
+of LLM_STREAM_IDLE_TIMEOUT between tokens ends it with LLMTimeout.
+
+Stages in LLM_HEDGE_STAGES are hedged: when the first attempt has no first token (or no
+result) by the stage's p95, a duplicate is started and whichever answers first is used.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+from typing import AsyncIterator, Awaitable, Callable
+
+import openai
+
+from app.model_router import llm_stage_metrics
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+# Short stages give up sooner
+STAGE_TIMEOUTS = {
+    "vocabulary.correct_input": 10,
+    "vocabulary.check_if_input_is_sentence": 10,
+    # Streams the whole corrected text back, so a long essay must not hit a total deadline
+    "correction.correct_input": None,
+}
+LLM_STAGE_TIMEOUTS = {**STAGE_TIMEOUTS, **json.loads(os.getenv("LLM_STAGE_TIMEOUTS", "{}"))}
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", "10"))
+LLM_STREAM_IDLE_TIMEOUT = float(os.getenv("LLM_STREAM_IDLE_TIMEOUT", "15"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+LLM_HEDGE_STAGES = json.loads(
+    os.getenv("LLM_HEDGE_STAGES", '["vocabulary.correct_input"]')
+)
+# Used until a stage has LLM_HEDGE_MIN_SAMPLES calls to take its p95 from
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "1.0"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class LLMTimeout(Exception):
+    pass
+
+
+class LLMResilience:
+    def __init__(
+        self,
+        timeout: float = LLM_TIMEOUT,
+        stage_timeouts: dict = LLM_STAGE_TIMEOUTS,
+        first_token_timeout: float = LLM_FIRST_TOKEN_TIMEOUT,
+        idle_timeout: float = LLM_STREAM_IDLE_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+        retry_max_delay: float = LLM_RETRY_MAX_DELAY,
+        hedge_stages: list = LLM_HEDGE_STAGES,
+        hedge_delay: float = LLM_HEDGE_DELAY,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+    ):
+        self.timeout = timeout
+        self.stage_timeouts = stage_timeouts
+        self.first_token_timeout = first_token_timeout
+        self.idle_timeout = idle_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge_stages = set(hedge_stages)
+        self.hedge_delay = hedge_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.stages = {}
+
+    def _count(self, stage: str, event: str):
+        counts = self.stages.setdefault(
+            stage, {"timeouts": 0, "retries": 0, "hedges": 0, "hedgeWins": 0, "failures": 0}
+        )
+        counts[event] += 1
+
+    def is_retryable(self, error: Exception) -> bool:
+        return isinstance(error, (LLMTimeout, *RETRYABLE_ERRORS))
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2**attempt))
+
+    def _hedge_after(self, stage: str, metric: str):
+        if stage not in self.hedge_stages:
+            return None
+        p95 = llm_stage_metrics.percentile(stage, metric, 95, self.hedge_min_samples)
+        return p95 / 1000 if p95 is not None else self.hedge_delay
+
+    # ===========================================
+    #                   RACE
+    # ===========================================
+    async def _race(
+        self,
+        stage: str,
+        launch: Callable[[], Awaitable],
+        timeout: float,
+        hedge_after,
+        can_hedge: Callable[[], bool],
+    ):
+        """
+        Await launch() for at most `timeout` seconds, launching it a second time after
+        `hedge_after` seconds if that's set. Returns (attempt index, result) of the first
+        to succeed; the other is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        end = loop.time() + timeout
+        hedge_at = loop.time() + hedge_after if hedge_after is not None else None
+        tasks = {asyncio.ensure_future(launch()): 0}
+        errors = []
+        try:
+            while tasks:
+                wake = min(end, hedge_at) if hedge_at is not None else end
+                done, _ = await asyncio.wait(
+                    tasks, timeout=max(wake - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    index = tasks.pop(task)
+                    if task.exception() is None:
+                        if index == 1:
+                            self._count(stage, "hedgeWins")
+                        return index, task.result()
+                    errors.append(task.exception())
+                if done:
+                    continue
+                if hedge_at is not None and loop.time() >= hedge_at:
+                    hedge_at = None
+                    if can_hedge():
+                        self._count(stage, "hedges")
+                        tasks[asyncio.ensure_future(launch())] = 1
+                    continue
+                if loop.time() >= end:
+                    self._count(stage, "timeouts")
+                    raise LLMTimeout(f"{stage} did not answer within {round(timeout, 2)}s")
+            raise errors[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stage_timeout(self, stage: str, streamed: bool) -> float:
+        timeout = self.stage_timeouts.get(stage, self.timeout)
+        if timeout is None:
+            return math.inf if streamed else self.timeout
+        return timeout
+
+    async def _retry(self, stage: str, attempt_once, timeout: float):
+        """Run attempt_once(deadline) until it succeeds, fails for good or the deadline passes."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await attempt_once(deadline)
+            except Exception as e:
+                delay = self.backoff(attempt)
+                if (
+                    attempt == self.max_retries
+                    or not self.is_retryable(e)
+                    or loop.time() + delay >= deadline
+                ):
+                    self._count(stage, "failures")
+                    raise
+                print(f"Retrying {stage} in {round(delay, 2)}s after: {e!r}")
+                self._count(stage, "retries")
+                await asyncio.sleep(delay)
+
+    # ===========================================
+    #                   CALLS
+    # ===========================================
+    async def call(
+        self,
+        stage: str,
+        start: Callable[[bool], Awaitable],
+        can_hedge: Callable[[], bool] = lambda: True,
+    ):
+        """
+        Await start(hedged) with the stage's deadline, retries and hedging.
+        `hedged` is true for the duplicate of a hedged call.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def attempt_once(deadline):
+            launches = iter([False, True])
+            _, result = await self._race(
+                stage,
+                lambda: start(next(launches)),
+                deadline - loop.time(),
+                self._hedge_after(stage, "latency"),
+                can_hedge,
+            )
+            return result
+
+        return await self._retry(stage, attempt_once, self.stage_timeout(stage, streamed=False))
+
+    async def stream(
+        self,
+        stage: str,
+        start: Callable[[bool], AsyncIterator],
+        can_hedge: Callable[[], bool] = lambda: True,
+    ) -> AsyncIterator:
+        """
+        Iterate start(hedged) with the stage's deadline, retries until the first token,
+        hedging on the first token and a timeout between tokens.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None
+
+        async def attempt_once(attempt_deadline):
+            nonlocal deadline
+            deadline = attempt_deadline
+            streams = []
+
+            def launch():
+                stream = start(len(streams) == 1)
+                streams.append(stream)
+                return anext(stream, None)
+
+            winner = None
+            try:
+                winner, first = await self._race(
+                    stage,
+                    launch,
+                    min(self.first_token_timeout, deadline - loop.time()),
+                    self._hedge_after(stage, "ttft"),
+                    can_hedge,
+                )
+                return streams[winner], first
+            finally:
+                for index, stream in enumerate(streams):
+                    if index != winner:
+                        await stream.aclose()
+
+        stream, chunk = await self._retry(
+            stage, attempt_once, self.stage_timeout(stage, streamed=True)
+        )
+        try:
+            while chunk is not None:
+                yield chunk
+                timeout = min(self.idle_timeout, deadline - loop.time())
+                try:
+                    chunk = await asyncio.wait_for(anext(stream, None), max(timeout, 0))
+                except asyncio.TimeoutError:
+                    self._count(stage, "timeouts")
+                    raise LLMTimeout(f"{stage} stalled for {round(timeout, 2)}s mid-stream")
+        finally:
+            await stream.aclose()
+
+    def stats(self) -> dict:
+        return {stage: dict(counts) for stage, counts in self.stages.items()}
+
+
+llm_resilience = LLMResilience()
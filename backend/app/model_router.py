@@ -0,0 +1,156 @@
+import json
+import os
+from collections import deque
+from typing import Optional
+
+# Recent calls per stage that latency percentiles are taken from
+LLM_METRICS_WINDOW = int(os.getenv("LLM_METRICS_WINDOW", "200"))
+
+# Tier -> model settings. A None value keeps the provider default.
+MODEL_TIERS = {
+    "fast": {
+        "model": os.getenv("LLM_FAST_MODEL", "gpt-4o-mini"),
+        "temperature": 0.0,
+        "max_tokens": 256,
+        "timeout": 15,
+    },
+    "balanced": {
+        "model": os.getenv("LLM_BALANCED_MODEL", "gpt-4o-mini"),
+        "temperature": 0.7,
+        "max_tokens": 1024,
+        "timeout": 30,
+    },
+    "quality": {
+        "model": os.getenv("LLM_QUALITY_MODEL", "gpt-4o"),
+        "temperature": 0.7,
+        "max_tokens": None,
+        "timeout": 60,
+    },
+}
+DEFAULT_TIER = "quality"
+
+# Stage -> tier. Stages that aren't listed use DEFAULT_TIER.
+STAGE_TIERS = {
+    "vocabulary.correct_input": "fast",
+    "vocabulary.check_if_input_is_sentence": "fast",
+    "vocabulary.translate_to_mother_tongue": "fast",
+    "vocabulary.get_definition": "balanced",
+    "vocabulary.generate_example": "balanced",
+    "breakdown.generate_paraphrase": "balanced",
+}
+
+# Per-stage overrides as JSON, e.g.
+# LLM_ROUTES='{"vocabulary.get_definition": {"tier": "quality", "max_tokens": 300}}'
+LLM_ROUTES = json.loads(os.getenv("LLM_ROUTES", "{}"))
+
+
+class ModelRouter:
+    """
+    Resolves each workflow stage to its model settings and keeps one chat model
+    per distinct setting.
+    """
+
+    def __init__(
+        self,
+        tiers: dict = MODEL_TIERS,
+        stage_tiers: dict = STAGE_TIERS,
+        overrides: dict = LLM_ROUTES,
+    ):
+        self.tiers = tiers
+        self.stage_tiers = stage_tiers
+        self.overrides = overrides
+        self._models = {}
+
+    def route(self, stage: str) -> dict:
+        override = self.overrides.get(stage, {})
+        tier = override.get("tier", self.stage_tiers.get(stage, DEFAULT_TIER))
+        return {
+            "tier": tier,
+            **self.tiers[tier],
+            **{key: value for key, value in override.items() if key != "tier"},
+        }
+
+    def model_for(self, stage: str, build_model):
+        """
+        `build_model(route)` creates the chat model for a route the first time it's used.
+        """
+        route = self.route(stage)
+        key = tuple(sorted((k, v) for k, v in route.items() if k != "tier"))
+        if key not in self._models:
+            self._models[key] = build_model(route)
+        return self._models[key]
+
+    def routes(self, stages) -> dict:
+        return {stage: self.route(stage) for stage in stages}
+
+
+class LLMStageMetrics:
+    """Latency, time to first token and token usage of the model calls per stage."""
+
+    def __init__(self, window: int = LLM_METRICS_WINDOW):
+        self.stages = {}
+        self.window = window
+        self.recent = {}  # (stage, "latency" | "ttft") -> recent values in ms
+
+    def record(
+        self,
+        stage: str,
+        latency_ms: float,
+        ttft_ms: Optional[float] = None,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+    ):
+        metrics = self.stages.setdefault(
+            stage,
+            {
+                "calls": 0,
+                "latencyMs": 0.0,
+                "maxLatencyMs": 0.0,
+                "streamedCalls": 0,
+                "ttftMs": 0.0,
+                "inputTokens": 0,
+                "outputTokens": 0,
+            },
+        )
+        metrics["calls"] += 1
+        metrics["latencyMs"] += latency_ms
+        metrics["maxLatencyMs"] = max(metrics["maxLatencyMs"], latency_ms)
+        if ttft_ms is not None:
+            metrics["streamedCalls"] += 1
+            metrics["ttftMs"] += ttft_ms
+        metrics["inputTokens"] += input_tokens
+        metrics["outputTokens"] += output_tokens
+        self.recent.setdefault((stage, "latency"), deque(maxlen=self.window)).append(latency_ms)
+        if ttft_ms is not None:
+            self.recent.setdefault((stage, "ttft"), deque(maxlen=self.window)).append(ttft_ms)
+
+    def percentile(
+        self, stage: str, metric: str, p: float, min_samples: int = 1
+    ) -> Optional[float]:
+        """Percentile of the recent latencies or times to first token, in ms."""
+        values = sorted(self.recent.get((stage, metric), ()))
+        if len(values) < max(min_samples, 1):
+            return None
+        return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+    def stats(self) -> dict:
+        stats = {}
+        for stage, metrics in self.stages.items():
+            stats[stage] = {
+                "calls": metrics["calls"],
+                "avgLatencyMs": round(metrics["latencyMs"] / metrics["calls"], 2),
+                "maxLatencyMs": round(metrics["maxLatencyMs"], 2),
+                "avgTtftMs": (
+                    round(metrics["ttftMs"] / metrics["streamedCalls"], 2)
+                    if metrics["streamedCalls"]
+                    else None
+                ),
+                "p95TtftMs": self.percentile(stage, "ttft", 95),
+                "inputTokens": metrics["inputTokens"],
+                "outputTokens": metrics["outputTokens"],
+            }
+        return stats
+
+
+model_router = ModelRouter()
+llm_stage_metrics = LLMStageMetrics()
@@ -0,0 +1,79 @@
+import json
+import os
+import re
+from typing import Optional
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.llm import get_chat_model
+
+PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "prompts")
+# Pin prompt versions per stage, e.g. PROMPT_VERSIONS='{"general": "v2"}'.
+# Stages that aren't pinned use their latest version.
+PROMPT_VERSIONS = json.loads(os.getenv("PROMPT_VERSIONS", "{}"))
+
+# Prompts live in app/prompts/<stage>/<version>.txt. A file is one human template,
+# unless it is split into messages by "[system]" / "[human]" / "[ai]" lines.
+MESSAGE_ROLE = re.compile(r"^\[(system|human|ai)\]\n", re.MULTILINE)
+# Other files in a stage directory (drafts, notes) are ignored
+VERSION_FILE = re.compile(r"^v(\d+)\.txt$")
+
+_prompts = {}
+_chains = {}
+
+
+def prompt_versions(stage: str) -> list[str]:
+    versions = [
+        (int(match.group(1)), file[: -len(".txt")])
+        for file in os.listdir(os.path.join(PROMPTS_DIR, stage))
+        if (match := VERSION_FILE.match(file))
+    ]
+    return [version for _, version in sorted(versions)]
+
+
+def load_template(stage: str, version: Optional[str] = None) -> str:
+    version = version or PROMPT_VERSIONS.get(stage) or prompt_versions(stage)[-1]
+    with open(os.path.join(PROMPTS_DIR, stage, f"{version}.txt")) as f:
+        return f.read()
+
+
+def parse_prompt(template: str) -> ChatPromptTemplate:
+    parts = MESSAGE_ROLE.split(template)
+    if len(parts) == 1:
+        return ChatPromptTemplate.from_template(template)
+    # ["", role, text, role, text, ...]
+    return ChatPromptTemplate.from_messages(
+        [(role, text.removesuffix("\n")) for role, text in zip(parts[1::2], parts[2::2])]
+    )
+
+
+def get_prompt(stage: str) -> ChatPromptTemplate:
+    if stage not in _prompts:
+        _prompts[stage] = parse_prompt(load_template(stage))
+    return _prompts[stage]
+
+
+def get_chain(stage: str, output=str):
+    """
+    The stage's prompt piped into its chat model, built once per stage and output.
+    `output` is `str` for text, `None` for the raw message or a pydantic model
+    for structured output.
+    """
+    key = (stage, output)
+    if key not in _chains:
+        model = get_chat_model(stage)
+        if output is str:
+            _chains[key] = get_prompt(stage) | model | StrOutputParser()
+        elif output is None:
+            _chains[key] = get_prompt(stage) | model
+        else:
+            _chains[key] = get_prompt(stage) | model.with_structured_output(output)
+    return _chains[key]
+
+
+def build_prompts():
+    """Parse every prompt once during startup."""
+    for stage in sorted(os.listdir(PROMPTS_DIR)):
+        get_prompt(stage)
+    print(f"Loaded {len(_prompts)} prompts")
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import re
+import time
+import zlib
+from typing import Optional
+
+import numpy as np
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true") == "true"
+# Cosine similarity above which a stored answer is replayed
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "./data/semantic_cache.npz")
+# "auto" uses fastembed when it is installed, otherwise the hashing embedder
+SEMANTIC_CACHE_EMBEDDER = os.getenv("SEMANTIC_CACHE_EMBEDDER", "auto")
+# Seconds between saves while running, so a crash loses at most this much; 0 saves on shutdown only
+SEMANTIC_CACHE_SAVE_INTERVAL = float(os.getenv("SEMANTIC_CACHE_SAVE_INTERVAL", "300"))
+
+
+# ===========================================
+#                 EMBEDDERS
+# ===========================================
+class HashingEmbedder:
+    """
+    Dependency-free embedding: hashed words, word bigrams and character trigrams.
+    Good at near-identical questions (casing, punctuation, typos). Function words are
+    kept, at a lower weight, since they tell usage questions apart ("How do I use
+    'affect'?" vs "What does 'affect' mean?"), and bigrams keep some word order.
+    """
+
+    name = "hashing-v2"
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    function_words = {
+        "a", "an", "the", "is", "it", "i", "do", "does", "what", "what's", "how",
+        "to", "of", "and", "or", "my", "me", "can", "you", "should", "mean", "use",
+    }
+
+    def features(self, text: str) -> list[tuple[str, float]]:
+        words = [word.strip("'") for word in re.findall(r"[a-z0-9']+", text.lower())]
+        words = [word for word in words if word]
+        features = [
+            (f"w:{word}", 1.0 if word in self.function_words else 2.0) for word in words
+        ]
+        features += [(f"b:{first} {second}", 1.0) for first, second in zip(words, words[1:])]
+        for word in words:
+            if word in self.function_words:
+                continue
+            padded = f" {word} "
+            features += [(f"c:{padded[i:i + 3]}", 1.0) for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self.features(text):
+            vector[zlib.crc32(feature.encode()) % self.dim] += weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class FastEmbedEmbedder:
+    """Local ONNX sentence embeddings on CPU (pip install fastembed)."""
+
+    def __init__(self, model_name: str = "BAAI/bge-small-en-v1.5"):
+        from fastembed import TextEmbedding
+
+        self.name = model_name
+        self.model = TextEmbedding(model_name)
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(next(iter(self.model.embed([text]))), dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+def make_embedder(kind: str = SEMANTIC_CACHE_EMBEDDER):
+    """
+    fastembed downloads its model on first use, which can fail; the cache then runs
+    on the hashing embedder rather than taking the app down.
+    """
+    if kind in ("auto", "fastembed"):
+        try:
+            return FastEmbedEmbedder()
+        except ImportError:
+            if kind == "fastembed":
+                print("fastembed is not installed, using the hashing embedder")
+        except Exception as e:
+            print(f"Could not load the fastembed embedder, using the hashing embedder: {e!r}")
+    return HashingEmbedder()
+
+
+# ===========================================
+#                   CACHE
+# ===========================================
+class SemanticCache:
+    """
+    Nearest-neighbour cache of general answers over a NumPy matrix of unit vectors.
+    The least recently used entry is evicted once `max_entries` is reached.
+    Without an `embedder` one is made on first use (`start` does it off the event loop).
+    """
+
+    def __init__(
+        self,
+        embedder=None,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        save_interval: float = SEMANTIC_CACHE_SAVE_INTERVAL,
+    ):
+        self._embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+        self.vectors = None  # (n, dim)
+        self.entries = []  # {"question", "answer", "lastUsed", "hits"}
+        self.lookups = 0
+        self.hits = 0
+        self.changes = 0
+        self._saved_changes = 0
+        self._task = None
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = make_embedder()
+        return self._embedder
+
+    def __len__(self):
+        return len(self.entries)
+
+    def search(
+        self, question: str, vector: Optional[np.ndarray] = None
+    ) -> tuple[Optional[int], float]:
+        if not self.entries:
+            return None, 0.0
+        if vector is None:
+            vector = self.embedder.embed(question)
+        scores = self.vectors @ vector
+        index = int(np.argmax(scores))
+        return index, float(scores[index])
+
+    def lookup(self, question: str, vector: Optional[np.ndarray] = None) -> Optional[dict]:
+        self.lookups += 1
+        index, score = self.search(question, vector)
+        if index is None or score < self.threshold:
+            return None
+        self.hits += 1
+        self.changes += 1
+        entry = self.entries[index]
+        entry["lastUsed"] = time.time()
+        entry["hits"] += 1
+        return {**entry, "score": score}
+
+    def add(self, question: str, answer: str, vector: Optional[np.ndarray] = None):
+        if vector is None:
+            vector = self.embedder.embed(question)
+        vector = vector[None, :]
+        entry = {"question": question, "answer": answer, "lastUsed": time.time(), "hits": 0}
+        self.changes += 1
+
+        if len(self.entries) >= self.max_entries:
+            oldest = min(range(len(self.entries)), key=lambda i: self.entries[i]["lastUsed"])
+            self.entries[oldest] = entry
+            self.vectors[oldest] = vector
+            return
+
+        self.entries.append(entry)
+        self.vectors = vector if self.vectors is None else np.vstack([self.vectors, vector])
+
+    # Embedding runs in a thread; the matrix is only changed on the event loop
+    async def alookup(self, question: str) -> Optional[dict]:
+        return self.lookup(question, await asyncio.to_thread(self.embedder.embed, question))
+
+    async def aadd(self, question: str, answer: str):
+        self.add(question, answer, await asyncio.to_thread(self.embedder.embed, question))
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hitRate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+        }
+
+    # ===========================================
+    #                PERSISTENCE
+    # ===========================================
+    def _snapshot(self) -> dict:
+        """Copy the cache on the event loop so it can be written from a thread."""
+        self._saved_changes = self.changes
+        return {
+            "vectors": self.vectors.copy(),
+            "entries": np.array(json.dumps(self.entries)),
+            "embedder": np.array(self.embedder.name),
+        }
+
+    @staticmethod
+    def _write(path: str, snapshot: dict):
+        # Written next to the old file and swapped in, so a crash never leaves half a cache
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(f, **snapshot)
+        os.replace(f"{path}.tmp", path)
+
+    def save(self, path: str = SEMANTIC_CACHE_PATH):
+        if not self.entries:
+            return
+        self._write(path, self._snapshot())
+
+    def load(self, path: str = SEMANTIC_CACHE_PATH):
+        embedder_name = self.embedder.name  # makes the embedder even without a saved cache
+        if not os.path.exists(path):
+            return
+        data = np.load(path)
+        if str(data["embedder"]) != embedder_name:
+            print("Semantic cache was built with another embedder, starting empty")
+            return
+        self.vectors = data["vectors"]
+        self.entries = json.loads(str(data["entries"]))
+        print(f"Loaded {len(self.entries)} semantic cache entries")
+
+    async def _run(self, path: str):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            if not self.entries or self.changes == self._saved_changes:
+                continue
+            try:
+                await asyncio.to_thread(self._write, path, self._snapshot())
+            except Exception as e:
+                print(f"Could not save the semantic cache: {e!r}")
+
+    async def start(self, path: str = SEMANTIC_CACHE_PATH):
+        """Make the embedder and load the cache in a thread, then save every `save_interval`."""
+        await asyncio.to_thread(self.load, path)
+        if self.save_interval > 0:
+            self._task = asyncio.create_task(self._run(path))
+
+    async def stop(self, path: str = SEMANTIC_CACHE_PATH):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.save(path)
+
+
+semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
@@ -0,0 +1,54 @@
+import re
+from typing import Optional
+
+# Words outside the bold part from which the input is taken to be a sentence
+MIN_CONTEXT_WORDS = 3
+
+
+class SentenceClassifier:
+    """
+    Decides locally whether a vocabulary input is a sentence with a bolded word.
+    Returns None when the rules can't tell, and the caller asks the LLM instead.
+
+    Only inputs with **bold** markers matter: without them the workflow
+    treats the input as a word or phrase whatever the answer is.
+    """
+
+    def __init__(self, min_context_words: int = MIN_CONTEXT_WORDS):
+        self.min_context_words = min_context_words
+        self.local = 0
+        self.llm = 0
+
+    def predict(self, text: str) -> Optional[bool]:
+        if "**" not in text:
+            return False
+        context = " ".join(text.split("**")[0::2])
+        context_words = re.findall(r"[\w'’-]+", context)
+        if not context_words:
+            # The whole input is bolded
+            return False
+        if len(context_words) >= self.min_context_words:
+            return True
+        if re.search(r"[.!?]\W*$", text.strip()):
+            return True
+        return None
+
+    def classify(self, text: str) -> Optional[bool]:
+        """predict() and count whether the LLM call was avoided"""
+        prediction = self.predict(text)
+        if prediction is None:
+            self.llm += 1
+        else:
+            self.local += 1
+        return prediction
+
+    def stats(self) -> dict:
+        total = self.local + self.llm
+        return {
+            "local": self.local,
+            "llm": self.llm,
+            "llmAvoidedRate": round(self.local / total, 4) if total else 0.0,
+        }
+
+
+sentence_classifier = SentenceClassifier()
@@ -0,0 +1,146 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+    flight = single_flight.join(key, lambda: workflow.astream(...))
+    async for event in flight:
+        ...
+
+The first request for a key (the leader) starts the stream in a task; requests that join
+while it runs get every event from the beginning, then follow it live. Each request still
+builds and saves its own result from the events. The stream keeps running when the leader
+disconnects, and is cancelled once nobody is listening.
+"""
+
+import asyncio
+import os
+import re
+
+from app.tracing import tracer
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true") == "true"
+
+
+class FlightCancelled(Exception):
+    """The shared stream was cancelled before it finished."""
+
+
+def normalize_input(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def flight_key(type: str, input: str, user: dict, fields: tuple = ()) -> tuple:
+    """The request type, the normalized input and the profile fields the output depends on."""
+    return (type, normalize_input(input), *(user.get(field) or "" for field in fields))
+
+
+class _Flight:
+    def __init__(self, meta):
+        self.meta = meta
+        self.events = []
+        self.done = False
+        self.error = None
+        self.listeners = 0
+        self.changed = asyncio.Event()
+        self.task = None
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class Subscription:
+    def __init__(self, flight: _Flight, leader: bool, abandon):
+        self.flight = flight
+        self.leader = leader
+        self._abandon = abandon
+
+    @property
+    def meta(self):
+        """What the leader passed to join(), e.g. the profile it personalized for."""
+        return self.flight.meta
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        flight = self.flight
+        index = 0
+        try:
+            while True:
+                if index < len(flight.events):
+                    index += 1
+                    yield flight.events[index - 1]
+                    continue
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed.wait()
+        finally:
+            flight.listeners -= 1
+            if flight.listeners == 0 and not flight.done:
+                self._abandon()
+                # The run closes its model stream before the last listener is gone
+                await asyncio.gather(flight.task, return_exceptions=True)
+
+
+class SingleFlight:
+    def __init__(self, enabled: bool = SINGLE_FLIGHT_ENABLED):
+        self.enabled = enabled
+        self._flights = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def join(self, key, stream_factory, meta=None) -> Subscription:
+        """
+        Follow the running stream for `key`, or start `stream_factory()` as its leader.
+        """
+        flight = self._flights.get(key) if self.enabled else None
+        leader = flight is None
+        if leader:
+            flight = _Flight(meta)
+            if self.enabled:
+                self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, stream_factory))
+            self.leaders += 1
+        else:
+            self.followers += 1
+            span = tracer.current_span()
+            if span is not None:
+                span.set(coalesced=True)
+        flight.listeners += 1
+        return Subscription(flight, leader, lambda: self._abandon(key, flight))
+
+    def _abandon(self, key, flight: _Flight):
+        # Unlisted right away, so nobody joins a stream that is being cancelled
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        flight.task.cancel()
+
+    async def _run(self, key, flight: _Flight, stream_factory):
+        try:
+            async for event in stream_factory():
+                flight.events.append(event)
+                flight.notify()
+        except asyncio.CancelledError:
+            # Anyone still reading must not take the partial stream as complete
+            flight.error = FlightCancelled("The shared stream was cancelled")
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.notify()
+
+    def stats(self) -> dict:
+        total = self.leaders + self.followers
+        return {
+            "inFlight": len(self._flights),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "coalescedRate": round(self.followers / total, 4) if total else 0.0,
+        }
+
+
+single_flight = SingleFlight()
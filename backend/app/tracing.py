@@ -0,0 +1,338 @@
+"""
+Request tracing: spans for WebSocket requests, workflow nodes, LLM calls and Mongo operations.
+
+    with tracer.span("vocabulary.get_definition", kind="node"):
+        ...
+
+Spans nest through a context variable, so a node span is the parent of the LLM calls
+made inside it. Whether a trace is exported is decided once at its root span
+(TRACE_SAMPLE_RATE). Latency histograms for /metrics count every span, sampled or not.
+Sampled spans are buffered and exported in batches to a JSONL file or an OTLP/HTTP collector.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import httpx
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true") == "true"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+# "file", "otlp" or "none". Spans are only exported where configured: to OTLP when an
+# endpoint is set, otherwise nowhere.
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "otlp" if os.getenv("OTLP_ENDPOINT") else "none")
+TRACE_FILE = os.getenv("TRACE_FILE", "./data/traces.jsonl")
+# The file is rotated to TRACE_FILE.1 once it reaches this size
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(50 * 1024 * 1024)))
+OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_EXPORT_INTERVAL = float(os.getenv("TRACE_EXPORT_INTERVAL", "5"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+
+# Upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+_current_span = ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        parent: Optional["Span"],
+        sampled: bool,
+        attributes: dict,
+    ):
+        self.name = name
+        self.kind = kind  # "request", "node", "llm", "mongo"
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.sampled = sampled
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_time_ns = time.time_ns()
+        self.duration_ms = 0.0
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_time_ns,
+            "durationMs": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+# ===========================================
+#                  METRICS
+# ===========================================
+class LatencyHistograms:
+    """Cumulative latency histograms per (kind, name), in Prometheus text format."""
+
+    def __init__(self, buckets: list = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.series = {}  # (kind, name) -> {"counts": [...], "sum": float, "count": int}
+
+    def observe(self, kind: str, name: str, duration_ms: float):
+        series = self.series.setdefault(
+            (kind, name), {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        )
+        for i, bound in enumerate(self.buckets):
+            if duration_ms <= bound:
+                series["counts"][i] += 1
+        series["sum"] += duration_ms
+        series["count"] += 1
+
+    def prometheus(self) -> str:
+        metric = "englishtutor_span_duration_ms"
+        lines = [
+            f"# HELP {metric} Duration of requests, workflow nodes, LLM calls and Mongo operations",
+            f"# TYPE {metric} histogram",
+        ]
+        for (kind, name), series in sorted(self.series.items()):
+            labels = f'kind="{kind}",name="{name}"'
+            for bound, count in zip(self.buckets, series["counts"]):
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f"{metric}_sum{{{labels}}} {round(series['sum'], 3)}")
+            lines.append(f"{metric}_count{{{labels}}} {series['count']}")
+        return "\n".join(lines) + "\n"
+
+
+# ===========================================
+#                 EXPORTERS
+# ===========================================
+class JsonlSpanExporter:
+    def __init__(self, path: str = TRACE_FILE, max_bytes: int = TRACE_FILE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def _write(self, lines: list[str]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            # Keep one previous file
+            os.replace(self.path, f"{self.path}.1")
+        with open(self.path, "a") as f:
+            f.writelines(lines)
+
+    async def export(self, spans: list[Span]):
+        lines = [json.dumps(span.to_dict(), default=str) + "\n" for span in spans]
+        await asyncio.to_thread(self._write, lines)
+
+
+class OtlpSpanExporter:
+    """OTLP/HTTP with the JSON encoding, accepted by the OpenTelemetry Collector, Jaeger and Tempo."""
+
+    STATUS_CODES = {"ok": 1, "error": 2, "cancelled": 2}
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, service_name: str = "englishtutor-backend"):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.client = httpx.AsyncClient(timeout=10)
+
+    @staticmethod
+    def attribute(key: str, value) -> dict:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def to_otlp(self, span: Span) -> dict:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            # SERVER for requests, CLIENT for calls to other services, INTERNAL otherwise
+            "kind": {"request": 2, "llm": 3, "mongo": 3}.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_time_ns),
+            "endTimeUnixNano": str(span.start_time_ns + int(span.duration_ms * 1e6)),
+            "attributes": [
+                self.attribute(key, value)
+                for key, value in {"span.kind": span.kind, **span.attributes}.items()
+                if value is not None
+            ],
+            "status": {"code": self.STATUS_CODES[span.status]},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        return otlp_span
+
+    async def export(self, spans: list[Span]):
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [self.attribute("service.name", self.service_name)]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "app.tracing"},
+                            "spans": [self.to_otlp(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        response = await self.client.post(self.endpoint, json=payload)
+        response.raise_for_status()
+
+
+def make_exporter(kind: str = TRACE_EXPORTER):
+    if kind == "file":
+        return JsonlSpanExporter()
+    if kind == "otlp":
+        return OtlpSpanExporter()
+    return None
+
+
+# ===========================================
+#                  TRACER
+# ===========================================
+class Tracer:
+    def __init__(
+        self,
+        exporter=None,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        enabled: bool = TRACING_ENABLED,
+        buffer_size: int = TRACE_BUFFER_SIZE,
+        export_interval: float = TRACE_EXPORT_INTERVAL,
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+        self.export_interval = export_interval
+        self.histograms = LatencyHistograms()
+        self._buffer = deque(maxlen=buffer_size)
+        self._task = None
+        self.exported = 0
+        self.dropped = 0
+        self.export_errors = 0
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def _start(self, name: str, kind: str, attributes: dict) -> Span:
+        parent = _current_span.get()
+        sampled = parent.sampled if parent else random.random() < self.sample_rate
+        return Span(name, kind, parent, sampled, attributes)
+
+    def _finish(self, span: Span):
+        self.histograms.observe(span.kind, span.name, span.duration_ms)
+        if span.sampled and self.exporter is not None:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes):
+        if not self.enabled:
+            yield None
+            return
+        span = self._start(name, kind, attributes)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except asyncio.CancelledError:
+            span.status = "cancelled"
+            raise
+        except Exception as e:
+            span.status = "error"
+            span.set(error=str(e))
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record(self, name: str, kind: str, start_time_ns: int, duration_ms: float, **attributes):
+        """
+        Add a span that was timed elsewhere, e.g. a streamed LLM call, under the current span.
+        """
+        if not self.enabled:
+            return
+        span = self._start(name, kind, attributes)
+        span.start_time_ns = start_time_ns
+        span.duration_ms = duration_ms
+        self._finish(span)
+
+    # ===========================================
+    #                  EXPORT
+    # ===========================================
+    async def start(self):
+        if self.exporter is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.export_interval)
+            await self.flush()
+
+    async def flush(self):
+        if not self._buffer or self.exporter is None:
+            return
+        spans = list(self._buffer)
+        self._buffer.clear()
+        try:
+            await self.exporter.export(spans)
+            self.exported += len(spans)
+        except Exception as e:
+            print(f"Span export failed: {e}")
+            self.export_errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "sampleRate": self.sample_rate,
+            "buffered": len(self._buffer),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "exportErrors": self.export_errors,
+        }
+
+
+tracer = Tracer(make_exporter())
+
+
+def traced_node(workflow: str):
+    """
+    Decorate a workflow node so every run of it is a span named "<workflow>.<node>".
+    functools.wraps keeps the signature, which LangGraph inspects for `writer`/`config`.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(f"{workflow}.{func.__name__}", kind="node"):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,246 @@
+"""
+Retention for the LangGraph checkpoint collections.
+
+Every request is its own thread, so checkpoints pile up with nothing ever reading them back
+after the request. Two mechanisms bound them:
+
+    TTL       Mongo deletes checkpoints and writes CHECKPOINT_TTL_SECONDS after `created_at`
+              (stamped by BatchedMongoSaver; documents written before that are stamped
+              with the time retention first starts, so they expire a TTL later)
+    compact   checkpoints older than CHECKPOINT_COMPACTION_MIN_AGE seconds are deleted
+              unless they are the latest of their thread, along with their writes
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import DeleteMany
+from pymongo.errors import OperationFailure
+
+CHECKPOINT_RETENTION_ENABLED = os.getenv("CHECKPOINT_RETENTION_ENABLED", "true") == "true"
+# 0 disables the TTL indexes
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(7 * 24 * 3600)))
+CHECKPOINT_COMPACTION_INTERVAL = float(os.getenv("CHECKPOINT_COMPACTION_INTERVAL", "3600"))
+CHECKPOINT_COMPACTION_MIN_AGE = float(os.getenv("CHECKPOINT_COMPACTION_MIN_AGE", "600"))
+# Threads per delete batch
+CHECKPOINT_COMPACTION_BATCH_SIZE = int(os.getenv("CHECKPOINT_COMPACTION_BATCH_SIZE", "500"))
+CHECKPOINT_COMPACTION_MAX_BATCHES = int(os.getenv("CHECKPOINT_COMPACTION_MAX_BATCHES", "100"))
+
+INDEX_OPTIONS_CONFLICT = 85
+
+
+class CheckpointRetention:
+    def __init__(
+        self,
+        ttl_seconds: int = CHECKPOINT_TTL_SECONDS,
+        interval: float = CHECKPOINT_COMPACTION_INTERVAL,
+        min_age: float = CHECKPOINT_COMPACTION_MIN_AGE,
+        batch_size: int = CHECKPOINT_COMPACTION_BATCH_SIZE,
+        max_batches: int = CHECKPOINT_COMPACTION_MAX_BATCHES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.interval = interval
+        self.min_age = min_age
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.checkpoints = None
+        self.writes = None
+        self._task = None
+        self.runs = 0
+        self.batches = 0
+        self.threads_compacted = 0
+        self.backfilled = 0
+        self.checkpoints_deleted = 0
+        self.writes_deleted = 0
+        self.bytes_reclaimed = 0
+        self.batch_ms_total = 0.0
+        self.last_run = None
+
+    def attach(self, checkpointer):
+        """Use the collections of an AsyncMongoDBSaver (or BatchedMongoSaver)."""
+        # Reads and deletes skip BatchedMongoSaver's write buffers
+        self.checkpoints = getattr(
+            checkpointer.checkpoint_collection, "collection", checkpointer.checkpoint_collection
+        )
+        self.writes = getattr(
+            checkpointer.writes_collection, "collection", checkpointer.writes_collection
+        )
+
+    # ===========================================
+    #                  INDEXES
+    # ===========================================
+    async def _ensure_ttl_index(self, collection):
+        try:
+            await collection.create_index(
+                "created_at", expireAfterSeconds=self.ttl_seconds, name="created_at_ttl"
+            )
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # The TTL changed since the index was created
+            await collection.database.command(
+                {
+                    "collMod": collection.name,
+                    "index": {"name": "created_at_ttl", "expireAfterSeconds": self.ttl_seconds},
+                }
+            )
+
+    async def ensure_indexes(self):
+        await self.checkpoints.create_index(
+            [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)]
+        )
+        await self.writes.create_index(
+            [("thread_id", 1), ("checkpoint_ns", 1), ("checkpoint_id", -1)]
+        )
+        if self.ttl_seconds > 0:
+            await self._ensure_ttl_index(self.checkpoints)
+            await self._ensure_ttl_index(self.writes)
+
+    # ===========================================
+    #                 COMPACTION
+    # ===========================================
+    async def _average_size(self, collection):
+        try:
+            stats = await collection.database.command({"collStats": collection.name})
+            return stats.get("avgObjSize", 0)
+        except Exception:
+            return None
+
+    async def backfill_created_at(self) -> int:
+        """Stamp documents written before `created_at` existed, so the TTL covers them."""
+        now = datetime.now(timezone.utc)
+        stamped = 0
+        for collection in (self.checkpoints, self.writes):
+            # Uses the TTL index, which holds missing fields as null
+            result = await collection.update_many(
+                {"created_at": None}, {"$set": {"created_at": now}}
+            )
+            stamped += result.modified_count
+        self.backfilled += stamped
+        return stamped
+
+    def _compactable_threads(self):
+        """
+        Threads with more than one checkpoint older than the cutoff, and the newest of
+        those. Only old checkpoints are scanned (through the created_at index).
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.min_age)
+        return self.checkpoints.aggregate(
+            [
+                {"$match": {"created_at": {"$lt": cutoff}}},
+                {
+                    "$group": {
+                        "_id": {"thread_id": "$thread_id", "checkpoint_ns": "$checkpoint_ns"},
+                        # Checkpoint ids are time-ordered (uuid6)
+                        "keep": {"$max": "$checkpoint_id"},
+                        "count": {"$sum": 1},
+                    }
+                },
+                {"$match": {"count": {"$gt": 1}}},
+            ],
+            allowDiskUse=True,
+            batchSize=self.batch_size,
+        )
+
+    async def compact_batch(self, threads: list[dict]) -> dict:
+        """
+        Delete the checkpoints (and writes) of each thread that come before its newest
+        old checkpoint. Newer checkpoints aren't touched, so a thread always keeps its
+        latest state.
+        """
+        start = time.perf_counter()
+        operations = [
+            DeleteMany({**thread["_id"], "checkpoint_id": {"$lt": thread["keep"]}})
+            for thread in threads
+        ]
+        checkpoint_size = await self._average_size(self.checkpoints)
+        writes_size = await self._average_size(self.writes)
+        checkpoints = await self.checkpoints.bulk_write(operations, ordered=False)
+        writes = await self.writes.bulk_write(operations, ordered=False)
+        report = {
+            "threads": len(threads),
+            "checkpoints": checkpoints.deleted_count,
+            "writes": writes.deleted_count,
+            "bytes": None,
+        }
+        if checkpoint_size is not None and writes_size is not None:
+            # Estimated from the average document size; Mongo reuses the space
+            report["bytes"] = int(
+                report["checkpoints"] * checkpoint_size + report["writes"] * writes_size
+            )
+        report["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return report
+
+    async def run_once(self) -> dict:
+        """Scan the old checkpoints once and compact their threads in batches."""
+        batches = []
+        threads = []
+        async for thread in self._compactable_threads():
+            threads.append(thread)
+            if len(threads) == self.batch_size:
+                batches.append(await self._compact(threads))
+                threads = []
+                if len(batches) == self.max_batches:
+                    break
+        if threads:
+            batches.append(await self._compact(threads))
+        self.runs += 1
+        self.last_run = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "batches": batches,
+        }
+        return self.last_run
+
+    async def _compact(self, threads: list[dict]) -> dict:
+        report = await self.compact_batch(threads)
+        self.batches += 1
+        self.threads_compacted += report["threads"]
+        self.checkpoints_deleted += report["checkpoints"]
+        self.writes_deleted += report["writes"]
+        self.bytes_reclaimed += report["bytes"] or 0
+        self.batch_ms_total += report["ms"]
+        print(f"Compacted checkpoints: {report}")
+        return report
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Checkpoint compaction failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self, checkpointer):
+        self.attach(checkpointer)
+        await self.ensure_indexes()
+        await self.backfill_created_at()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "ttlSeconds": self.ttl_seconds,
+            "runs": self.runs,
+            "batches": self.batches,
+            "threadsCompacted": self.threads_compacted,
+            "backfilled": self.backfilled,
+            "checkpointsDeleted": self.checkpoints_deleted,
+            "writesDeleted": self.writes_deleted,
+            "bytesReclaimed": self.bytes_reclaimed,
+            "avgBatchMs": round(self.batch_ms_total / self.batches, 2) if self.batches else 0.0,
+            "lastRun": self.last_run,
+        }
+
+
+checkpoint_retention = CheckpointRetention()
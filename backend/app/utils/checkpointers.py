@@ -0,0 +1,225 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from langgraph.checkpoint.base import WRITES_IDX_MAP
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+from pymongo import UpdateOne
+
+MEMORY_CHECKPOINTER_MAX_THREADS = int(os.getenv("MEMORY_CHECKPOINTER_MAX_THREADS", "1000"))
+MONGO_CHECKPOINTER_BATCH_SIZE = int(os.getenv("MONGO_CHECKPOINTER_BATCH_SIZE", "100"))
+MONGO_CHECKPOINTER_FLUSH_INTERVAL = float(os.getenv("MONGO_CHECKPOINTER_FLUSH_INTERVAL", "1"))
+# Queued operations per collection; beyond it (e.g. while Mongo is down) the oldest are dropped
+MONGO_CHECKPOINTER_MAX_PENDING = int(os.getenv("MONGO_CHECKPOINTER_MAX_PENDING", "10000"))
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    In-memory checkpointer that keeps only the `max_threads` most recently written threads.
+    """
+
+    def __init__(self, max_threads: int = MEMORY_CHECKPOINTER_MAX_THREADS):
+        super().__init__()
+        self.max_threads = max_threads
+        self._threads = OrderedDict()
+        self.evicted = 0
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        self._threads[thread_id] = True
+        self._threads.move_to_end(thread_id)
+        while len(self._threads) > self.max_threads:
+            oldest, _ = self._threads.popitem(last=False)
+            self.delete_thread(oldest)
+            self.evicted += 1
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def stats(self) -> dict:
+        return {"threads": len(self._threads), "evicted": self.evicted}
+
+
+def with_created_at(update: dict) -> dict:
+    """Stamp documents with their insert time, which the retention TTL indexes expire on."""
+    on_insert = {**update.get("$setOnInsert", {}), "created_at": datetime.now(timezone.utc)}
+    return {**update, "$setOnInsert": on_insert}
+
+
+class _BufferedCollection:
+    """
+    Stands in for a checkpointer collection: writes are queued as bulk operations,
+    everything else goes to the real collection.
+    """
+
+    def __init__(self, collection, max_operations: int = MONGO_CHECKPOINTER_MAX_PENDING):
+        self.collection = collection
+        self.max_operations = max_operations
+        self.operations = []
+        self.dropped = 0
+
+    def queue(self, operations: list, front: bool = False):
+        self.operations = operations + self.operations if front else self.operations + operations
+        overflow = len(self.operations) - self.max_operations
+        if overflow > 0:
+            # The oldest go first: later checkpoints supersede them for resuming a thread
+            del self.operations[:overflow]
+            self.dropped += overflow
+
+    async def update_one(self, filter, update, upsert=False):
+        self.queue([UpdateOne(filter, with_created_at(update), upsert=upsert)])
+
+    async def bulk_write(self, operations, **kwargs):
+        self.queue(list(operations))
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+class BatchedMongoSaver(AsyncMongoDBSaver):
+    """
+    AsyncMongoDBSaver whose checkpoint and write upserts are queued and sent with one
+    ordered bulk_write per collection, every `flush_interval` seconds or once `batch_size`
+    operations are queued. Runs never wait on Mongo writes; reading a thread that still
+    has queued writes flushes first, so it is resumed from everything it wrote.
+    While flushes fail, each collection keeps at most `max_pending` operations and drops
+    the oldest (counted in `stats()`), so an outage can't exhaust memory.
+    """
+
+    def __init__(
+        self,
+        client,
+        batch_size: int = MONGO_CHECKPOINTER_BATCH_SIZE,
+        flush_interval: float = MONGO_CHECKPOINTER_FLUSH_INTERVAL,
+        max_pending: int = MONGO_CHECKPOINTER_MAX_PENDING,
+        **kwargs,
+    ):
+        super().__init__(client, **kwargs)
+        self.checkpoint_collection = _BufferedCollection(self.checkpoint_collection, max_pending)
+        self.writes_collection = _BufferedCollection(self.writes_collection, max_pending)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._task = None
+        self._lock = asyncio.Lock()
+        self._batch_full = asyncio.Event()
+        self._pending_threads = set()
+        self.operations = 0
+        self.batches = 0
+        self.failed_flushes = 0
+        self.flush_ms_total = 0.0
+
+    @property
+    def pending(self) -> int:
+        return len(self.checkpoint_collection.operations) + len(
+            self.writes_collection.operations
+        )
+
+    def has_pending(self, thread_id) -> bool:
+        return thread_id in self._pending_threads
+
+    async def flush(self):
+        async with self._lock:
+            threads, self._pending_threads = self._pending_threads, set()
+            self._batch_full.clear()
+            for buffered in (self.checkpoint_collection, self.writes_collection):
+                operations, buffered.operations = buffered.operations, []
+                if not operations:
+                    continue
+                start = time.perf_counter()
+                try:
+                    # Ordered, so a later write to the same key wins as it would unbatched
+                    await buffered.collection.bulk_write(operations, ordered=True)
+                except Exception:
+                    # Upserts are idempotent, so the whole batch is simply sent again
+                    buffered.queue(operations, front=True)
+                    self._pending_threads |= threads
+                    self.failed_flushes += 1
+                    raise
+                self.flush_ms_total += (time.perf_counter() - start) * 1000
+                self.operations += len(operations)
+                self.batches += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Checkpoint flush failed: {e}")
+
+    async def _after_write(self, config):
+        self._pending_threads.add(config["configurable"]["thread_id"])
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        if self.pending >= self.batch_size:
+            self._batch_full.set()
+
+    # ===========================================
+    #             CHECKPOINTER API
+    # ===========================================
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        next_config = await super().aput(config, checkpoint, metadata, new_versions)
+        await self._after_write(config)
+        return next_config
+
+    async def aput_writes(self, config, writes, task_id):
+        # As AsyncMongoDBSaver.aput_writes, with created_at on each write
+        configurable = config["configurable"]
+        # Existing writes are only replaced if they were errors or interrupts
+        set_method = "$set" if all(w[0] in WRITES_IDX_MAP for w in writes) else "$setOnInsert"
+        operations = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized_value = self.serde.dumps_typed(value)
+            operations.append(
+                UpdateOne(
+                    {
+                        "thread_id": configurable["thread_id"],
+                        "checkpoint_ns": configurable["checkpoint_ns"],
+                        "checkpoint_id": configurable["checkpoint_id"],
+                        "task_id": task_id,
+                        "idx": WRITES_IDX_MAP.get(channel, idx),
+                    },
+                    with_created_at(
+                        {set_method: {"channel": channel, "type": type_, "value": serialized_value}}
+                    ),
+                    upsert=True,
+                )
+            )
+        await self.writes_collection.bulk_write(operations)
+        await self._after_write(config)
+
+    async def aget_tuple(self, config):
+        if self.has_pending(config["configurable"]["thread_id"]):
+            await self.flush()
+        return await super().aget_tuple(config)
+
+    async def alist(self, config, **kwargs):
+        if config is None or self.has_pending(config["configurable"]["thread_id"]):
+            await self.flush()
+        async for checkpoint_tuple in super().alist(config, **kwargs):
+            yield checkpoint_tuple
+
+    async def close(self):
+        """Stop the flush task and write everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "operations": self.operations,
+            "batches": self.batches,
+            "failedFlushes": self.failed_flushes,
+            "dropped": self.checkpoint_collection.dropped + self.writes_collection.dropped,
+            "avgFlushMs": round(self.flush_ms_total / self.batches, 2) if self.batches else 0.0,
+        }
@@ -1,15 +1,111 @@
+import json
 import os
+import time
 
-from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
 from pymongo import AsyncMongoClient
 
-async def compile_graph_with_async_checkpointer(graph, graph_name):
-    mongodb_client = AsyncMongoClient(os.getenv("MONGODB_URI_LANGGRAPH_CHECKPOINTER"))
-    checkpointer = AsyncMongoDBSaver(mongodb_client)
+from app.utils.checkpointers import BatchedMongoSaver, BoundedMemorySaver
 
-    graph = graph.compile(checkpointer=checkpointer)
+# Checkpointer per workflow: "none" (no checkpoints), "memory" (bounded, in-process)
+# or "mongo" (persisted with batched writes, so threads can be resumed after a restart).
+# The request workflows never read a thread back, so by default they skip checkpoints.
+CHECKPOINTER_POLICY = os.getenv("CHECKPOINTER_POLICY", "none")
+CHECKPOINTER_POLICIES = json.loads(os.getenv("CHECKPOINTER_POLICIES", "{}"))
 
-    with open(f"./app/workflow_diagrams/{graph_name}.png", "wb") as f:
-        f.write(graph.get_graph(xray=1).draw_mermaid_png())
+# One checkpointer client shared by every compiled workflow
+checkpointer_client = None
+mongo_checkpointer = None
+memory_checkpointer = None
 
-    return graph
+# graph name -> compiled workflow
+compiled_workflows = {}
+
+
+def checkpointer_policy(graph_name: str) -> str:
+    return CHECKPOINTER_POLICIES.get(graph_name, CHECKPOINTER_POLICY)
+
+
+def uses_mongo_checkpointer() -> bool:
+    return "mongo" in (CHECKPOINTER_POLICY, *CHECKPOINTER_POLICIES.values())
+
+
+def get_checkpointer():
+    global checkpointer_client, mongo_checkpointer
+    if mongo_checkpointer is None:
+        checkpointer_client = AsyncMongoClient(
+            os.getenv("MONGODB_URI_LANGGRAPH_CHECKPOINTER")
+        )
+        mongo_checkpointer = BatchedMongoSaver(checkpointer_client)
+    return mongo_checkpointer
+
+
+def get_memory_checkpointer():
+    global memory_checkpointer
+    if memory_checkpointer is None:
+        memory_checkpointer = BoundedMemorySaver()
+    return memory_checkpointer
+
+
+def checkpointer_for(graph_name: str):
+    policy = checkpointer_policy(graph_name)
+    if policy == "mongo":
+        return get_checkpointer()
+    if policy == "memory":
+        return get_memory_checkpointer()
+    if policy == "none":
+        return None
+    raise ValueError(f"Unknown checkpointer policy for '{graph_name}': {policy}")
+
+
+async def compile_graph_with_async_checkpointer(graph, graph_name, checkpointer=None):
+    # Diagrams are rendered offline with `python -m app.utils.export_diagrams`
+    if checkpointer is None:
+        checkpointer = checkpointer_for(graph_name)
+    return graph.compile(checkpointer=checkpointer)
+
+
+async def compile_workflows(graphs: dict, checkpointer=None) -> dict:
+    """
+    Compile every graph once and keep them in the registry.
+    Returns the warm-up report: graph name -> compile time in milliseconds.
+    """
+    report = {}
+    for graph_name, graph in graphs.items():
+        start = time.perf_counter()
+        compiled_workflows[graph_name] = await compile_graph_with_async_checkpointer(
+            graph, graph_name, checkpointer
+        )
+        report[graph_name] = round((time.perf_counter() - start) * 1000, 2)
+        print(f"Compiled workflow '{graph_name}' in {report[graph_name]}ms")
+    return report
+
+
+async def get_workflow(graph, graph_name):
+    """
+    Return the compiled workflow from the registry.
+    Falls back to compiling it on first use when lifespan didn't run (e.g. tests).
+    """
+    if graph_name not in compiled_workflows:
+        await compile_workflows({graph_name: graph})
+    return compiled_workflows[graph_name]
+
+
+def checkpointer_stats() -> dict:
+    return {
+        "policies": {
+            graph_name: checkpointer_policy(graph_name) for graph_name in compiled_workflows
+        },
+        "memory": memory_checkpointer.stats() if memory_checkpointer else None,
+        "mongo": mongo_checkpointer.stats() if mongo_checkpointer else None,
+    }
+
+
+async def close_checkpointer():
+    global checkpointer_client, mongo_checkpointer
+    if mongo_checkpointer is not None:
+        await mongo_checkpointer.close()
+        mongo_checkpointer = None
+    if checkpointer_client is not None:
+        await checkpointer_client.close()
+        checkpointer_client = None
+    compiled_workflows.clear()
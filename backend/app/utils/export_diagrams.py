@@ -0,0 +1,71 @@
+"""
+Export Mermaid diagrams for every workflow graph in app/workflows.
+
+Run from the backend directory:
+    python -m app.utils.export_diagrams
+    python -m app.utils.export_diagrams --format mermaid --format png --output ./app/workflow_diagrams
+
+Only the Mermaid sources are committed; PNGs are rendered on demand and git-ignored,
+so they can't go stale when a graph changes.
+"""
+
+import argparse
+import importlib
+import os
+import pkgutil
+
+from langgraph.graph import StateGraph
+
+import app.workflows
+
+DIAGRAM_DIR = "./app/workflow_diagrams"
+
+
+def find_graphs() -> dict:
+    """Collect the module-level StateGraph `g` of each workflow module."""
+    graphs = {}
+    for module_info in pkgutil.iter_modules(app.workflows.__path__):
+        module = importlib.import_module(f"app.workflows.{module_info.name}")
+        graph = getattr(module, "g", None)
+        if isinstance(graph, StateGraph):
+            graphs[module_info.name] = graph
+    return graphs
+
+
+def export_diagrams(output_dir: str = DIAGRAM_DIR, formats=("mermaid",)):
+    os.makedirs(output_dir, exist_ok=True)
+
+    for graph_name, graph in sorted(find_graphs().items()):
+        drawable = graph.compile().get_graph(xray=1)
+
+        if "mermaid" in formats:
+            path = os.path.join(output_dir, f"{graph_name}.mmd")
+            with open(path, "w") as f:
+                f.write(drawable.draw_mermaid())
+            print(f"Exported {path}")
+
+        if "png" in formats:
+            # draw_mermaid_png renders through the remote Mermaid API by default
+            path = os.path.join(output_dir, f"{graph_name}.png")
+            try:
+                png = drawable.draw_mermaid_png()
+            except Exception as e:
+                print(f"Failed to render {path}: {e}")
+                continue
+            with open(path, "wb") as f:
+                f.write(png)
+            print(f"Exported {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default=DIAGRAM_DIR)
+    parser.add_argument(
+        "--format",
+        choices=["mermaid", "png"],
+        action="append",
+        help="Repeat to export several formats. Defaults to mermaid.",
+    )
+    args = parser.parse_args()
+
+    export_diagrams(args.output, tuple(args.format or ("mermaid",)))
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+
+def _fake_value(schema: dict, name: str, defs: dict):
+    """Build a deterministic value that satisfies a JSON schema."""
+    if "$ref" in schema:
+        schema = defs[schema["$ref"].split("/")[-1]]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        return _fake_value(schema["anyOf"][0], name, defs)
+
+    schema_type = schema.get("type")
+    if schema_type == "object":
+        return {
+            key: _fake_value(value, key, defs)
+            for key, value in schema.get("properties", {}).items()
+        }
+    if schema_type == "array":
+        return [
+            _fake_value(schema.get("items", {}), f"{name} {i + 1}", defs)
+            for i in range(3)
+        ]
+    if schema_type == "boolean":
+        return False
+    if schema_type in ("integer", "number"):
+        return 0
+    return f"fake {name}"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic local chat model that stands in for OpenAI in tests and benchmarks.
+    Streams one word per token and sleeps `token_latency` seconds between tokens.
+    Supports `with_structured_output` by answering tool calls with values built from the schema.
+    `stalls` injects extra delays before the first token, one per call in order.
+    """
+
+    model_name: str = "fake-chat-model"
+    temperature: float = 0.0
+    token_latency: float = 0.0
+    first_token_latency: float = 0.0
+    response_tokens: int = 20
+    responder: Optional[Callable[[str], str]] = None
+    # (prompt, tool name) -> tool call arguments, overrides the schema-built values
+    tool_responder: Optional[Callable[[str, str], dict]] = None
+    # Every call as {"prompt": str, "prompt_tokens": int, "tool": Optional[str]}
+    calls: List[dict] = Field(default_factory=list)
+    # Extra seconds before the first token of the next calls, e.g. [30] stalls one call
+    stalls: List[float] = Field(default_factory=list)
+    # Async calls running right now, and the most that ever ran at once
+    active_calls: int = 0
+    max_active_calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name, "temperature": self.temperature}
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(
+            tools=[convert_to_openai_tool(tool) for tool in tools],
+            tool_choice=tool_choice,
+            **kwargs,
+        )
+
+    # ===========================================
+    #                  OUTPUT
+    # ===========================================
+    def _record(self, messages: List[BaseMessage], tools) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        self.calls.append(
+            {
+                "prompt": prompt,
+                "prompt_tokens": len(prompt.split()),
+                "tool": tools[0]["function"]["name"] if tools else None,
+            }
+        )
+        return prompt
+
+    def _text(self, prompt: str) -> str:
+        if self.responder:
+            return self.responder(prompt)
+        return " ".join(f"token{i}" for i in range(self.response_tokens))
+
+    def _tool_call(self, prompt: str, tools) -> dict:
+        function = tools[0]["function"]
+        parameters = function.get("parameters", {})
+        args = self.tool_responder(prompt, function["name"]) if self.tool_responder else None
+        if args is None:
+            # The responder only handles some tools, the rest get schema values
+            args = _fake_value(parameters, function["name"], parameters.get("$defs", {}))
+        return {
+            "name": function["name"],
+            "args": args,
+            "id": f"call_{uuid.uuid4().hex[:8]}",
+        }
+
+    def _stall(self) -> float:
+        return self.stalls.pop(0) if self.stalls else 0.0
+
+    def _enter(self):
+        self.active_calls += 1
+        self.max_active_calls = max(self.max_active_calls, self.active_calls)
+
+    def _usage(self, prompt: str, output: str) -> dict:
+        input_tokens = len(prompt.split())
+        output_tokens = len(output.split())
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _message(self, messages, tools) -> AIMessage:
+        prompt = self._record(messages, tools)
+        if tools:
+            tool_call = self._tool_call(prompt, tools)
+            return AIMessage(
+                content="",
+                tool_calls=[tool_call],
+                usage_metadata=self._usage(prompt, json.dumps(tool_call["args"])),
+            )
+        text = self._text(prompt)
+        return AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+
+    def _chunks(self, messages, tools) -> Iterator[AIMessageChunk]:
+        prompt = self._record(messages, tools)
+        if tools:
+            tool_call = self._tool_call(prompt, tools)
+            arguments = json.dumps(tool_call["args"])
+            pieces = [arguments[i : i + 8] for i in range(0, len(arguments), 8)]
+            for i, piece in enumerate(pieces):
+                yield AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": tool_call["name"] if i == 0 else None,
+                            "args": piece,
+                            "id": tool_call["id"] if i == 0 else None,
+                            "index": 0,
+                        }
+                    ],
+                )
+            output = arguments
+        else:
+            output = self._text(prompt)
+            words = output.split(" ")
+            for i, word in enumerate(words):
+                yield AIMessageChunk(content=word if i == 0 else f" {word}")
+        yield AIMessageChunk(content="", usage_metadata=self._usage(prompt, output))
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._message(messages, kwargs.get("tools"))
+        time.sleep(
+            self._stall() + self.first_token_latency + self.token_latency * self.response_tokens
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self._enter()
+        try:
+            message = self._message(messages, kwargs.get("tools"))
+            await asyncio.sleep(
+                self._stall() + self.first_token_latency + self.token_latency * self.response_tokens
+            )
+        finally:
+            self.active_calls -= 1
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._stall() + self.first_token_latency)
+        for chunk in self._chunks(messages, kwargs.get("tools")):
+            time.sleep(self.token_latency)
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=chunk)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        self._enter()
+        try:
+            await asyncio.sleep(self._stall() + self.first_token_latency)
+            for chunk in self._chunks(messages, kwargs.get("tools")):
+                await asyncio.sleep(self.token_latency)
+                if run_manager and chunk.content:
+                    await run_manager.on_llm_new_token(chunk.content, chunk=chunk)
+                yield ChatGenerationChunk(message=chunk)
+        finally:
+            self.active_calls -= 1
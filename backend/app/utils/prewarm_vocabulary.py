@@ -0,0 +1,78 @@
+"""
+Pre-warm the shared vocabulary store from a word list.
+
+Run from the backend directory:
+    python -m app.utils.prewarm_vocabulary words.txt --languages Korean Japanese
+
+The word list has one word or phrase per line; blank lines and lines starting with # are skipped.
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.db.vocabulary_store import vocabulary_store, get_translation
+from app.state import OverallState
+from app.workflows.vocabulary import (
+    correct_input,
+    get_definition,
+    translate_to_mother_tongue,
+)
+
+
+def read_words(path: str) -> list[str]:
+    with open(path) as f:
+        return [
+            line.strip() for line in f if line.strip() and not line.startswith("#")
+        ]
+
+
+async def prewarm_word(word: str, languages: list[str]) -> bool:
+    """Fill in whatever is missing for one word. Returns True if the LLM was called."""
+    writer = lambda _: None
+    entry = await vocabulary_store.find(word)
+    missing = not entry or not entry.get("definition") or any(
+        not get_translation(entry, language) for language in languages
+    )
+    if not missing:
+        return False
+
+    state = OverallState(thread_id="prewarm", input=word)
+    state.vocabulary = (await correct_input(state, writer))["vocabulary"]
+    await get_definition(state, writer)
+    for language in languages:
+        state.motherTongue = language
+        await translate_to_mother_tongue(state, writer)
+    return True
+
+
+async def prewarm(words: list[str], languages: list[str], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    await vocabulary_store.ensure_indexes()
+
+    async def run(word):
+        async with semaphore:
+            try:
+                return await prewarm_word(word, languages)
+            except Exception as e:
+                print(f"Failed to pre-warm '{word}': {e}")
+                return False
+
+    start = time.perf_counter()
+    generated = await asyncio.gather(*[run(word) for word in words])
+    await vocabulary_store.flush()
+    print(
+        f"Pre-warmed {sum(generated)} of {len(words)} words "
+        f"({len(words) - sum(generated)} already complete) "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("word_list")
+    parser.add_argument("--languages", nargs="*", default=[])
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    asyncio.run(prewarm(read_words(args.word_list), args.languages, args.concurrency))
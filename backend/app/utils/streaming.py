@@ -0,0 +1,31 @@
+from langgraph.types import StreamWriter
+
+
+async def astream_text(chain, inputs: dict, writer: StreamWriter, field: str) -> str:
+    """
+    Stream a text chain token by token as `{"delta": {"field", "text"}}` frames
+    and return the full text. The node still writes the final value itself.
+    """
+    text = ""
+    async for token in chain.astream(inputs):
+        if not token:
+            continue
+        text += token
+        writer({"delta": {"field": field, "text": token}})
+    return text
+
+
+def list_deltas(previous: list[str], current: list[str]):
+    """
+    Yield (index, text, replace) for what changed between two snapshots of a
+    streamed list of strings. Items normally only grow, so `text` is the appended
+    part; an item that changed otherwise is sent whole with `replace=True`.
+    """
+    for index, item in enumerate(current):
+        before = previous[index] if index < len(previous) else ""
+        if item == before and index < len(previous):
+            continue
+        if item.startswith(before):
+            yield index, item[len(before):], False
+        else:
+            yield index, item, True
@@ -1,3 +1,4 @@
+import os
 from varname import nameof as n
 from enum import Enum
 from pydantic import BaseModel, Field
@@ -5,29 +6,46 @@ from pydantic import BaseModel, Field
 from langgraph.graph import START, END, StateGraph
 from langgraph.types import StreamWriter, Command
 
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from langchain_core.runnables import RunnableConfig
 
 from app.state import OverallState, InputState, OutputState
-from app.llm import chat_model
+from app.prompt_registry import get_chain
+from app.tracing import traced_node
 from app.models import CorrectionItem
+from app.utils.streaming import astream_text
 
+# "batch": one streamed call for every explanation, "loop": one call per explanation
+EXPLANATION_MODE = os.getenv("CORRECTION_EXPLANATION_MODE", "batch")
 
-def correct_input(state: OverallState, writer: StreamWriter):
-    print("\n>>> NODE: correct_input")
 
-    corrected_input = (
-        ChatPromptTemplate.from_template(
-            """You are a experienced ESL tutor. Your student asked you to look at their Enlglish expression or writing. Here is what they showed you: {input}
-As an ESL teacher and a native English speaker, think if there is any grammatical errors or awkward expressions. If so, correct them and return it without any explanation or preambles such as "This sentence is grammatically correct:". Only return the corrected text."""
-        )
-        | chat_model
-        | StrOutputParser()
-    ).invoke(
+class Goto(str, Enum):
+    END = "__end__"
+    GENERATE_EXPLANATION = "generate_explanation"
+
+
+class ExplanationResponse(BaseModel):
+    explanation: CorrectionItem
+    goto: Goto = Field(
+        description="If there is no more explanation, return END. Otherwise, return generate_explanation"
+    )
+
+
+class ExplanationsResponse(BaseModel):
+    corrections: list[CorrectionItem] = Field(
+        description="Explanations for the corrections, more important ones first. Empty if there is nothing to explain."
+    )
+
+
+@traced_node("correction")
+async def correct_input(state: OverallState, writer: StreamWriter):
+    corrected_input = await astream_text(
+        get_chain("correction.correct_input"),
         {
             "input": state.input,
-        }
+        },
+        writer,
+        "correctedText",
     )
 
     # Stream the output via StreamWriter
@@ -38,59 +56,11 @@ As an ESL teacher and a native English speaker, think if there is any grammatica
     }
 
 
-def generate_explanation(state: OverallState, writer: StreamWriter):
-    print("\n>>> NODE: generate_explanation")
-
-    class Goto(str, Enum):
-        END = "__end__"
-        GENERATE_EXPLANATION = "generate_explanation"
-
-    class ExplanationResponse(BaseModel):
-        explanation: CorrectionItem
-        goto: Goto = Field(
-            description="If there is no more explanation, return END. Otherwise, return generate_explanation"
-        )
-
-    response = (
-        ChatPromptTemplate.from_template(
-            """You are a experienced ESL tutor. Your student asked you to look at their Enlglish expression or writing and improve it.
-Here is their original: {input}
-Here it your corrected version: {correctedText}
-The user's Enlgish level is: {englishLevel}
-
-Now you have to give explanations for your corrections one by one.
-
-Here is the explanations that you have already given: 
-{corrections}
-
-If you don't have any more explanations, return END for 'goto' field with empty string for 'explanation' field.
-If there is more explanations, then return generate_explanation for 'goto' field with the explanation for 'explanation' field.
-
----
-
-Example:
-
-input: However I go store everyday
-
-corrected version: However, I go to the store every day.
-
-explanation:
-
-    correction: go → go to
-    explanation: **to** must come after the verb **go** to show direction or a destination. 
-
-    correction: store → the store
-    explanation: add **the** before **store** because it shows we’re talking about a specific store, not just any store. In English, **the** helps make it clear which place we mean.
-
----
-
-Important!!
-- Don't explain corrections related to minor spelling errors, capitalizations, and punctuations.
-- Explain more important corrections first
-"""
-        )
-        | chat_model.with_structured_output(ExplanationResponse)
-    ).invoke(
+@traced_node("correction")
+async def generate_explanation(state: OverallState, writer: StreamWriter):
+    response = await get_chain(
+        "correction.generate_explanation", ExplanationResponse
+    ).ainvoke(
         {
             "input": state.input,
             "correctedText": state.correctedText,
@@ -116,10 +86,51 @@ Important!!
     )
 
 
+@traced_node("correction")
+async def generate_explanations(state: OverallState, writer: StreamWriter):
+    stream_generator = get_chain(
+        "correction.generate_explanations", ExplanationsResponse
+    ).astream(
+        {
+            "input": state.input,
+            "correctedText": state.correctedText,
+            "englishLevel": state.englishLevel,
+        }
+    )
+
+    # An item is complete once the next one starts streaming
+    corrections = []
+    emitted = 0
+    async for chunk in stream_generator:
+        corrections = chunk.corrections
+        while emitted < len(corrections) - 1:
+            writer({"correction": corrections[emitted]})
+            emitted += 1
+
+    for correction in corrections[emitted:]:
+        writer({"correction": correction})
+
+    return {"corrections": corrections}
+
+
+def route_explanation(state: OverallState, config: RunnableConfig):
+    mode = config["configurable"].get("explanation_mode", EXPLANATION_MODE)
+    if mode == "loop":
+        return n(generate_explanation)
+    return n(generate_explanations)
+
+
 g = StateGraph(OverallState, input=InputState, output=OutputState)
 g.add_edge(START, n(correct_input))
 
 g.add_node(n(correct_input), correct_input)
-g.add_edge(n(correct_input), n(generate_explanation))
+g.add_conditional_edges(
+    n(correct_input),
+    route_explanation,
+    [n(generate_explanation), n(generate_explanations)],
+)
 
 g.add_node(n(generate_explanation), generate_explanation)
+
+g.add_node(n(generate_explanations), generate_explanations)
+g.add_edge(n(generate_explanations), END)
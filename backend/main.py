@@ -1,37 +1,84 @@
 from fastapi import FastAPI, HTTPException, WebSocket, Request, Depends
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.websockets import WebSocketDisconnect
 from contextlib import asynccontextmanager
-import inspect
-from bson import ObjectId
+import asyncio
+import os
+import secrets
+from bson.errors import InvalidId
 from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Optional
 
 from app.workflows.correction import g as correction_graph
 from app.workflows.vocabulary import g as vocabulary_graph
 from app.workflows.breakdown import g as breakdown_graph
-
-from app.db.mongodb import ping_mongodb, main_db
-from app.utils.compile_graph import compile_graph_with_async_checkpointer
-from app.models import (
-    CorrectionItem,
-    Correction,
-    Vocabulary,
-    Breakdown,
-    General,
-    ResponseType,
+from app.handlers import HANDLERS
+
+from app.db.mongodb import ping_mongodb
+from app.db.users import user_profiles
+from app.db.results import results_repository, InvalidCursor
+from app.db.result_writer import result_writer
+from app.db.vocabulary_store import vocabulary_store
+from app.utils.compile_graph import (
+    checkpointer_stats,
+    close_checkpointer,
+    compile_workflows,
+    get_checkpointer,
+    uses_mongo_checkpointer,
+)
+from app.utils.checkpoint_retention import (
+    CHECKPOINT_RETENTION_ENABLED,
+    checkpoint_retention,
 )
+from app.models import ResponseType
+
+from app.prompt_registry import build_prompts, get_chain
+from app.llm_cache import llm_cache, llm_cache_metrics
+from app.llm_governor import LLMOverloaded, current_user_id, llm_governor
+from app.llm_resilience import llm_resilience
+from app.model_router import llm_stage_metrics, model_router
+from app.semantic_cache import semantic_cache
+from app.sentence_classifier import sentence_classifier
+from app.single_flight import single_flight
+from app.tracing import tracer
 
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
-from app.llm import chat_model
+# Maximum number of concurrent requests on one /ws/session socket
+SESSION_MAX_INFLIGHT = int(os.getenv("SESSION_MAX_INFLIGHT", "4"))
+# Shared with the frontend server, which calls the internal endpoints
+INTERNAL_API_SECRET = os.getenv("INTERNAL_API_SECRET")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await ping_mongodb()
+    await results_repository.ensure_indexes()
+    if hasattr(llm_cache, "ensure_indexes"):
+        await llm_cache.ensure_indexes()
+    await vocabulary_store.ensure_indexes()
+    build_prompts()
+    if semantic_cache is not None:
+        await semantic_cache.start()
+    app.state.warmup_report = await compile_workflows(
+        {
+            ResponseType.CORRECTION.value: correction_graph,
+            ResponseType.VOCABULARY.value: vocabulary_graph,
+            ResponseType.BREAKDOWN.value: breakdown_graph,
+        }
+    )
+    await result_writer.start()
+    await tracer.start()
+    # Only the mongo policy writes checkpoints that outlive the process
+    if CHECKPOINT_RETENTION_ENABLED and uses_mongo_checkpointer():
+        await checkpoint_retention.start(get_checkpointer())
     yield
+    await checkpoint_retention.stop()
+    await result_writer.stop()
+    await tracer.stop()
+    await vocabulary_store.flush()
+    if semantic_cache is not None:
+        await semantic_cache.stop()
+    await close_checkpointer()
 
 
 class UserMiddleware(BaseHTTPMiddleware):
@@ -39,21 +86,10 @@ class UserMiddleware(BaseHTTPMiddleware):
         # Get user_id from request headers or query parameters
         user_id = request.headers.get("user-id") or request.query_params.get("user_id")
 
-        if user_id:
-            # Fetch user info from database
-            user = await main_db.users.find_one({"googleId": user_id})
-            if user:
-                # Add user info to request state
-                request.state.user = {
-                    "id": user_id,
-                    "aboutMe": user.get("aboutMe", ""),
-                    "englishLevel": user.get("englishLevel", ""),
-                    "motherTongue": user.get("motherTongue", ""),
-                }
-            else:
-                request.state.user = None
-        else:
-            request.state.user = None
+        # Add user info to request state
+        request.state.user = await user_profiles.get(user_id) if user_id else None
+        # LLM calls made for this request queue under the user
+        current_user_id.set(user_id)
 
         response = await call_next(request)
         return response
@@ -63,29 +99,20 @@ async def get_current_user_websocket(websocket: WebSocket) -> Optional[dict]:
     # For WebSocket connections, we'll get the user_id from the query parameters
     user_id = websocket.query_params.get("user_id")
     if user_id:
-        user = await main_db.users.find_one({"googleId": user_id})
-        if user:
-            return {
-                "id": user_id,
-                "aboutMe": user.get("aboutMe", ""),
-                "englishLevel": user.get("englishLevel", ""),
-                "motherTongue": user.get("motherTongue", ""),
-            }
+        current_user_id.set(user_id)
+        return await user_profiles.get(user_id)
     return None
 
 
 async def get_current_user_http(request: Request) -> Optional[dict]:
-    # For HTTP requests, we'll get the user_id from the request headers
+    # The middleware has already resolved the user for this request
+    user = getattr(request.state, "user", None)
+    if user and user["id"] == request.query_params.get("user_id"):
+        return user
+
     user_id = request.query_params.get("user_id")
     if user_id:
-        user = await main_db.users.find_one({"googleId": user_id})
-        if user:
-            return {
-                "id": user_id,
-                "aboutMe": user.get("aboutMe", ""),
-                "englishLevel": user.get("englishLevel", ""),
-                "motherTongue": user.get("motherTongue", ""),
-            }
+        return await user_profiles.get(user_id)
     return None
 
 
@@ -111,81 +138,65 @@ async def health_check():
     return {"status": "healthy", "message": "Service is running"}
 
 
-@app.websocket("/ws/correction")
-async def correction_ws(websocket: WebSocket):
+@app.post("/users/{user_id}/invalidate")
+async def invalidate_user(user_id: str, request: Request):
     """
-    correct the provided input and provide explanations for corrections.
+    Drop the cached profile after the user updates it.
+    Only the frontend server may call this, with the shared INTERNAL_API_SECRET;
+    without a configured secret the endpoint is closed.
     """
-    try:
-        await websocket.accept()
-        user = await get_current_user_websocket(websocket)
-        if not user:
-            await websocket.send_json(
-                {"error": "No user ID provided or user not found"}
-            )
-            return
-
-        data = await websocket.receive_json()
+    if not INTERNAL_API_SECRET or not secrets.compare_digest(
+        request.headers.get("x-internal-secret", ""), INTERNAL_API_SECRET
+    ):
+        raise HTTPException(status_code=403, detail="Invalid internal secret")
+    user_profiles.invalidate(user_id)
+    return {"invalidated": True}
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "userProfiles": user_profiles.stats(),
+        "resultWriter": result_writer.stats(),
+        "llmCache": llm_cache_metrics.stats(),
+        "llmGovernor": llm_governor.stats(),
+        "llmResilience": llm_resilience.stats(),
+        "llmStages": {
+            stage: {"route": model_router.route(stage), **metrics}
+            for stage, metrics in llm_stage_metrics.stats().items()
+        },
+        "vocabularyStore": vocabulary_store.stats(),
+        "sentenceClassifier": sentence_classifier.stats(),
+        "singleFlight": single_flight.stats(),
+        "tracing": tracer.stats(),
+        "checkpointer": checkpointer_stats(),
+        "checkpointRetention": checkpoint_retention.stats(),
+        "semanticCache": (
+            semantic_cache.stats() if semantic_cache is not None else None
+        ),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Latency histograms per workflow request, node, LLM stage, Mongo operation and
+    LLM queue wait, and the LLM governor's queue gauges, in the Prometheus text format.
+    """
+    return PlainTextResponse(
+        tracer.histograms.prometheus() + llm_governor.prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
 
-        type = ResponseType.CORRECTION.value
-        input = data.get("input")
 
-        if not input:
-            error_msg = "No text provided"
-            await websocket.send_json({"error": error_msg})
-            return
+@app.get("/warmup")
+async def warmup_report():
+    return {"compileTimeMs": getattr(app.state, "warmup_report", {})}
 
-        graph = correction_graph
-        result = Correction(userId=user["id"], input=input)
-        workflow = await compile_graph_with_async_checkpointer(graph, type)
-
-        result_id = result.id
-        result_id_str = str(result_id)
-
-        async for stream_mode, data in workflow.astream(
-            {
-                "input": input,
-                "thread_id": result_id_str,
-                "aboutMe": user.get("aboutMe", ""),
-                "englishLevel": user.get("englishLevel", ""),
-                "motherTongue": user.get("motherTongue", ""),
-            },
-            stream_mode=["custom"],
-            config={"configurable": {"thread_id": result_id_str}},
-        ):
-            response_data = {
-                "id": result_id_str,
-                "type": type,
-            }
-            if "correctedText" in data.keys():
-                correctedText = data["correctedText"]
-                result.correctedText = correctedText
-                response_data["correctedText"] = correctedText
-
-            if "correction" in data.keys():
-                correction = data["correction"]
-                result.corrections.append(correction)
-                response_data["correction"] = correction.model_dump()
-
-            await websocket.send_json(response_data)
-
-        result_dict = result.model_dump()
-        result_dict["_id"] = result_dict.pop("id")
-        await main_db.results.insert_one(result_dict)
-    except Exception as e:
-        import traceback
 
-        error_trace = traceback.format_exc()
-        print("Error on ws/correction: ", error_trace)
-        await websocket.send_json({"error": str(e)})
-    finally:
-        await websocket.close()
-
-
-@app.websocket("/ws/vocabulary")
-async def vocabulary_ws(websocket: WebSocket):
+async def serve_single_request(websocket: WebSocket, type: str):
     """
-    Process vocabulary for the provided input.
+    Accept one request frame, stream the workflow's responses and close the socket.
     """
     try:
         await websocket.accept()
@@ -198,155 +209,44 @@ async def vocabulary_ws(websocket: WebSocket):
 
         data = await websocket.receive_json()
 
-        type = ResponseType.VOCABULARY.value
-        input = data.get("input")
-
-        if not input:
-            error_msg = "No text provided"
-            await websocket.send_json({"error": error_msg})
-            return
-
-        graph = vocabulary_graph
-        result = Vocabulary(userId=user["id"], input=input)
-        workflow = await compile_graph_with_async_checkpointer(graph, type)
-
-        result_id = result.id
-        result_id_str = str(result_id)
-
-        async for stream_mode, data in workflow.astream(
-            {
-                "input": input,
-                "thread_id": result_id_str,
-                "aboutMe": user.get("aboutMe", ""),
-                "englishLevel": user.get("englishLevel", ""),
-                "motherTongue": user.get("motherTongue", ""),
-            },
-            stream_mode=["custom"],
-            config={"configurable": {"thread_id": result_id_str}},
-        ):
-            response_data = {
-                "id": result_id_str,
-                "type": type,
-            }
-            if "extracted_word" in data.keys():
-                extracted_word = data["extracted_word"]
-                result.input = extracted_word
-                response_data["input"] = extracted_word
-            elif "corrected_input" in data.keys():
-                corrected_input = data["corrected_input"]
-                result.input = corrected_input
-                response_data["input"] = corrected_input
-
-            if "definition" in data.keys():
-                definition = data["definition"]
-                result.definition = definition
-                response_data["definition"] = definition
-
-            if "translated_vocabulary" in data.keys():
-                translated_vocabulary = data["translated_vocabulary"]
-                result.translated_vocabulary = translated_vocabulary
-                response_data["translated_vocabulary"] = translated_vocabulary
-
-            if "examples" in data.keys():
-                streaming_examples = data["examples"]  # streaming the whole list
-                result.examples = streaming_examples  # update with the lastest value
-                response_data["examples"] = streaming_examples
-
-            await websocket.send_json(response_data)
-
-        result_dict = result.model_dump()
-        result_dict["_id"] = result_dict.pop("id")
-        await main_db.results.insert_one(result_dict)
+        with tracer.span(f"request.{type}", kind="request", endpoint=f"/ws/{type}"):
+            async for response_data in HANDLERS[type](user, data):
+                await websocket.send_json(response_data)
+    except LLMOverloaded as e:
+        print(f"Shed ws/{type} request ({e.reason})")
+        await websocket.send_json(e.frame())
     except Exception as e:
         import traceback
 
         error_trace = traceback.format_exc()
-        print("Error on ws/vocabulary:", error_trace)
+        print(f"Error on ws/{type}: ", error_trace)
         await websocket.send_json({"error": str(e)})
     finally:
         await websocket.close()
 
 
-@app.websocket("/ws/breakdown")
-async def breakdown_ws(websocket: WebSocket):
+@app.websocket("/ws/correction")
+async def correction_ws(websocket: WebSocket):
     """
-    Process text breakdown for the provided input.
+    correct the provided input and provide explanations for corrections.
     """
-    try:
-        await websocket.accept()
-        user = await get_current_user_websocket(websocket)
-        if not user:
-            await websocket.send_json(
-                {"error": "No user ID provided or user not found"}
-            )
-            return
-
-        data = await websocket.receive_json()
-
-        type = ResponseType.BREAKDOWN.value
-        input = data.get("input")
-
-        if not input:
-            error_msg = "No text provided"
-            await websocket.send_json({"error": error_msg})
-            return
-
-        graph = breakdown_graph
-        result = Breakdown(userId=user["id"], input=input)
-        workflow = await compile_graph_with_async_checkpointer(graph, type)
-
-        result_id = result.id
-        result_id_str = str(result_id)
-
-        async for stream_mode, data in workflow.astream(
-            {
-                "input": input,
-                "thread_id": result_id_str,
-                "aboutMe": user.get("aboutMe", ""),
-                "englishLevel": user.get("englishLevel", ""),
-                "motherTongue": user.get("motherTongue", ""),
-            },
-            stream_mode=["messages"],
-            config={"configurable": {"thread_id": result_id_str}},
-        ):
-            if stream_mode == "messages":
-                message, metadata = data
-                if not message.content:
-                    continue
+    await serve_single_request(websocket, ResponseType.CORRECTION.value)
 
-                if metadata["langgraph_node"] == "generate_paraphrase":
-                    result.paraphrase = result.paraphrase + message.content
-                    await websocket.send_json(
-                        {
-                            "id": result_id_str,
-                            "type": type,
-                            "paraphrase": message.content,
-                        }
-                    )
-                elif metadata["langgraph_node"] == "generate_breakdown":
-                    result.breakdown = result.breakdown + message.content
-                    await websocket.send_json(
-                        {
-                            "id": result_id_str,
-                            "type": type,
-                            "breakdown": message.content,
-                        }
-                    )
 
-            else:
-                pass
+@app.websocket("/ws/vocabulary")
+async def vocabulary_ws(websocket: WebSocket):
+    """
+    Process vocabulary for the provided input.
+    """
+    await serve_single_request(websocket, ResponseType.VOCABULARY.value)
 
-        result_dict = result.model_dump()
-        result_dict["_id"] = result_dict.pop("id")
-        await main_db.results.insert_one(result_dict)
-    except Exception as e:
-        import traceback
 
-        error_trace = traceback.format_exc()
-        print("Error on ws/breakdown: ", error_trace)
-        await websocket.send_json({"error": str(e)})
-    finally:
-        await websocket.close()
+@app.websocket("/ws/breakdown")
+async def breakdown_ws(websocket: WebSocket):
+    """
+    Process text breakdown for the provided input.
+    """
+    await serve_single_request(websocket, ResponseType.BREAKDOWN.value)
 
 
 @app.websocket("/ws/general")
@@ -354,122 +254,143 @@ async def general_ws(websocket: WebSocket):
     """
     Process general questions.
     """
-    try:
-        await websocket.accept()
-        user = await get_current_user_websocket(websocket)
-        if not user:
-            await websocket.send_json(
-                {"error": "No user ID provided or user not found"}
-            )
-            return
+    await serve_single_request(websocket, ResponseType.GENERAL.value)
 
-        data = await websocket.receive_json()
-
-        type = ResponseType.GENERAL.value
-        input = data.get("input")
 
-        if not input:
-            error_msg = "No text provided"
-            await websocket.send_json({"error": error_msg})
-            return
+@app.websocket("/ws/session")
+async def session_ws(websocket: WebSocket):
+    """
+    Keep one socket open for many requests.
 
-        streaming = (
-            ChatPromptTemplate.from_messages(
-                [
-                    (
-                        "system",
-                        "You are a helpful assistant in AI English Tutor app which helps users to learn English. Most of the users in this platform are not native Enlgish speaker. When you answer to the users, you should explain with easy vocabulary and grammar. Giving an example or explain the history of the word or phrase would be a good practice. Try to make your response concise so that the user can read it quickly. You can use Markdown format in your response.",
-                    ),
-                    ("human", "{input}"),
-                ]
-            )
-            | chat_model
-        ).astream({"input": input})
+    Request frame:  {"requestId": "...", "type": "correction", "input": "..."}
+    Cancel frame:   {"requestId": "...", "cancel": true}
+    Every response frame carries the requestId of its request, and each request
+    ends with {"requestId": "...", "done": true}.
+    """
+    await websocket.accept()
+    user = await get_current_user_websocket(websocket)
+    if not user:
+        await websocket.send_json({"error": "No user ID provided or user not found"})
+        await websocket.close()
+        return
 
-        result = General(userId=user["id"], input=input)
-        result_id = result.id
-        result_id_str = str(result_id)
+    inflight = {}  # requestId -> Task
+    send_lock = asyncio.Lock()
 
-        full_response = ""
-        async for chunk in streaming:
-            full_response += chunk.content
-            await websocket.send_json(
-                {
-                    "id": result_id_str,
-                    "type": type,
-                    "answer": chunk.content,
-                }
-            )
+    async def send(frame: dict):
+        async with send_lock:
+            await websocket.send_json(frame)
 
-        result.answer = full_response
+    async def run_request(request_id: str, data: dict):
+        type = data.get("type")
+        try:
+            with tracer.span(f"request.{type}", kind="request", endpoint="/ws/session"):
+                async for response_data in HANDLERS[type](user, data):
+                    await send({"requestId": request_id, **response_data})
+        except asyncio.CancelledError:
+            raise
+        except LLMOverloaded as e:
+            print(f"Shed ws/session {type} request ({e.reason})")
+            await send({"requestId": request_id, **e.frame()})
+        except Exception as e:
+            import traceback
 
-        result_dict = result.model_dump()
-        result_dict["_id"] = result_dict.pop("id")
-        await main_db.results.insert_one(result_dict)
+            print(f"Error on ws/session ({type}): ", traceback.format_exc())
+            await send({"requestId": request_id, "error": str(e)})
+        finally:
+            inflight.pop(request_id, None)
+        await send({"requestId": request_id, "done": True})
 
-    except Exception as e:
-        import traceback
+    # Requests on the socket are child spans of the session span
+    with tracer.span("session", kind="session"):
+        try:
+            while True:
+                data = await websocket.receive_json()
+                request_id = data.get("requestId")
 
-        error_trace = traceback.format_exc()
-        print("Error on ws/breakdown: ", error_trace)
-        await websocket.send_json({"error": str(e)})
-    finally:
-        await websocket.close()
+                if not request_id:
+                    await send({"error": "No requestId provided"})
+                    continue
 
+                if data.get("cancel"):
+                    if request_id in inflight:
+                        inflight[request_id].cancel()
+                    continue
 
-@app.post("/further-questions")
-async def further_questions(data: dict, user: dict = Depends(get_current_user_http)):
-    async def update_db(result_id: str, question: str, response_text: str):
-        result_id_obj = ObjectId(result_id)
-        result = await main_db.results.find_one({"_id": result_id_obj})
+                if request_id in inflight:
+                    await send(
+                        {"requestId": request_id, "error": "requestId is already in flight"}
+                    )
+                    continue
 
-        if not result:
-            raise HTTPException(
-                status_code=404, detail=f"Result with id {result_id} not found"
-            )
+                if data.get("type") not in HANDLERS:
+                    await send(
+                        {"requestId": request_id, "error": f"Unknown type: {data.get('type')}"}
+                    )
+                    continue
 
-        if "extraQuestions" not in result:
-            result["extraQuestions"] = []
-        result["extraQuestions"].append(
-            {
-                "question": question,
-                "answer": response_text,
-            }
-        )
-        update_result = await main_db.results.update_one(
-            {"_id": result_id_obj},
-            {"$set": {"extraQuestions": result["extraQuestions"]}},
-        )
-        if not update_result.matched_count:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Result with id {result_id} not found during update",
-            )
-        if not update_result.modified_count:
-            raise HTTPException(
-                status_code=400, detail=f"Result with id {result_id} not updated"
-            )
+                if len(inflight) >= SESSION_MAX_INFLIGHT:
+                    await send(
+                        {
+                            "requestId": request_id,
+                            "error": f"Too many requests in flight (max {SESSION_MAX_INFLIGHT})",
+                        }
+                    )
+                    continue
 
-    streaming = (
-        ChatPromptTemplate.from_template(
-            """
-You are a experienced ESL tutor. Your student whose native language is {motherTongue} and English level is {englishLevel} asked {type} question. 
+                inflight[request_id] = asyncio.create_task(run_request(request_id, data))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            tasks = list(inflight.values())
+            for task in tasks:
+                task.cancel()
+            # Let them unwind (close streams, release governor slots) before the socket goes
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@app.get("/history")
+async def history(
+    type: Optional[ResponseType] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    user: dict = Depends(get_current_user_http),
+):
+    """
+    List the user's results newest first. Pass `nextCursor` back as `cursor` for the next page.
+    """
+    if not user:
+        raise HTTPException(status_code=401, detail="No user ID provided or user not found")
 
-Question: {input}. 
+    try:
+        items, next_cursor = await results_repository.list_history(
+            user["id"],
+            type=type.value if type else None,
+            limit=max(1, min(limit, 100)),
+            cursor=cursor,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-You answered back to the student with the following explanation: 
-{context}
+    for item in items:
+        item["id"] = str(item.pop("_id"))
+        item["createdAt"] = item["createdAt"].isoformat()
+    return {"items": items, "nextCursor": next_cursor}
 
-Then the student asked you another question: {question}
 
-Now, it's your turn to answer back to the student about the latest question.
+@app.post("/further-questions")
+async def further_questions(data: dict, user: dict = Depends(get_current_user_http)):
+    result_id = data.get("resultId")
+    # The result may have just been queued by the result writer
+    await result_writer.wait_for(result_id)
+    try:
+        found = await results_repository.exists(result_id)
+    except (TypeError, InvalidId):
+        found = False
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Result with id {result_id} not found")
 
-Don't include "output: " or "here is the answer: ". Only return the answer.
-"""
-        )
-        | chat_model
-        | StrOutputParser()
-    ).astream(
+    streaming = get_chain("further_questions").astream(
         {
             "type": data.get("type"),
             "input": data.get("input"),
@@ -489,7 +410,11 @@ Don't include "output: " or "here is the answer: ". Only return the answer.
                 yield chunk
 
             # After streaming is complete, update the database
-            await update_db(data.get("resultId"), data.get("question"), response_text)
+            updated = await results_repository.append_extra_question(
+                result_id, data.get("question"), response_text
+            )
+            if not updated:
+                print(f"Result {result_id} was deleted before its follow-up could be saved")
         except Exception as e:
             # Log the error but don't interrupt the stream
             print(f"Error updating database: {str(e)}")
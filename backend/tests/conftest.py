@@ -3,6 +3,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from mongomock_motor import AsyncMongoMockClient
 import os
 import asyncio
+import json
 import uuid
 from main import app
 from fastapi.testclient import TestClient
@@ -87,11 +88,106 @@ def cleanup_db(mock_main_db, user_id):
     assert result is None
 
 
+@pytest.fixture
+def cleanup_all_results(mock_main_db, user_id):
+    """
+    Remove every result of the test user, for tests that run many sessions
+    """
+    yield
+
+    mock_main_db.results.items[:] = [
+        item for item in mock_main_db.results.items if item.get("userId") != user_id
+    ]
+
+
 @pytest.fixture(autouse=True)
 def patch_main_db(monkeypatch, mock_main_db):
     """
     Automatically patch main_db for all tests
     """
-    import main
+    import app.db.users
+    import app.db.results
+    import app.db.vocabulary_store
 
-    monkeypatch.setattr(main, "main_db", mock_main_db)
+    monkeypatch.setattr(app.db.results, "main_db", mock_main_db)
+    # Collections without a hand-written mock use mongomock
+    monkeypatch.setattr(
+        app.db.vocabulary_store, "main_db", AsyncMongoMockClient().get_database("test")
+    )
+    monkeypatch.setattr(app.db.users, "main_db", mock_main_db)
+    app.db.users.user_profiles.clear()
+
+
+@pytest.fixture
+def fake_chat_model(monkeypatch):
+    """
+    Replace the OpenAI chat model with a local deterministic one
+    """
+    from app.utils.fake_chat_model import FakeChatModel
+    from app.llm_governor import LLMGovernor
+    from app.llm_resilience import LLMResilience
+    import app.llm
+    import app.handlers
+
+    model = FakeChatModel(token_latency=0.01)
+    monkeypatch.setattr(app.llm, "chat_model", model)
+    monkeypatch.setattr(app.llm, "llm_cache", None)
+    # Every test starts with the full LLM budgets
+    monkeypatch.setattr(app.llm, "llm_governor", LLMGovernor())
+    monkeypatch.setattr(app.llm, "llm_resilience", LLMResilience())
+    monkeypatch.setattr(app.handlers, "semantic_cache", None)
+    return model
+
+
+@pytest.fixture
+def memory_workflows(monkeypatch):
+    """
+    Use a fresh workflow registry compiled with a fresh in-memory checkpointer
+    """
+    from app.utils import compile_graph
+
+    monkeypatch.setattr(compile_graph, "compiled_workflows", {})
+    monkeypatch.setattr(compile_graph, "CHECKPOINTER_POLICY", "memory")
+    monkeypatch.setattr(compile_graph, "CHECKPOINTER_POLICIES", {})
+    monkeypatch.setattr(compile_graph, "memory_checkpointer", None)
+
+
+async def run_websocket(
+    app, path: str, payload, user_id: str, close_when=None
+) -> list:
+    """
+    Drive a WebSocket endpoint directly through ASGI on the running event loop,
+    so several sessions can run concurrently in one test.
+    `payload` is one frame or a list of frames. For endpoints that keep the socket open,
+    the client disconnects once `close_when(responses)` is true.
+    """
+    inbox = asyncio.Queue()
+    await inbox.put({"type": "websocket.connect"})
+    for frame in payload if isinstance(payload, list) else [payload]:
+        await inbox.put({"type": "websocket.receive", "text": json.dumps(frame)})
+    responses = []
+
+    async def receive():
+        return await inbox.get()
+
+    async def send(message):
+        if message["type"] == "websocket.send":
+            responses.append(json.loads(message["text"]))
+            if close_when and close_when(responses):
+                inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+    scope = {
+        "type": "websocket",
+        "asgi": {"version": "3.0"},
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "scheme": "ws",
+        "query_string": f"user_id={user_id}".encode(),
+        "headers": [],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+        "subprotocols": [],
+    }
+    await app(scope, receive, send)
+    return responses
@@ -0,0 +1,163 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.utils import compile_graph
+from app.utils.checkpoint_retention import CheckpointRetention
+from app.utils.checkpointers import BatchedMongoSaver, BoundedMemorySaver
+from app.workflows.correction import g as correction_graph
+
+
+async def run_correction(workflow, thread_id: str):
+    async for _ in workflow.astream(
+        {"input": "I go store everyday", "thread_id": thread_id},
+        stream_mode=["custom"],
+        config={"configurable": {"thread_id": thread_id}},
+    ):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_memory_workflows_fixture_checkpoints(fake_chat_model, memory_workflows):
+    workflow = await compile_graph.get_workflow(correction_graph, "correction")
+    await run_correction(workflow, "a")
+
+    assert compile_graph.memory_checkpointer.stats()["threads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_policies(fake_chat_model, monkeypatch):
+    monkeypatch.setattr(compile_graph, "compiled_workflows", {})
+    monkeypatch.setattr(compile_graph, "memory_checkpointer", None)
+    monkeypatch.setattr(
+        compile_graph, "CHECKPOINTER_POLICIES", {"correction": "memory"}
+    )
+
+    await compile_graph.compile_workflows(
+        {"correction": correction_graph, "breakdown": correction_graph}
+    )
+    assert isinstance(
+        compile_graph.compiled_workflows["correction"].checkpointer, BoundedMemorySaver
+    )
+    # Without a checkpointer the workflow still runs, it just keeps no state
+    assert compile_graph.compiled_workflows["breakdown"].checkpointer is None
+    await run_correction(compile_graph.compiled_workflows["breakdown"], "t1")
+
+    assert compile_graph.checkpointer_stats()["policies"] == {
+        "correction": "memory",
+        "breakdown": "none",
+    }
+
+
+@pytest.mark.asyncio
+async def test_bounded_memory_saver_evicts_oldest_threads(fake_chat_model):
+    checkpointer = BoundedMemorySaver(max_threads=2)
+    workflow = correction_graph.compile(checkpointer=checkpointer)
+    for thread_id in ["a", "b", "c"]:
+        await run_correction(workflow, thread_id)
+
+    assert set(checkpointer.storage) == {"b", "c"}
+    assert checkpointer.stats() == {"threads": 2, "evicted": 1}
+    evicted = await workflow.aget_state({"configurable": {"thread_id": "a"}})
+    assert evicted.values == {}
+    state = await workflow.aget_state({"configurable": {"thread_id": "c"}})
+    assert state.values["input"] == "I go store everyday"
+
+
+@pytest.mark.asyncio
+async def test_batched_mongo_saver_flushes_in_bulk(fake_chat_model):
+    checkpointer = BatchedMongoSaver(
+        AsyncMongoMockClient(), batch_size=1000, flush_interval=60
+    )
+    workflow = correction_graph.compile(checkpointer=checkpointer)
+    await run_correction(workflow, "thread")
+
+    checkpoints = checkpointer.checkpoint_collection.collection
+    assert await checkpoints.count_documents({}) == 0
+    assert checkpointer.pending > 0
+
+    # Reading the thread back flushes first, so it can be resumed
+    state = await workflow.aget_state({"configurable": {"thread_id": "thread"}})
+    assert state.values["input"] == "I go store everyday"
+    assert checkpointer.pending == 0
+    assert checkpointer.stats()["batches"] == 2  # one per collection
+    assert await checkpoints.count_documents({"thread_id": "thread"}) > 0
+
+    await checkpointer.close()
+
+
+class FailingCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def bulk_write(self, operations, **kwargs):
+        raise ConnectionError("primary unreachable")
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+@pytest.mark.asyncio
+async def test_batched_mongo_saver_buffers_are_bounded_while_mongo_is_down(fake_chat_model):
+    checkpointer = BatchedMongoSaver(
+        AsyncMongoMockClient(), batch_size=1000, flush_interval=60, max_pending=10
+    )
+    buffers = [checkpointer.checkpoint_collection, checkpointer.writes_collection]
+    real_collections = [buffered.collection for buffered in buffers]
+    for buffered in buffers:
+        buffered.collection = FailingCollection(buffered.collection)
+    workflow = correction_graph.compile(checkpointer=checkpointer)
+
+    for thread_id in ["a", "b", "c", "d"]:
+        await run_correction(workflow, thread_id)
+        with pytest.raises(ConnectionError):
+            await checkpointer.flush()
+
+    assert checkpointer.pending <= 20
+    assert checkpointer.stats()["failedFlushes"] == 4
+    assert checkpointer.stats()["dropped"] > 0
+
+    # Once Mongo is back, the newest operations are written
+    for buffered, collection in zip(buffers, real_collections):
+        buffered.collection = collection
+    await checkpointer.close()
+    assert checkpointer.pending == 0
+    state = await workflow.aget_state({"configurable": {"thread_id": "d"}})
+    assert state.values["input"] == "I go store everyday"
+
+
+@pytest.mark.asyncio
+async def test_retention_keeps_only_the_final_checkpoint(fake_chat_model):
+    checkpointer = BatchedMongoSaver(AsyncMongoMockClient(), flush_interval=60)
+    workflow = correction_graph.compile(checkpointer=checkpointer)
+    for thread_id in ["a", "b"]:
+        await run_correction(workflow, thread_id)
+    await checkpointer.close()
+    before = await workflow.aget_state({"configurable": {"thread_id": "a"}})
+
+    retention = CheckpointRetention(min_age=0, batch_size=1)
+    retention.attach(checkpointer)
+    await retention.ensure_indexes()
+    ttl_index = (await retention.checkpoints.index_information())["created_at_ttl"]
+    assert ttl_index["expireAfterSeconds"] == retention.ttl_seconds
+
+    checkpoints_before = await retention.checkpoints.count_documents({})
+    report = await retention.run_once()
+
+    assert [batch["threads"] for batch in report["batches"]] == [1, 1]
+    assert await retention.checkpoints.count_documents({}) == 2
+    assert retention.stats()["checkpointsDeleted"] == checkpoints_before - 2
+    # The thread still resumes from its final state
+    after = await workflow.aget_state({"configurable": {"thread_id": "a"}})
+    assert after.values == before.values
+    assert after.config == before.config
+
+    # Recently written threads are left alone
+    await run_correction(workflow, "c")
+    await checkpointer.close()
+    retention.min_age = 600
+    assert (await retention.run_once())["batches"] == []
+
+    # Checkpoints written before created_at existed are stamped, so the TTL covers them
+    await retention.checkpoints.insert_one({"thread_id": "legacy", "checkpoint_id": "1"})
+    assert await retention.backfill_created_at() == 1
+    assert await retention.checkpoints.count_documents({"created_at": None}) == 0
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import pytest
+
+from main import app
+from app.single_flight import SingleFlight
+from tests.conftest import run_websocket
+
+
+@pytest.mark.asyncio
+async def test_vocabulary_sessions_run_concurrently(
+    fake_chat_model, memory_workflows, cleanup_all_results, user_id, monkeypatch
+):
+    """
+    N simultaneous /ws/vocabulary sessions should finish in about the time of one
+    """
+    # Every session must make its own LLM calls: nothing coalesced or stored
+    monkeypatch.setattr("app.handlers.single_flight", SingleFlight(enabled=False))
+    monkeypatch.setattr("app.db.vocabulary_store.VOCABULARY_STORE_ENABLED", False)
+    fake_chat_model.token_latency = 0.02
+    words = ["buoy", "anchor", "harbor", "mast", "keel", "rudder"]
+
+    start = time.perf_counter()
+    single = await run_websocket(
+        app, "/ws/vocabulary", {"input": words[0], "user_id": user_id}, user_id
+    )
+    single_duration = time.perf_counter() - start
+    calls_per_session = len(fake_chat_model.calls)
+    fake_chat_model.max_active_calls = 0
+
+    sessions = 5
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[
+            run_websocket(app, "/ws/vocabulary", {"input": word, "user_id": user_id}, user_id)
+            for word in words[1 : sessions + 1]
+        ]
+    )
+    concurrent_duration = time.perf_counter() - start
+
+    assert all("error" not in response for response in single)
+    for responses in results:
+        assert len(responses) > 0
+        assert all("error" not in response for response in responses)
+        assert any("examples" in response for response in responses)
+
+    assert len(fake_chat_model.calls) == calls_per_session * (sessions + 1)
+    assert fake_chat_model.max_active_calls >= sessions
+    assert concurrent_duration < single_duration * 2
@@ -0,0 +1,56 @@
+import pytest
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+
+from app.llm import StageChatModel
+from app.llm_cache import InMemoryLLMCache
+
+
+@pytest.fixture
+def memory_llm_cache(fake_chat_model, monkeypatch):
+    import app.llm
+
+    cache = InMemoryLLMCache()
+    monkeypatch.setattr(app.llm, "llm_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_is_replayed_as_stream(fake_chat_model, memory_llm_cache):
+    chain = (
+        ChatPromptTemplate.from_template("Define {input}")
+        | StageChatModel(stage="test.cached", use_cache=True)
+        | StrOutputParser()
+    )
+
+    first = await chain.ainvoke({"input": "buoy"})
+    # Whitespace differences normalize to the same key
+    chunks = [chunk async for chunk in chain.astream({"input": "  buoy "})]
+
+    assert len(fake_chat_model.calls) == 1
+    assert len(chunks) > 1
+    assert "".join(chunks) == first
+
+    await chain.ainvoke({"input": "indubitable"})
+    assert len(fake_chat_model.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_is_opt_in_and_skips_tool_calls(fake_chat_model, memory_llm_cache):
+    class IsSentenceResponse(BaseModel):
+        is_sentence: bool
+
+    prompt = ChatPromptTemplate.from_template("Is this a sentence? {input}")
+    uncached = prompt | StageChatModel(stage="test.uncached") | StrOutputParser()
+    structured = prompt | StageChatModel(
+        stage="test.structured", use_cache=True
+    ).with_structured_output(IsSentenceResponse)
+
+    await uncached.ainvoke({"input": "buoy"})
+    await uncached.ainvoke({"input": "buoy"})
+    response = await structured.ainvoke({"input": "buoy"})
+    await structured.ainvoke({"input": "buoy"})
+
+    assert response.is_sentence is False
+    assert len(fake_chat_model.calls) == 4
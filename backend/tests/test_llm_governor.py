@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+import app.llm
+from app.llm_governor import LLMGovernor, LLMOverloaded
+from main import app as fastapi_app
+from tests.conftest import run_websocket
+
+
+@pytest.mark.asyncio
+async def test_users_are_served_round_robin():
+    governor = LLMGovernor(max_concurrent=1, requests_per_minute=0, tokens_per_minute=0)
+    order = []
+    first = await governor.acquire(10, "a")
+
+    async def call(user_id):
+        permit = await governor.acquire(10, user_id)
+        order.append(user_id)
+        await asyncio.sleep(0)
+        governor.release(permit)
+
+    tasks = [asyncio.create_task(call(user_id)) for user_id in ["a", "a", "a", "b"]]
+    await asyncio.sleep(0)
+    assert governor.stats()["queueDepth"] == 4
+    governor.release(first)
+    await asyncio.gather(*tasks)
+
+    # b waits behind one of a's calls, not all of them
+    assert order == ["a", "b", "a", "a"]
+    assert governor.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_bounded_queues_shed_load():
+    governor = LLMGovernor(
+        max_concurrent=1,
+        max_queue_per_user=1,
+        queue_timeout=0.05,
+        requests_per_minute=0,
+        tokens_per_minute=0,
+    )
+    permit = await governor.acquire(10, "a")
+    waiting = asyncio.create_task(governor.acquire(10, "b"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(LLMOverloaded) as error:
+        await governor.acquire(10, "b")
+    assert error.value.reason == "user_queue_full"
+
+    with pytest.raises(LLMOverloaded) as error:
+        await waiting
+    assert error.value.reason == "timeout"
+    assert governor.stats()["queueDepth"] == 0
+    assert governor.stats()["shed"] == {"queue_full": 0, "user_queue_full": 1, "timeout": 1}
+    governor.release(permit)
+
+
+@pytest.mark.asyncio
+async def test_token_budget_is_corrected_with_actual_usage():
+    governor = LLMGovernor(requests_per_minute=0, tokens_per_minute=1000)
+    permit = await governor.acquire(600, "a")
+    waiting = asyncio.create_task(governor.acquire(600, "b"))
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    # Only 100 of the 600 reserved tokens were used
+    permit.tokens = 100
+    governor.release(permit)
+    second = await asyncio.wait_for(waiting, 1)
+    governor.release(second)
+
+
+@pytest.mark.asyncio
+async def test_overloaded_request_gets_an_error_frame(
+    fake_chat_model, memory_workflows, user_id, monkeypatch
+):
+    monkeypatch.setattr(app.llm, "llm_governor", LLMGovernor(max_concurrent=0, max_queue=0))
+    responses = await run_websocket(
+        fastapi_app, "/ws/general", {"input": "What is a gerund?"}, user_id
+    )
+
+    assert responses[-1]["code"] == "overloaded"
+    assert responses[-1]["retryAfter"] >= 1
+    assert app.llm.llm_governor.stats()["shed"]["queue_full"] == 1
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+import app.llm
+from app.llm import get_chat_model
+from app.llm_resilience import LLMResilience, LLMTimeout
+
+STAGE = "correction.correct_input"
+
+
+async def stream_text(model) -> str:
+    text = ""
+    async for chunk in model.astream("Correct this sentence."):
+        text += chunk.content
+    return text
+
+
+@pytest.mark.asyncio
+async def test_hedged_call_wins_over_a_stalled_one(monkeypatch, fake_chat_model):
+    resilience = LLMResilience(hedge_stages=[STAGE], hedge_delay=0.05, hedge_min_samples=10**6)
+    monkeypatch.setattr(app.llm, "llm_resilience", resilience)
+    fake_chat_model.stalls = [5]
+
+    start = time.perf_counter()
+    text = await stream_text(get_chat_model(STAGE))
+
+    assert time.perf_counter() - start < 1
+    assert text.startswith("token0 token1")
+    # The stalled call was cancelled before it answered
+    assert len(fake_chat_model.calls) == 1
+    assert resilience.stats()[STAGE]["hedges"] == 1
+    assert resilience.stats()[STAGE]["hedgeWins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_is_retried_when_the_first_token_is_late(monkeypatch, fake_chat_model):
+    resilience = LLMResilience(hedge_stages=[], first_token_timeout=0.1, retry_base_delay=0.01)
+    monkeypatch.setattr(app.llm, "llm_resilience", resilience)
+    fake_chat_model.stalls = [5]
+
+    text = await stream_text(get_chat_model(STAGE))
+
+    assert text.startswith("token0 token1")
+    # The stalled call was cancelled before it answered
+    assert len(fake_chat_model.calls) == 1
+    assert resilience.stats()[STAGE]["timeouts"] == 1
+    assert resilience.stats()[STAGE]["retries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stage_deadline_covers_retries(monkeypatch, fake_chat_model):
+    resilience = LLMResilience(
+        stage_timeouts={STAGE: 0.2}, hedge_stages=[], retry_base_delay=0.01
+    )
+    monkeypatch.setattr(app.llm, "llm_resilience", resilience)
+    fake_chat_model.stalls = [5, 5, 5]
+
+    start = time.perf_counter()
+    with pytest.raises(LLMTimeout):
+        await get_chat_model(STAGE).ainvoke("Correct this sentence.")
+
+    assert time.perf_counter() - start < 1
+    assert resilience.stats()[STAGE]["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_long_correction_stream_has_no_total_deadline(monkeypatch, fake_chat_model):
+    # Only the gaps between tokens are timed, not the whole stream
+    resilience = LLMResilience(timeout=0.2, idle_timeout=0.2, hedge_stages=[])
+    monkeypatch.setattr(app.llm, "llm_resilience", resilience)
+    fake_chat_model.response_tokens = 60
+
+    start = time.perf_counter()
+    text = await stream_text(get_chat_model(STAGE))
+
+    assert time.perf_counter() - start > 0.2
+    assert text.split()[-1] == "token59"
+    assert STAGE not in resilience.stats()
+
+
+def test_sync_calls_are_refused(fake_chat_model):
+    # They would skip the deadline, retries and hedging
+    with pytest.raises(NotImplementedError, match="ainvoke/astream"):
+        get_chat_model(STAGE).invoke("Correct this sentence.")
+    with pytest.raises(NotImplementedError):
+        list(get_chat_model(STAGE).stream("Correct this sentence."))
+    assert fake_chat_model.calls == []
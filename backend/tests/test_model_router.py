@@ -0,0 +1,67 @@
+import pytest
+from langchain_openai import ChatOpenAI
+
+from app.model_router import LLMStageMetrics, ModelRouter
+
+
+def test_route_uses_stage_tier_and_overrides():
+    router = ModelRouter(
+        stage_tiers={"vocabulary.correct_input": "fast"},
+        overrides={"general": {"tier": "balanced", "max_tokens": 300}},
+    )
+
+    assert router.route("vocabulary.correct_input")["tier"] == "fast"
+    assert router.route("unknown.stage")["tier"] == "quality"
+    assert router.route("general")["tier"] == "balanced"
+    assert router.route("general")["max_tokens"] == 300
+
+
+def test_stages_with_the_same_settings_share_a_model():
+    router = ModelRouter(
+        stage_tiers={"a": "fast", "b": "fast", "c": "quality"}, overrides={}
+    )
+    built = []
+
+    def build_model(route):
+        built.append(route["model"])
+        return object()
+
+    assert router.model_for("a", build_model) is router.model_for("b", build_model)
+    assert router.model_for("a", build_model) is not router.model_for("c", build_model)
+    assert len(built) == 2
+
+
+def test_openai_stages_are_routed(monkeypatch):
+    import app.llm
+
+    monkeypatch.setattr(app.llm, "chat_model", ChatOpenAI(api_key="test"))
+    monkeypatch.setattr(
+        app.llm,
+        "model_router",
+        ModelRouter(stage_tiers={"vocabulary.correct_input": "fast"}, overrides={}),
+    )
+
+    fast = app.llm.get_chat_model("vocabulary.correct_input").model
+    quality = app.llm.get_chat_model("correction.generate_explanations").model
+    assert fast.model_name == "gpt-4o-mini"
+    assert fast.temperature == 0.0
+    assert quality.model_name == "gpt-4o"
+
+
+@pytest.mark.asyncio
+async def test_stage_latency_and_tokens_are_recorded(fake_chat_model, monkeypatch):
+    import app.llm
+
+    metrics = LLMStageMetrics()
+    monkeypatch.setattr(app.llm, "llm_stage_metrics", metrics)
+    model = app.llm.get_chat_model("general")
+
+    await model.ainvoke("What does buoy mean?")
+    async for _ in model.astream("What does buoy mean?"):
+        pass
+
+    stats = metrics.stats()["general"]
+    assert stats["calls"] == 2
+    assert stats["avgTtftMs"] is not None
+    assert stats["inputTokens"] > 0
+    assert stats["outputTokens"] > 0
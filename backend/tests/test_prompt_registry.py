@@ -0,0 +1,11 @@
+import app.prompt_registry as prompt_registry
+
+
+def test_only_versioned_files_are_prompt_versions(tmp_path, monkeypatch):
+    stage = tmp_path / "general"
+    stage.mkdir()
+    for name in ["v1.txt", "v10.txt", "v2.txt", "draft.txt", "v3.txt.bak", "README.md"]:
+        (stage / name).write_text("{input}")
+    monkeypatch.setattr(prompt_registry, "PROMPTS_DIR", str(tmp_path))
+
+    assert prompt_registry.prompt_versions("general") == ["v1", "v2", "v10"]
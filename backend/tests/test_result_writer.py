@@ -0,0 +1,177 @@
+import asyncio
+import json
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from app.db.result_writer import DUPLICATE_KEY_ERROR, ResultWriter
+from app.models import General
+
+
+class RecordingResults:
+    def __init__(self, failures=0, delay=0.0):
+        self.batches = []
+        self.failures = failures
+        self.delay = delay
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("primary stepped down")
+        self.batches.append(list(documents))
+
+
+@pytest.fixture
+def results_collection(monkeypatch):
+    collection = RecordingResults()
+    monkeypatch.setattr(
+        "app.db.results.main_db", type("DB", (), {"results": collection})
+    )
+    return collection
+
+
+def make_results(count):
+    return [General(userId="user", input=f"question {i}") for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_batches_by_size_and_flushes_on_stop(results_collection):
+    writer = ResultWriter(batch_size=10, flush_interval=10)
+    await writer.start()
+
+    for result in make_results(25):
+        await writer.enqueue(result)
+    await asyncio.sleep(0.05)
+    # Two full batches went out, the rest waits for the time window
+    assert [len(batch) for batch in results_collection.batches] == [10, 10]
+
+    await writer.stop()
+    assert [len(batch) for batch in results_collection.batches] == [10, 10, 5]
+    assert writer.stats()["written"] == 25
+
+
+@pytest.mark.asyncio
+async def test_flushes_by_time_and_retries(results_collection):
+    results_collection.failures = 2
+    writer = ResultWriter(batch_size=100, flush_interval=0.05, max_retries=3)
+    await writer.start()
+
+    for result in make_results(3):
+        await writer.enqueue(result)
+    await asyncio.sleep(0.6)
+
+    assert [len(batch) for batch in results_collection.batches] == [3]
+    assert writer.stats()["retries"] == 2
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_applies_backpressure(results_collection):
+    results_collection.delay = 0.2
+    writer = ResultWriter(queue_size=2, batch_size=1, flush_interval=0)
+    await writer.start()
+
+    results = make_results(4)
+    for result in results[:3]:
+        await writer.enqueue(result)
+    # One batch is being written and the queue is full
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(writer.enqueue(results[3]), 0.05)
+
+    await writer.stop()
+    assert sum(len(batch) for batch in results_collection.batches) == 3
+
+
+@pytest.mark.asyncio
+async def test_wait_for_a_queued_result(results_collection):
+    writer = ResultWriter(batch_size=100, flush_interval=0.1)
+    await writer.start()
+    result = make_results(1)[0]
+    await writer.enqueue(result)
+    assert results_collection.batches == []
+
+    await asyncio.wait_for(writer.wait_for(str(result.id)), 1)
+    assert len(results_collection.batches) == 1
+    # Already written, nothing to wait for
+    await asyncio.wait_for(writer.wait_for(str(result.id)), 0.01)
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_results_that_cannot_be_saved_go_to_the_dead_letter_file(
+    results_collection, tmp_path, capsys
+):
+    results_collection.failures = 10
+    dead_letter_file = tmp_path / "unsaved.jsonl"
+    writer = ResultWriter(
+        batch_size=100, flush_interval=0, max_retries=1, dead_letter_file=str(dead_letter_file)
+    )
+    await writer.start()
+    result = make_results(1)[0]
+    await writer.enqueue(result)
+
+    # Waiters are released even when the write fails
+    await asyncio.wait_for(writer.wait_for(str(result.id)), 1)
+    assert writer.stats()["failed"] == 1
+    saved = [json.loads(line) for line in dead_letter_file.read_text().splitlines()]
+    assert [document["_id"] for document in saved] == [str(result.id)]
+    # User text stays out of the logs
+    assert result.input not in capsys.readouterr().out
+    await writer.stop()
+
+
+class PartlyFailingResults(RecordingResults):
+    """Answers the first insert_many with a BulkWriteError for the given documents."""
+
+    def __init__(self, write_errors, write_concern_errors=()):
+        super().__init__()
+        self.write_errors = write_errors
+        self.write_concern_errors = list(write_concern_errors)
+
+    async def insert_many(self, documents, ordered=True):
+        if self.write_errors is None:
+            return await super().insert_many(documents, ordered)
+        failed = {index for index, _ in self.write_errors}
+        self.batches.append([d for i, d in enumerate(documents) if i not in failed])
+        details = {
+            "nInserted": len(documents) - len(failed),
+            "writeErrors": [{"index": i, "code": code} for i, code in self.write_errors],
+            "writeConcernErrors": self.write_concern_errors,
+        }
+        self.write_errors = None
+        raise BulkWriteError(details)
+
+
+@pytest.mark.asyncio
+async def test_partly_written_batch_retries_only_the_failed_documents(monkeypatch):
+    # Document 0 was written by an earlier attempt, document 1 hit a transient error
+    collection = PartlyFailingResults([(0, DUPLICATE_KEY_ERROR), (1, 91)])
+    monkeypatch.setattr("app.db.results.main_db", type("DB", (), {"results": collection}))
+    writer = ResultWriter(batch_size=100, flush_interval=10, max_retries=2)
+    await writer.start()
+    results = make_results(4)
+    for result in results:
+        await writer.enqueue(result)
+    await writer.stop()
+
+    assert [[d["input"] for d in batch] for batch in collection.batches] == [
+        ["question 2", "question 3"],
+        ["question 1"],
+    ]
+    assert writer.stats()["written"] == 3
+    assert writer.stats()["failed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_write_concern_error_is_retried(monkeypatch):
+    collection = PartlyFailingResults([], write_concern_errors=[{"code": 64}])
+    monkeypatch.setattr("app.db.results.main_db", type("DB", (), {"results": collection}))
+    writer = ResultWriter(batch_size=100, flush_interval=10, max_retries=2)
+    await writer.start()
+    for result in make_results(2):
+        await writer.enqueue(result)
+    await writer.stop()
+
+    assert writer.stats()["retries"] == 1
+    assert len(collection.batches) == 2
@@ -0,0 +1,129 @@
+import asyncio
+
+import httpx
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+from main import app
+
+
+@pytest.fixture
+def results_db(monkeypatch):
+    db = AsyncMongoMockClient().get_database("test")
+    monkeypatch.setattr("app.db.results.main_db", db)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_parallel_follow_ups_are_not_lost(fake_chat_model, results_db, user_id):
+    result_id = ObjectId()
+    await results_db.results.insert_one(
+        {"_id": result_id, "userId": user_id, "type": "general", "input": "hi"}
+    )
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        responses = await asyncio.gather(
+            *[
+                client.post(
+                    f"/further-questions?user_id={user_id}",
+                    json={
+                        "resultId": str(result_id),
+                        "type": "general",
+                        "input": "hi",
+                        "context": "{}",
+                        "question": f"question {i}",
+                    },
+                )
+                for i in range(10)
+            ]
+        )
+
+    assert all(response.status_code == 200 for response in responses)
+    result = await results_db.results.find_one({"_id": result_id})
+    questions = sorted(item["question"] for item in result["extraQuestions"])
+    assert questions == sorted(f"question {i}" for i in range(10))
+
+
+@pytest.mark.asyncio
+async def test_follow_up_on_a_missing_result_is_a_404(fake_chat_model, results_db, user_id):
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        for result_id in (str(ObjectId()), "not-an-id"):
+            response = await client.post(
+                f"/further-questions?user_id={user_id}",
+                json={"resultId": result_id, "type": "general", "question": "why?"},
+            )
+            assert response.status_code == 404
+
+    assert fake_chat_model.calls == []
+
+
+@pytest.mark.asyncio
+async def test_extra_questions_are_capped(results_db, monkeypatch):
+    from app.db.results import results_repository
+
+    monkeypatch.setattr("app.db.results.EXTRA_QUESTIONS_LIMIT", 3)
+    result_id = ObjectId()
+    await results_db.results.insert_one({"_id": result_id})
+
+    for i in range(5):
+        assert await results_repository.append_extra_question(str(result_id), f"q{i}", "a")
+    assert not await results_repository.append_extra_question(str(ObjectId()), "q", "a")
+
+    result = await results_db.results.find_one({"_id": result_id})
+    assert [item["question"] for item in result["extraQuestions"]] == ["q2", "q3", "q4"]
+
+
+@pytest.mark.asyncio
+async def test_history_keyset_pagination(results_db, user_id):
+    from datetime import datetime, timedelta
+
+    start = datetime(2024, 1, 1)
+    for i in range(25):
+        await results_db.results.insert_one(
+            {
+                "_id": ObjectId(),
+                "userId": user_id,
+                "type": "breakdown" if i % 2 else "general",
+                "input": f"input {i}",
+                # Pairs of results share a timestamp so ties are broken by _id
+                "createdAt": start + timedelta(minutes=i // 2),
+                "breakdown": "long body",
+                "answer": "long body",
+            }
+        )
+    await results_db.results.insert_one(
+        {"_id": ObjectId(), "userId": "someone else", "createdAt": start}
+    )
+
+    pages = []
+    cursor = None
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        while True:
+            params = {"user_id": user_id, "limit": 10}
+            if cursor:
+                params["cursor"] = cursor
+            body = (await client.get("/history", params=params)).json()
+            pages.append(body["items"])
+            cursor = body["nextCursor"]
+            if not cursor:
+                break
+
+        filtered = (
+            await client.get(
+                "/history", params={"user_id": user_id, "type": "breakdown", "limit": 50}
+            )
+        ).json()
+        invalid = await client.get("/history", params={"user_id": user_id, "cursor": "x"})
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    items = [item for page in pages for item in page]
+    assert len({item["id"] for item in items}) == 25
+    assert [item["createdAt"] for item in items] == sorted(
+        (item["createdAt"] for item in items), reverse=True
+    )
+    assert all("breakdown" not in item and "answer" not in item for item in items)
+
+    assert len(filtered["items"]) == 12
+    assert {item["type"] for item in filtered["items"]} == {"breakdown"}
+    assert invalid.status_code == 400
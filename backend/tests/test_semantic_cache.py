@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from main import app
+from app.semantic_cache import HashingEmbedder, SemanticCache, make_embedder
+from tests.conftest import run_websocket
+
+
+def test_near_identical_questions_hit():
+    cache = SemanticCache(HashingEmbedder(), threshold=0.9)
+    cache.add("What is the difference between affect and effect?", "answer")
+
+    assert cache.lookup("what's the difference between affect and effect")["answer"] == "answer"
+    assert cache.lookup("What does 'break a leg' mean?") is None
+    assert cache.stats()["hitRate"] == 0.5
+
+
+def test_usage_questions_about_the_same_words_miss():
+    cache = SemanticCache(HashingEmbedder(), threshold=0.9)
+    cache.add("When do I use 'a' and when do I use 'an'?", "articles")
+    cache.add("What does 'affect' mean?", "meaning")
+    cache.add("What is the past tense of run?", "past tense")
+
+    assert cache.lookup("When do I use 'the'?") is None
+    assert cache.lookup("How do I use 'affect'?") is None
+    assert cache.lookup("Is run the past tense?") is None
+    assert cache.lookup("what does affect mean")["answer"] == "meaning"
+
+
+def test_eviction_and_persistence(tmp_path):
+    cache = SemanticCache(HashingEmbedder(), threshold=0.9, max_entries=2)
+    cache.add("What does 'break the ice' mean?", "1")
+    cache.add("How do I write a formal email?", "2")
+    cache.lookup("What does 'break the ice' mean?")
+    cache.add("When do I use 'a' and when do I use 'an'?", "3")
+
+    # The least recently used entry was evicted
+    assert len(cache) == 2
+    assert cache.lookup("How do I write a formal email?") is None
+
+    path = str(tmp_path / "semantic_cache.npz")
+    cache.save(path)
+    restored = SemanticCache(HashingEmbedder(), threshold=0.9)
+    restored.load(path)
+    assert restored.lookup("what does break the ice mean")["answer"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_general_replays_cached_answer(
+    fake_chat_model, cleanup_all_results, user_id, monkeypatch
+):
+    monkeypatch.setattr("app.handlers.semantic_cache", SemanticCache(HashingEmbedder()))
+
+    first = await run_websocket(
+        app, "/ws/general", {"input": "Difference between affect and effect?"}, user_id
+    )
+    second = await run_websocket(
+        app, "/ws/general", {"input": "difference between effect and affect"}, user_id
+    )
+
+    assert len(fake_chat_model.calls) == 1
+    answer = lambda responses: "".join(response["answer"] for response in responses)
+    assert answer(second) == answer(first)
+    assert second[0]["id"] != first[0]["id"]
+
+
+def test_embedder_falls_back_to_hashing_when_fastembed_fails(monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("model download failed")
+
+    monkeypatch.setattr("app.semantic_cache.FastEmbedEmbedder", broken)
+    assert isinstance(make_embedder("auto"), HashingEmbedder)
+    assert isinstance(make_embedder("fastembed"), HashingEmbedder)
+
+
+@pytest.mark.asyncio
+async def test_cache_is_saved_periodically(tmp_path):
+    path = str(tmp_path / "semantic_cache.npz")
+    cache = SemanticCache(HashingEmbedder(), save_interval=0.05)
+    await cache.start(path)
+    cache.add("what does break the ice mean", "1")
+    await asyncio.sleep(0.2)
+
+    # Saved before shutdown
+    restored = SemanticCache(HashingEmbedder())
+    restored.load(path)
+    assert len(restored) == 1
+    await cache.stop(path)
@@ -0,0 +1,40 @@
+import pytest
+
+from app.sentence_classifier import SentenceClassifier
+
+
+@pytest.mark.parametrize(
+    "text,expected",
+    [
+        ("buoy", False),
+        ("ingratiate oneself with someone", False),
+        ("**heavy-handed**", False),
+        ("The design team staged an **intervention** with you.", True),
+        ("I'm **swamped**.", True),
+        ("be **in place**", None),
+    ],
+)
+def test_predict(text, expected):
+    assert SentenceClassifier().predict(text) is expected
+
+
+def test_counts_avoided_llm_calls():
+    classifier = SentenceClassifier()
+    for text in ["buoy", "She **shrugged off** the criticism.", "take **a rain check**"]:
+        classifier.classify(text)
+
+    assert classifier.stats() == {"local": 2, "llm": 1, "llmAvoidedRate": 0.6667}
+
+
+@pytest.mark.asyncio
+async def test_workflow_skips_llm_for_plain_words(fake_chat_model, monkeypatch):
+    import app.workflows.vocabulary as vocabulary
+
+    monkeypatch.setattr(vocabulary, "sentence_classifier", SentenceClassifier())
+    result = await vocabulary.check_if_input_is_sentence(
+        vocabulary.OverallState(thread_id="test", input="buoy", vocabulary="buoy"),
+        lambda frame: None,
+    )
+
+    assert result == {}
+    assert fake_chat_model.calls == []
@@ -0,0 +1,90 @@
+import pytest
+
+from main import app
+from tests.conftest import run_websocket
+
+
+def all_done(request_ids):
+    return lambda responses: {
+        response["requestId"] for response in responses if response.get("done")
+    } >= set(request_ids)
+
+
+@pytest.mark.asyncio
+async def test_session_multiplexes_requests(
+    fake_chat_model, memory_workflows, cleanup_all_results, user_id, mock_main_db
+):
+    """
+    One /ws/session socket runs several workflows and tags every frame with its requestId
+    """
+    frames = [
+        {"requestId": "c1", "type": "correction", "input": "I am go to school"},
+        {"requestId": "v1", "type": "vocabulary", "input": "buoy"},
+        {"requestId": "b1", "type": "breakdown", "input": "cut myself some slack"},
+        {"requestId": "g1", "type": "general", "input": "affect or effect?"},
+    ]
+
+    responses = await run_websocket(
+        app, "/ws/session", frames, user_id, close_when=all_done(["c1", "v1", "b1", "g1"])
+    )
+
+    assert all("error" not in response for response in responses)
+    by_request = {}
+    for response in responses:
+        by_request.setdefault(response["requestId"], []).append(response)
+
+    assert by_request["c1"][0]["type"] == "correction"
+    assert by_request["v1"][0]["type"] == "vocabulary"
+    assert by_request["b1"][0]["type"] == "breakdown"
+    assert by_request["g1"][0]["type"] == "general"
+    # Responses of different requests are interleaved on the socket
+    order = [response["requestId"] for response in responses]
+    assert order != sorted(order, key=order.index)
+
+    saved = [item for item in mock_main_db.results.items if item.get("userId") == user_id]
+    assert {item["type"] for item in saved} >= {
+        "correction",
+        "vocabulary",
+        "breakdown",
+        "general",
+    }
+
+
+@pytest.mark.asyncio
+async def test_session_limits_inflight_requests(
+    fake_chat_model, memory_workflows, cleanup_all_results, user_id, monkeypatch
+):
+    import main
+
+    monkeypatch.setattr(main, "SESSION_MAX_INFLIGHT", 1)
+    frames = [
+        {"requestId": "g1", "type": "general", "input": "affect or effect?"},
+        {"requestId": "g2", "type": "general", "input": "who or whom?"},
+        {"requestId": "x1", "type": "unknown", "input": "?"},
+    ]
+
+    responses = await run_websocket(
+        app, "/ws/session", frames, user_id, close_when=all_done(["g1"])
+    )
+
+    errors = {r["requestId"]: r["error"] for r in responses if "error" in r}
+    assert "Too many requests in flight" in errors["g2"]
+    assert "Unknown type" in errors["x1"]
+    assert "g1" not in errors
+
+
+@pytest.mark.asyncio
+async def test_disconnect_waits_for_inflight_requests_to_unwind(
+    fake_chat_model, memory_workflows, cleanup_all_results, user_id
+):
+    fake_chat_model.response_tokens = 200
+    frames = [{"requestId": "g1", "type": "general", "input": "affect or effect?"}]
+
+    # Disconnect after the first token of a long answer
+    responses = await run_websocket(
+        app, "/ws/session", frames, user_id, close_when=lambda responses: len(responses) >= 1
+    )
+
+    assert not any(response.get("done") for response in responses)
+    # The model stream, run by single-flight, was closed before the endpoint returned
+    assert fake_chat_model.active_calls == 0
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+import app.handlers as handlers
+from app.single_flight import FlightCancelled, SingleFlight
+
+USER = {
+    "id": "user-a",
+    "aboutMe": "I'm a jazz pianist.",
+    "englishLevel": "B2",
+    "motherTongue": "Korean",
+}
+
+
+async def collect(generator) -> list:
+    return [frame async for frame in generator]
+
+
+@pytest.mark.asyncio
+async def test_followers_replay_and_outlive_the_leader():
+    starts = []
+
+    async def numbers():
+        starts.append(1)
+        for i in range(5):
+            await asyncio.sleep(0.01)
+            yield i
+
+    flights = SingleFlight()
+    leader = flights.join("key", numbers)
+    leader_events = aiter(leader)
+    assert await anext(leader_events) == 0
+
+    follower = flights.join("key", numbers)
+    # The leader disconnects, the run continues for the follower
+    await leader_events.aclose()
+    assert await collect(follower) == [0, 1, 2, 3, 4]
+    assert len(starts) == 1
+    assert flights.stats()["followers"] == 1
+
+    # Finished runs are not shared
+    assert flights.join("key", numbers).leader
+
+
+@pytest.mark.asyncio
+async def test_run_is_cancelled_when_nobody_listens():
+    cancelled = asyncio.Event()
+
+    async def forever():
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield "tick"
+        finally:
+            cancelled.set()
+
+    flights = SingleFlight()
+    subscription = flights.join("key", forever)
+    events = aiter(subscription)
+    await anext(events)
+    await events.aclose()
+    # A request arriving while the run is being cancelled starts a new one
+    rejoined = flights.join("key", forever)
+    assert rejoined.leader
+    await asyncio.wait_for(cancelled.wait(), 1)
+    await asyncio.sleep(0)
+    rejoined_events = aiter(rejoined)
+    await anext(rejoined_events)
+    await rejoined_events.aclose()
+
+    # The cancelled run ends with an error, not as a short complete stream
+    with pytest.raises(FlightCancelled):
+        await collect(subscription)
+
+
+@pytest.mark.asyncio
+async def test_vocabulary_shares_the_run_and_personalizes_examples(
+    fake_chat_model, memory_workflows, monkeypatch
+):
+    async def save_nothing(result):
+        pass
+
+    monkeypatch.setattr(handlers, "save_result", save_nothing)
+    student = {**USER, "id": "user-b", "aboutMe": "I'm a nurse."}
+    classmate = {**USER, "id": "user-c"}
+
+    results = await asyncio.gather(
+        *[
+            collect(handlers.handle_vocabulary(user, {"input": "buoy"}))
+            for user in (USER, student, classmate)
+        ]
+    )
+
+    example_calls = [
+        call for call in fake_chat_model.calls if call["tool"] == "ExampleSentenceResponse"
+    ]
+    other_prompts = [
+        call["prompt"] for call in fake_chat_model.calls if call not in example_calls
+    ]
+    # One run for everyone, plus examples for the profile that differs
+    assert len(other_prompts) == len(set(other_prompts))
+    assert len(example_calls) == 2
+    assert any("nurse" in call["prompt"] for call in example_calls)
+
+    for user, frames in zip((USER, student, classmate), results):
+        assert len({frame["id"] for frame in frames}) == 1
+        assert any("definition" in frame for frame in frames)
+        assert any("examples" in frame for frame in frames)
+    assert results[0][0]["id"] != results[2][0]["id"]
+
+
+@pytest.mark.asyncio
+async def test_general_questions_are_answered_once(fake_chat_model, monkeypatch):
+    async def save_nothing(result):
+        pass
+
+    monkeypatch.setattr(handlers, "save_result", save_nothing)
+    results = await asyncio.gather(
+        collect(handlers.handle_general(USER, {"input": "When should I use 'a' or 'an'?"})),
+        collect(
+            handlers.handle_general(
+                {**USER, "id": "user-b"}, {"input": "  When should I use 'a' or  'an'? "}
+            )
+        ),
+    )
+
+    assert len(fake_chat_model.calls) == 1
+    answers = ["".join(frame["answer"] for frame in frames) for frames in results]
+    assert answers[0] == answers[1] != ""
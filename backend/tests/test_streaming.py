@@ -0,0 +1,100 @@
+import pytest
+
+from main import app
+from tests.conftest import run_websocket
+
+
+def join_deltas(responses: list) -> dict:
+    text = {}
+    for response in responses:
+        if "delta" in response:
+            field = response["delta"]["field"]
+            text[field] = text.get(field, "") + response["delta"]["text"]
+    return text
+
+
+@pytest.mark.asyncio
+async def test_vocabulary_token_deltas(
+    fake_chat_model, memory_workflows, cleanup_all_results, user_id, mock_main_db
+):
+    """
+    With "stream": "delta" text fields arrive token by token, then as final values
+    """
+    responses = await run_websocket(
+        app, "/ws/vocabulary", {"input": "buoy", "stream": "delta"}, user_id
+    )
+
+    assert all("error" not in response for response in responses)
+    deltas = join_deltas(responses)
+    finals = {
+        key: response[key]
+        for response in responses
+        for key in ("input", "definition")
+        if key in response
+    }
+    assert set(deltas) >= {"input", "definition"}
+    assert deltas["input"] == finals["input"]
+    assert deltas["definition"] == finals["definition"]
+    # The first delta of a field comes before its final value
+    first_delta = next(i for i, r in enumerate(responses) if "delta" in r)
+    first_final = next(i for i, r in enumerate(responses) if "definition" in r)
+    assert first_delta < first_final
+
+    saved = next(
+        item
+        for item in mock_main_db.results.items
+        if str(item.get("_id")) == responses[0]["id"]
+    )
+    assert saved["definition"] == finals["definition"]
+
+
+@pytest.mark.asyncio
+async def test_correction_without_deltas(
+    fake_chat_model, memory_workflows, cleanup_all_results, user_id
+):
+    """
+    Clients that don't opt in get the same frames as before
+    """
+    responses = await run_websocket(
+        app, "/ws/correction", {"input": "I go store everyday"}, user_id
+    )
+
+    assert responses
+    assert all("delta" not in response for response in responses)
+    assert "correctedText" in responses[0]
+
+
+@pytest.mark.asyncio
+async def test_vocabulary_example_deltas(
+    fake_chat_model, memory_workflows, cleanup_all_results, user_id, mock_main_db
+):
+    """
+    Example deltas rebuild the consolidated list sent at the end
+    """
+    responses = await run_websocket(
+        app, "/ws/vocabulary", {"input": "buoy", "stream": "delta"}, user_id
+    )
+
+    examples = []
+    for response in responses:
+        delta = response.get("delta")
+        if not delta or delta["field"] != "examples":
+            continue
+        if delta["index"] == len(examples):
+            examples.append("")
+        if delta.get("replace"):
+            examples[delta["index"]] = delta["text"]
+        else:
+            examples[delta["index"]] += delta["text"]
+
+    final = [response["examples"] for response in responses if "examples" in response]
+    assert len(final) == 1
+    assert examples == final[0]
+    assert len(examples) == 3
+
+    saved = next(
+        item
+        for item in mock_main_db.results.items
+        if str(item.get("_id")) == responses[0]["id"]
+    )
+    assert saved["examples"] == examples
@@ -0,0 +1,99 @@
+import pytest
+from httpx import AsyncClient
+
+from main import app
+from app.tracing import JsonlSpanExporter, Span, Tracer
+from tests.conftest import run_websocket
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    async def export(self, spans):
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def test_tracer(monkeypatch):
+    """
+    Trace every request into a list
+    """
+    tracer = Tracer(ListExporter(), sample_rate=1.0, enabled=True)
+    for module in [
+        "main",
+        "app.tracing",
+        "app.llm",
+        "app.db.results",
+        "app.db.users",
+        "app.db.vocabulary_store",
+    ]:
+        monkeypatch.setattr(f"{module}.tracer", tracer)
+    return tracer
+
+
+@pytest.mark.asyncio
+async def test_vocabulary_request_is_traced(
+    fake_chat_model, memory_workflows, cleanup_all_results, user_id, test_tracer
+):
+    await run_websocket(app, "/ws/vocabulary", {"input": "buoy"}, user_id)
+    await test_tracer.flush()
+
+    spans = test_tracer.exporter.spans
+    request = next(span for span in spans if span.kind == "request")
+    assert request.name == "request.vocabulary"
+    assert request.parent_id is None
+
+    nodes = {span.name: span for span in spans if span.kind == "node"}
+    assert "vocabulary.get_definition" in nodes
+    assert all(span.parent_id == request.span_id for span in nodes.values())
+
+    llm_calls = [span for span in spans if span.kind == "llm"]
+    definition_call = next(
+        span for span in llm_calls if span.name == "vocabulary.get_definition"
+    )
+    assert definition_call.parent_id == nodes["vocabulary.get_definition"].span_id
+    assert definition_call.attributes["outputTokens"] > 0
+    assert definition_call.attributes["ttftMs"] is not None
+
+    mongo = [span for span in spans if span.kind == "mongo"]
+    assert "mongo.results.insert_one" in {span.name for span in mongo}
+    # The user lookup before the request is its own trace
+    assert {span.trace_id for span in spans if span.name != "mongo.users.find_one"} == {
+        request.trace_id
+    }
+
+
+@pytest.mark.asyncio
+async def test_unsampled_requests_still_count_in_metrics(
+    fake_chat_model, memory_workflows, cleanup_all_results, user_id, test_tracer
+):
+    test_tracer.sample_rate = 0.0
+    await run_websocket(app, "/ws/correction", {"input": "I go store everyday"}, user_id)
+    await test_tracer.flush()
+
+    assert test_tracer.exporter.spans == []
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert (
+        'englishtutor_span_duration_ms_count{kind="request",name="request.correction"} 1'
+        in response.text
+    )
+    assert 'kind="node",name="correction.correct_input"' in response.text
+
+
+@pytest.mark.asyncio
+async def test_trace_file_is_rotated(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonlSpanExporter(str(path), max_bytes=1)
+    spans = [Span("request.general", "request", None, True, {})]
+
+    await exporter.export(spans)
+    await exporter.export(spans)
+    await exporter.export(spans)
+
+    # Only the current file and one previous one are kept
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["traces.jsonl", "traces.jsonl.1"]
+    assert len(path.read_text().splitlines()) == 1
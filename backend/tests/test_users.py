@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.db.users import UserProfileService
+
+
+class CountingUsers:
+    def __init__(self, users, delay=0.01):
+        self.users = users
+        self.delay = delay
+        self.queries = 0
+
+    async def find_one(self, query):
+        self.queries += 1
+        await asyncio.sleep(self.delay)
+        for user in self.users:
+            if user["googleId"] == query["googleId"]:
+                return dict(user)
+        return None
+
+
+@pytest.fixture
+def users_collection(monkeypatch):
+    import app.db.users
+
+    collection = CountingUsers([{"googleId": "g1", "englishLevel": "B2"}])
+    monkeypatch.setattr(app.db.users, "main_db", type("DB", (), {"users": collection}))
+    return collection
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_query(users_collection):
+    service = UserProfileService()
+
+    profiles = await asyncio.gather(*[service.get("g1") for _ in range(10)])
+
+    assert users_collection.queries == 1
+    assert all(profile["englishLevel"] == "B2" for profile in profiles)
+    assert await service.get("g1") == profiles[0]
+    assert users_collection.queries == 1
+    assert service.stats()["hitRate"] > 0.9
+
+
+@pytest.mark.asyncio
+async def test_waiters_survive_the_owner_being_cancelled(users_collection):
+    service = UserProfileService()
+
+    owner = asyncio.create_task(service.get("g1"))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(service.get("g1")) for _ in range(3)]
+    await asyncio.sleep(0)
+    owner.cancel()
+
+    profiles = await asyncio.wait_for(asyncio.gather(*waiters), 1)
+    assert all(profile["englishLevel"] == "B2" for profile in profiles)
+    assert service._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_ttl_invalidation_and_eviction(users_collection):
+    service = UserProfileService(max_size=1, ttl=60)
+
+    await service.get("g1")
+    users_collection.users[0]["englishLevel"] = "C1"
+    assert (await service.get("g1"))["englishLevel"] == "B2"
+
+    service.invalidate("g1")
+    assert (await service.get("g1"))["englishLevel"] == "C1"
+    assert users_collection.queries == 2
+
+    # Unknown users are not cached and don't evict known ones
+    assert await service.get("missing") is None
+    assert service.stats()["size"] == 1
+
+    service.ttl = 0
+    service.invalidate("g1")
+    await service.get("g1")
+    await service.get("g1")
+    assert users_collection.queries == 5
+
+
+@pytest.mark.asyncio
+async def test_invalidate_requires_the_internal_secret(users_collection, monkeypatch):
+    import httpx
+
+    import main
+
+    async def invalidate(headers):
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.post("/users/g1/invalidate", headers=headers)
+
+    # Closed until a secret is configured
+    monkeypatch.setattr(main, "INTERNAL_API_SECRET", None)
+    assert (await invalidate({"x-internal-secret": ""})).status_code == 403
+
+    monkeypatch.setattr(main, "INTERNAL_API_SECRET", "secret")
+    assert (await invalidate({"user-id": "g1"})).status_code == 403
+    assert (await invalidate({"x-internal-secret": "wrong"})).status_code == 403
+    assert (await invalidate({"x-internal-secret": "secret"})).json() == {"invalidated": True}
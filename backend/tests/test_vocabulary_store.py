@@ -0,0 +1,59 @@
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.db.vocabulary_store import (
+    get_translation,
+    is_word_or_phrase,
+    normalize_lemma,
+    vocabulary_store,
+)
+from app.workflows.vocabulary import g as vocabulary_graph
+
+
+def test_lemma_normalization():
+    assert normalize_lemma("  At One’s  Disposal. ") == "at one's disposal"
+    assert is_word_or_phrase("indubitable")
+    assert is_word_or_phrase("at one's disposal")
+    assert not is_word_or_phrase("The design team staged an **intervention** with you.")
+    assert not is_word_or_phrase("Do we have that in place?")
+
+
+async def lookup(input: str) -> list:
+    workflow = vocabulary_graph.compile(checkpointer=MemorySaver())
+    frames = []
+    async for stream_mode, data in workflow.astream(
+        {"input": input, "thread_id": "test", "motherTongue": "Korean"},
+        stream_mode=["custom"],
+        config={"configurable": {"thread_id": "test"}},
+    ):
+        frames.append(data)
+    await vocabulary_store.flush()
+    return frames
+
+
+@pytest.mark.asyncio
+async def test_known_words_skip_the_llm(fake_chat_model):
+    fake_chat_model.responder = lambda prompt: "buoy"
+
+    await lookup("bouy")
+    text_calls = [call for call in fake_chat_model.calls if not call["tool"]]
+    # correct_input, get_definition and translate_to_mother_tongue
+    assert len(text_calls) == 3
+
+    fake_chat_model.calls.clear()
+    frames = await lookup("bouy")
+
+    assert [call for call in fake_chat_model.calls if not call["tool"]] == []
+    assert {"corrected_input": "buoy"} in frames
+    assert {"definition": "buoy"} in frames
+    assert {"translated_vocabulary": "buoy"} in frames
+
+
+@pytest.mark.asyncio
+async def test_mother_tongue_cannot_change_the_update_path():
+    for language in ["Korean", "$where", "a.b"]:
+        await vocabulary_store.save("anchor", language=language, translation=f"in {language}")
+
+    entry = await vocabulary_store.find("anchor")
+    assert set(entry["translations"]) == {"korean", "_where", "a_b"}
+    assert get_translation(entry, "a.b") == "in a.b"
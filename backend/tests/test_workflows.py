@@ -0,0 +1,64 @@
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.workflows.correction import g as correction_graph
+from app.workflows.breakdown import g as breakdown_graph
+
+
+async def collect_custom_frames(graph, input: str, configurable: dict) -> list:
+    workflow = graph.compile(checkpointer=MemorySaver())
+    frames = []
+    async for stream_mode, data in workflow.astream(
+        {"input": input, "thread_id": "test"},
+        stream_mode=["custom"],
+        config={"configurable": {"thread_id": "test", **configurable}},
+    ):
+        frames.append(data)
+    return frames
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("explanation_mode", ["batch", "loop"])
+async def test_correction_explanation_modes(fake_chat_model, explanation_mode):
+    """
+    Both explanation modes emit the corrected text and `correction` frames
+    """
+    frames = await collect_custom_frames(
+        correction_graph, "I go store everyday", {"explanation_mode": explanation_mode}
+    )
+
+    # Token deltas of the corrected text come first, then its final value
+    frames = [frame for frame in frames if "delta" not in frame]
+    assert "correctedText" in frames[0]
+    corrections = [frame["correction"] for frame in frames if "correction" in frame]
+    assert len(corrections) > 0
+    assert all(correction.explanation for correction in corrections)
+
+    explanation_calls = [call for call in fake_chat_model.calls if call["tool"]]
+    if explanation_mode == "batch":
+        # One structured call streams every item
+        assert len(explanation_calls) == 1
+        assert len(corrections) == 3
+
+
+@pytest.mark.asyncio
+async def test_breakdown_nodes_stream_in_parallel(fake_chat_model):
+    """
+    Paraphrase and breakdown tokens arrive interleaved, keyed by langgraph_node
+    """
+    workflow = breakdown_graph.compile(checkpointer=MemorySaver())
+    nodes = []
+    async for stream_mode, (message, metadata) in workflow.astream(
+        {"input": "Did I say anything completely out in left field?", "thread_id": "test"},
+        stream_mode=["messages"],
+        config={"configurable": {"thread_id": "test"}},
+    ):
+        if message.content:
+            nodes.append(metadata["langgraph_node"])
+
+    assert set(nodes) == {"generate_paraphrase", "generate_breakdown"}
+    # The second node starts before the first one finishes
+    first_node = nodes[0]
+    assert nodes.index(next(node for node in nodes if node != first_node)) < nodes.count(
+        first_node
+    )
@@ -0,0 +1,76 @@
+"""
+Benchmark time-to-first-token and total time of the breakdown workflow.
+
+before: generate_paraphrase -> generate_breakdown (sequential)
+after:  both nodes fan out from START (app/workflows/breakdown.py)
+
+Run from the backend directory:
+    python ../eval/scripts/bench_breakdown.py --runs 5 --token-latency 0.01
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Benchmarks measure the app, not the provider rate limits
+os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import START, END, StateGraph
+
+import app.llm as llm
+import app.workflows.breakdown as breakdown
+from app.state import OverallState, InputState, OutputState
+from app.utils.fake_chat_model import FakeChatModel
+
+
+def sequential_graph():
+    g = StateGraph(OverallState, input=InputState, output=OutputState)
+    g.add_node("generate_paraphrase", breakdown.generate_paraphrase)
+    g.add_node("generate_breakdown", breakdown.generate_breakdown)
+    g.add_edge(START, "generate_paraphrase")
+    g.add_edge("generate_paraphrase", "generate_breakdown")
+    g.add_edge("generate_breakdown", END)
+    return g
+
+
+async def run(graph) -> tuple:
+    workflow = graph.compile(checkpointer=MemorySaver())
+    start = time.perf_counter()
+    first_token = {}
+    async for stream_mode, (message, metadata) in workflow.astream(
+        {"input": "Did I say anything completely out in left field?", "thread_id": "1"},
+        stream_mode=["messages"],
+        config={"configurable": {"thread_id": "1"}},
+    ):
+        if message.content:
+            first_token.setdefault(
+                metadata["langgraph_node"], (time.perf_counter() - start) * 1000
+            )
+    return first_token, (time.perf_counter() - start) * 1000
+
+
+async def main(runs: int, token_latency: float):
+    llm.chat_model = FakeChatModel(token_latency=token_latency, response_tokens=50)
+
+    for name, graph in (("before", sequential_graph()), ("after", breakdown.g)):
+        results = [await run(graph) for _ in range(runs)]
+        for node in ("generate_paraphrase", "generate_breakdown"):
+            ttft = statistics.median(first_token[node] for first_token, _ in results)
+            print(f"{name:<7} {node:<20} ttft={ttft:8.1f}ms")
+        total = statistics.median(total for _, total in results)
+        print(f"{name:<7} {'total':<20}      {total:8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.token_latency))
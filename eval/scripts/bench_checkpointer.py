@@ -0,0 +1,175 @@
+"""
+Benchmark the checkpointer policies on the correction, vocabulary and breakdown handlers.
+
+    mongo-unbatched  AsyncMongoDBSaver, one awaited upsert per checkpoint and per task write
+    mongo            BatchedMongoSaver, writes queued and flushed with bulk_write
+    memory           BoundedMemorySaver
+    none             no checkpoints
+
+Mongo is mongomock behind a proxy that adds `--write-latency` to every write round trip
+and counts them. Reported per policy:
+    total p50/p95   handler latency
+    writes/req      write round trips awaited by the request itself
+    trips/req       all write round trips, including background flushes
+    ops/req         documents upserted
+
+Run from the backend directory:
+    python ../eval/scripts/bench_checkpointer.py --requests 30 --concurrency 8 --write-latency 0.005
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Benchmarks measure the app, not the provider rate limits
+os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+os.environ.setdefault("VOCABULARY_STORE_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+os.environ.setdefault("TRACE_EXPORTER", "none")
+
+from langgraph.checkpoint.mongodb.aio import AsyncMongoDBSaver
+from mongomock_motor import AsyncMongoMockClient
+
+import app.handlers as handlers
+import app.llm as llm
+from app.models import ResponseType
+from app.utils import compile_graph
+from app.utils.checkpointers import BatchedMongoSaver, BoundedMemorySaver
+from app.utils.fake_chat_model import FakeChatModel
+
+USER = {"id": "benchmark", "aboutMe": "", "englishLevel": "B2", "motherTongue": "Korean"}
+INPUTS = {
+    ResponseType.CORRECTION.value: "I go store everyday",
+    ResponseType.VOCABULARY.value: "buoy",
+    ResponseType.BREAKDOWN.value: "Did I say anything completely out in left field?",
+}
+GRAPHS = {
+    ResponseType.CORRECTION.value: handlers.correction_graph,
+    ResponseType.VOCABULARY.value: handlers.vocabulary_graph,
+    ResponseType.BREAKDOWN.value: handlers.breakdown_graph,
+}
+POLICIES = ["mongo-unbatched", "mongo", "memory", "none"]
+
+
+class SlowCollection:
+    """Counts write round trips to a mongomock collection and delays each one."""
+
+    def __init__(self, collection, latency: float):
+        self.collection = collection
+        self.latency = latency
+        self.trips = 0
+        self.operations = 0
+
+    async def update_one(self, *args, **kwargs):
+        self.trips += 1
+        self.operations += 1
+        await asyncio.sleep(self.latency)
+        return await self.collection.update_one(*args, **kwargs)
+
+    async def bulk_write(self, operations, **kwargs):
+        self.trips += 1
+        self.operations += len(operations)
+        await asyncio.sleep(self.latency)
+        return await self.collection.bulk_write(operations, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+def make_checkpointer(policy: str, latency: float):
+    """Returns the checkpointer and the proxied Mongo collections it writes to."""
+    if policy == "none":
+        return None, []
+    if policy == "memory":
+        return BoundedMemorySaver(), []
+
+    client = AsyncMongoMockClient()
+    if policy == "mongo-unbatched":
+        checkpointer = AsyncMongoDBSaver(client)
+        targets = [(checkpointer, "checkpoint_collection"), (checkpointer, "writes_collection")]
+    else:
+        checkpointer = BatchedMongoSaver(client, flush_interval=0.2)
+        # Behind the write buffers, where the bulk writes go
+        targets = [
+            (checkpointer.checkpoint_collection, "collection"),
+            (checkpointer.writes_collection, "collection"),
+        ]
+    collections = []
+    for target, attribute in targets:
+        collection = SlowCollection(getattr(target, attribute), latency)
+        setattr(target, attribute, collection)
+        collections.append(collection)
+    return checkpointer, collections
+
+
+async def save_nothing(result):
+    pass
+
+
+async def run(type: str) -> float:
+    start = time.perf_counter()
+    async for frame in handlers.HANDLERS[type](USER, {"input": INPUTS[type]}):
+        pass
+    return (time.perf_counter() - start) * 1000
+
+
+async def bench(policy: str, args) -> dict:
+    checkpointer, collections = make_checkpointer(policy, args.write_latency)
+    for type, graph in GRAPHS.items():
+        compile_graph.compiled_workflows[type] = graph.compile(checkpointer=checkpointer)
+
+    jobs = [type for type in GRAPHS for _ in range(args.requests)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def job(type):
+        async with semaphore:
+            return await run(type)
+
+    latencies = await asyncio.gather(*[job(type) for type in jobs])
+    if isinstance(checkpointer, BatchedMongoSaver):
+        # Runs only queue writes, every round trip is a background flush
+        trips_in_requests = 0
+        await checkpointer.close()
+    else:
+        trips_in_requests = sum(collection.trips for collection in collections)
+
+    ordered = sorted(latencies)
+    return {
+        "p50": statistics.median(ordered),
+        "p95": ordered[int(0.95 * (len(ordered) - 1))],
+        "writes": trips_in_requests / len(jobs),
+        "trips": sum(collection.trips for collection in collections) / len(jobs),
+        "operations": sum(collection.operations for collection in collections) / len(jobs),
+    }
+
+
+async def main(args):
+    llm.chat_model = FakeChatModel(token_latency=args.token_latency, response_tokens=20)
+    handlers.save_result = save_nothing
+    print(f"{'policy':<16} {'p50':>9} {'p95':>9} {'writes/req':>11} {'trips/req':>10} {'ops/req':>8}")
+    for policy in args.policies:
+        # Node logs go to stdout
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            result = await bench(policy, args)
+        print(
+            f"{policy:<16} {result['p50']:7.1f}ms {result['p95']:7.1f}ms "
+            f"{result['writes']:11.1f} {result['trips']:10.2f} {result['operations']:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20, help="requests per workflow")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--token-latency", type=float, default=0.002)
+    parser.add_argument("--write-latency", type=float, default=0.005)
+    parser.add_argument("--policies", nargs="+", default=POLICIES, choices=POLICIES)
+    asyncio.run(main(parser.parse_args()))
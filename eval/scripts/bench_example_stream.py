@@ -0,0 +1,86 @@
+"""
+Compare bytes sent and JSON serialization time per vocabulary request.
+
+values: every examples frame carries the whole list so far
+delta:  frames carry only the appended characters, plus one consolidated list at the end
+
+Run from the backend directory:
+    python ../eval/scripts/bench_example_stream.py --runs 5 --example-tokens 40
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Benchmarks measure the app, not the provider rate limits
+os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+os.environ.setdefault("VOCABULARY_STORE_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import app.handlers as handlers
+import app.llm as llm
+from app.models import ResponseType
+from app.utils.compile_graph import compile_workflows
+from app.utils.fake_chat_model import FakeChatModel
+
+USER = {"id": "benchmark", "aboutMe": "", "englishLevel": "B2", "motherTongue": ""}
+
+
+async def save_nothing(result):
+    pass
+
+
+async def run(stream: str) -> tuple:
+    data = {"input": "buoy", "stream": stream}
+    frames = serialize_ms = sent = 0
+    async for frame in handlers.HANDLERS[ResponseType.VOCABULARY.value](USER, data):
+        # Only the example frames, "delta" also streams the other text fields
+        if "examples" not in frame and frame.get("delta", {}).get("field") != "examples":
+            continue
+        start = time.perf_counter()
+        text = json.dumps(frame)  # what websocket.send_json does
+        serialize_ms += (time.perf_counter() - start) * 1000
+        frames += 1
+        sent += len(text.encode())
+    return frames, sent, serialize_ms
+
+
+async def main(runs: int, example_tokens: int):
+    def tool_responder(prompt, tool_name):
+        if tool_name == "ExampleSentenceResponse":
+            words = " ".join(f"word{i}" for i in range(example_tokens))
+            return {"examples": [f"{n}. {words}" for n in range(3)]}
+        return None
+
+    llm.chat_model = FakeChatModel(token_latency=0, tool_responder=tool_responder)
+    handlers.save_result = save_nothing
+    await compile_workflows(
+        {ResponseType.VOCABULARY.value: handlers.vocabulary_graph},
+        checkpointer=MemorySaver(),
+    )
+
+    for stream in ("values", "delta"):
+        results = [await run(stream) for _ in range(runs)]
+        frames, sent, serialize_ms = (
+            statistics.median(result[i] for result in results) for i in range(3)
+        )
+        print(
+            f"{stream:<7} frames={frames:5.0f} bytes={sent:8.0f} serialize={serialize_ms:7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--example-tokens", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.example_tokens))
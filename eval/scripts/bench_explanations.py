@@ -0,0 +1,88 @@
+"""
+Compare the correction explanation modes on latency, LLM calls and prompt tokens.
+
+loop:  one structured LLM call per explanation (generate_explanation)
+batch: one streamed structured call for every explanation (generate_explanations)
+
+Run from the backend directory:
+    python ../eval/scripts/bench_explanations.py --explanations 5 --token-latency 0.01
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Benchmarks measure the app, not the provider rate limits
+os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import app.llm as llm
+import app.workflows.correction as correction
+from app.utils.fake_chat_model import FakeChatModel
+
+
+def make_model(explanations: int, token_latency: float) -> FakeChatModel:
+    items = [
+        {"correction": f"word{i} → better{i}", "explanation": f"explanation {i}"}
+        for i in range(explanations)
+    ]
+
+    def tool_responder(prompt, tool_name):
+        if tool_name == "ExplanationsResponse":
+            return {"corrections": items}
+        # Loop mode: count the explanations already given in the prompt
+        given = sum(f"{item['correction']}:" in prompt for item in items)
+        if given >= explanations - 1:
+            return {"explanation": items[given], "goto": "__end__"}
+        return {"explanation": items[given], "goto": "generate_explanation"}
+
+    return FakeChatModel(token_latency=token_latency, tool_responder=tool_responder)
+
+
+async def run(mode: str, explanations: int, token_latency: float) -> dict:
+    model = make_model(explanations, token_latency)
+    llm.chat_model = model
+    workflow = correction.g.compile(checkpointer=MemorySaver())
+
+    start = time.perf_counter()
+    first_correction = None
+    frames = 0
+    async for stream_mode, data in workflow.astream(
+        {"input": "I go store everyday", "thread_id": mode},
+        stream_mode=["custom"],
+        config={"configurable": {"thread_id": mode, "explanation_mode": mode}},
+    ):
+        if "correction" in data:
+            frames += 1
+            if first_correction is None:
+                first_correction = time.perf_counter() - start
+    total = time.perf_counter() - start
+
+    explanation_calls = [call for call in model.calls if call["tool"]]
+    return {
+        "mode": mode,
+        "corrections": frames,
+        "llm_calls": len(explanation_calls),
+        "prompt_tokens": sum(call["prompt_tokens"] for call in explanation_calls),
+        "first_correction_ms": round((first_correction or 0) * 1000, 1),
+        "total_ms": round(total * 1000, 1),
+    }
+
+
+async def main(explanations: int, token_latency: float):
+    for mode in ("loop", "batch"):
+        print(await run(mode, explanations, token_latency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--explanations", type=int, default=5)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(main(args.explanations, args.token_latency))
@@ -0,0 +1,109 @@
+"""
+Measure tail latency of a short stage against a provider that sometimes stalls.
+
+`--calls` streamed calls to vocabulary.correct_input, `--concurrency` at a time. Each
+model call stalls for `--stall` seconds with probability `--stall-rate`. Run without
+retries or hedging (calls are only cut off by the stage deadline), with first-token
+timeouts and retries, and with hedging as well.
+
+Run from the backend directory:
+    python ../eval/scripts/bench_hedging.py --calls 200 --stall-rate 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Benchmarks measure the app, not the provider rate limits
+os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+os.environ.setdefault("TRACE_EXPORTER", "none")
+
+import app.llm as llm
+from app.llm_governor import LLMGovernor
+from app.llm_resilience import LLMResilience, LLMTimeout
+from app.utils.fake_chat_model import FakeChatModel
+
+STAGE = "vocabulary.correct_input"
+
+
+class StallingFakeChatModel(FakeChatModel):
+    stall: float = 5.0
+    stall_rate: float = 0.05
+    started: int = 0
+
+    async def _astream(self, *args, **kwargs):
+        self.started += 1
+        if random.random() < self.stall_rate:
+            self.stalls.append(self.stall)
+        async for chunk in super()._astream(*args, **kwargs):
+            yield chunk
+
+
+async def call(model, semaphore) -> tuple:
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            async for chunk in model.astream("Correct this sentence please."):
+                pass
+        except LLMTimeout:
+            return "timeout", (time.perf_counter() - start) * 1000
+        return "ok", (time.perf_counter() - start) * 1000
+
+
+async def main(args):
+    llm.llm_governor = LLMGovernor(enabled=False)
+    configs = {
+        "none": LLMResilience(
+            stage_timeouts={STAGE: args.stall * 2},
+            first_token_timeout=args.stall * 2,
+            max_retries=0,
+            hedge_stages=[],
+        ),
+        "retries": LLMResilience(first_token_timeout=args.first_token_timeout, hedge_stages=[]),
+        "hedging": LLMResilience(
+            first_token_timeout=args.first_token_timeout,
+            hedge_stages=[STAGE],
+            hedge_delay=args.hedge_delay,
+        ),
+    }
+    print(f"{'policy':<8} {'calls':>6} {'timeouts':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for name, resilience in configs.items():
+        random.seed(args.seed)
+        llm.chat_model = StallingFakeChatModel(
+            token_latency=args.token_latency, stall=args.stall, stall_rate=args.stall_rate
+        )
+        llm.llm_resilience = resilience
+        model = llm.get_chat_model(STAGE)
+        semaphore = asyncio.Semaphore(args.concurrency)
+        results = await asyncio.gather(*[call(model, semaphore) for _ in range(args.calls)])
+        latencies = sorted(ms for _, ms in results)
+
+        def percentile(p):
+            return latencies[int(p / 100 * (len(latencies) - 1))]
+
+        print(
+            f"{name:<8} {llm.chat_model.started:>6} "
+            f"{sum(outcome == 'timeout' for outcome, _ in results):>9} "
+            f"{percentile(50):7.1f}ms {percentile(95):7.1f}ms {percentile(99):7.1f}ms "
+            f"{latencies[-1]:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--stall", type=float, default=3.0, help="seconds a stalled call hangs")
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--first-token-timeout", type=float, default=1.0)
+    parser.add_argument("--hedge-delay", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
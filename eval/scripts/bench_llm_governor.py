@@ -0,0 +1,117 @@
+"""
+Simulate a burst of users against a provider that rejects calls over its concurrency limit.
+
+Every user sends `--requests` general questions at once. The fake provider fails any call
+made while `--provider-limit` calls are already running, like a rate limit would.
+Reported with and without the LLM governor:
+    rejected   calls the provider refused
+    shed       calls the governor refused (queue full or wait timed out)
+    p50/p95    time until each request finished
+    spread     slowest user's last answer minus fastest user's (fairness)
+
+Run from the backend directory:
+    python ../eval/scripts/bench_llm_governor.py --users 10 --requests 5 --provider-limit 8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# The governors being compared are built explicitly below
+os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+os.environ.setdefault("TRACE_EXPORTER", "none")
+
+import app.handlers as handlers
+import app.llm as llm
+from app.llm_governor import LLMGovernor, LLMOverloaded, current_user_id
+from app.single_flight import SingleFlight
+from app.utils.fake_chat_model import FakeChatModel
+
+
+class ProviderRateLimited(Exception):
+    pass
+
+
+class LimitedFakeChatModel(FakeChatModel):
+    limit: int = 8
+    running: int = 0
+
+    async def _astream(self, *args, **kwargs):
+        if self.running >= self.limit:
+            raise ProviderRateLimited("429 Too Many Requests")
+        self.running += 1
+        try:
+            async for chunk in super()._astream(*args, **kwargs):
+                yield chunk
+        finally:
+            self.running -= 1
+
+
+async def save_nothing(result):
+    pass
+
+
+async def ask(user: dict, question: str) -> tuple:
+    current_user_id.set(user["id"])
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        async for frame in handlers.handle_general(user, {"input": question}):
+            pass
+    except ProviderRateLimited:
+        outcome = "rejected"
+    except LLMOverloaded:
+        outcome = "shed"
+    return user["id"], outcome, (time.perf_counter() - start) * 1000
+
+
+async def main(args):
+    handlers.save_result = save_nothing
+    # Distinct questions, so nothing is coalesced
+    handlers.single_flight = SingleFlight(enabled=False)
+    users = [{"id": f"user-{i}", "englishLevel": "B2"} for i in range(args.users)]
+
+    print(f"{'governor':<9} {'ok':>4} {'rejected':>9} {'shed':>5} {'p50':>9} {'p95':>9} {'spread':>9}")
+    for enabled in (False, True):
+        llm.chat_model = LimitedFakeChatModel(
+            token_latency=args.token_latency, limit=args.provider_limit
+        )
+        llm.llm_governor = LLMGovernor(
+            max_concurrent=args.provider_limit, queue_timeout=60, enabled=enabled
+        )
+        results = await asyncio.gather(
+            *[
+                ask(user, f"Question {i} from {user['id']}?")
+                for user in users
+                for i in range(args.requests)
+            ]
+        )
+        ok = sorted(ms for _, outcome, ms in results if outcome == "ok")
+        finished = {}
+        for user_id, outcome, ms in results:
+            finished[user_id] = max(finished.get(user_id, 0), ms)
+        print(
+            f"{'on' if enabled else 'off':<9} {len(ok):>4} "
+            f"{sum(outcome == 'rejected' for _, outcome, _ in results):>9} "
+            f"{sum(outcome == 'shed' for _, outcome, _ in results):>5} "
+            f"{statistics.median(ok) if ok else 0:7.1f}ms "
+            f"{ok[int(0.95 * (len(ok) - 1))] if ok else 0:7.1f}ms "
+            f"{max(finished.values()) - min(finished.values()):7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=5, help="questions per user")
+    parser.add_argument("--provider-limit", type=int, default=8)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark of the per-request CPU overhead of building prompt chains.
+
+before: every call reads and parses the template and composes prompt | model | parser
+after:  the chain comes from the prompt registry (app/prompt_registry.py)
+
+"build" is the CPU time to get a chain, "call" adds one invocation of it against a
+zero-latency fake model, so the difference is the share of the request it costs.
+
+Run from the backend directory:
+    python ../eval/scripts/bench_prompt_chains.py --calls 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Benchmarks measure the app, not the provider rate limits
+os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+
+from langchain_core.output_parsers import StrOutputParser
+
+import app.llm as llm
+from app import prompt_registry
+from app.llm import get_chat_model
+from app.utils.fake_chat_model import FakeChatModel
+from app.workflows.vocabulary import ExampleSentenceResponse
+
+STAGES = {
+    "vocabulary.correct_input": str,
+    "vocabulary.get_definition": str,
+    "vocabulary.generate_example": ExampleSentenceResponse,
+    "breakdown.generate_breakdown": None,
+}
+INPUTS = {
+    "input": "buoy",
+    "definition": "A floating marker",
+    "aboutMe": "",
+    "englishLevel": "B2",
+}
+
+
+def build_before(stage: str, output):
+    prompt = prompt_registry.parse_prompt(prompt_registry.load_template(stage))
+    if output is str:
+        return prompt | get_chat_model(stage) | StrOutputParser()
+    if output is None:
+        return prompt | get_chat_model(stage)
+    return prompt | get_chat_model(stage).with_structured_output(output)
+
+
+def build_after(stage: str, output):
+    return prompt_registry.get_chain(stage, output)
+
+
+async def measure(build, stage: str, output, calls: int, invoke: bool) -> float:
+    start = time.process_time()
+    for _ in range(calls):
+        chain = build(stage, output)
+        if invoke:
+            await chain.ainvoke(INPUTS)
+    return (time.process_time() - start) * 1000 / calls
+
+
+async def main(calls: int):
+    llm.chat_model = FakeChatModel(token_latency=0, response_tokens=20)
+    for stage, output in STAGES.items():
+        for name, build in (("before", build_before), ("after", build_after)):
+            build_ms = await measure(build, stage, output, calls, invoke=False)
+            call_ms = await measure(build, stage, output, calls // 4 or 1, invoke=True)
+            print(
+                f"{stage:<30} {name:<7} build={build_ms * 1000:8.1f}us call={call_ms:6.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls))
@@ -0,0 +1,82 @@
+"""
+Measure LLM calls and latency when a class looks up the same word at the same time.
+
+`--students` simultaneous vocabulary and general requests with the same input, from
+students with the same mother tongue; `--profiles` distinct aboutMe values among them
+(each needs its own examples). Run with and without single-flight coalescing.
+
+Run from the backend directory:
+    python ../eval/scripts/bench_single_flight.py --students 20 --profiles 4
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Benchmarks measure the app, not the provider rate limits
+os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+os.environ.setdefault("VOCABULARY_STORE_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+os.environ.setdefault("TRACE_EXPORTER", "none")
+
+import app.handlers as handlers
+import app.llm as llm
+from app.single_flight import SingleFlight
+from app.utils.fake_chat_model import FakeChatModel
+
+INPUTS = {
+    "vocabulary": "buoy",
+    "general": "What is the difference between affect and effect?",
+}
+
+
+async def save_nothing(result):
+    pass
+
+
+async def run(type: str, user: dict) -> float:
+    start = time.perf_counter()
+    async for frame in handlers.HANDLERS[type](user, {"input": INPUTS[type]}):
+        pass
+    return (time.perf_counter() - start) * 1000
+
+
+async def main(args):
+    handlers.save_result = save_nothing
+    students = [
+        {
+            "id": f"student-{i}",
+            "aboutMe": f"Hobby number {i % args.profiles}",
+            "englishLevel": "B2",
+            "motherTongue": "Korean",
+        }
+        for i in range(args.students)
+    ]
+    print(f"{'type':<11} {'coalescing':<10} {'llm calls':>9} {'p50':>9} {'max':>9}")
+    for type in INPUTS:
+        for enabled in (False, True):
+            llm.chat_model = FakeChatModel(token_latency=args.token_latency)
+            handlers.single_flight = SingleFlight(enabled=enabled)
+            # Node logs go to stdout
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                latencies = await asyncio.gather(*[run(type, user) for user in students])
+            print(
+                f"{type:<11} {'on' if enabled else 'off':<10} {len(llm.chat_model.calls):>9} "
+                f"{statistics.median(latencies):7.1f}ms {max(latencies):7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--profiles", type=int, default=4)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
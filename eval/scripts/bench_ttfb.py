@@ -0,0 +1,87 @@
+"""
+Benchmark time-to-first-byte of every WebSocket handler, with and without token deltas.
+
+ttfb:   first frame (a token delta, or the first complete value without deltas)
+total:  last frame
+
+Run from the backend directory:
+    python ../eval/scripts/bench_ttfb.py --runs 5 --token-latency 0.01
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Benchmarks measure the app, not the provider rate limits
+os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+os.environ.setdefault("VOCABULARY_STORE_ENABLED", "false")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import app.handlers as handlers
+import app.llm as llm
+from app.models import ResponseType
+from app.utils.compile_graph import compile_workflows
+from app.utils.fake_chat_model import FakeChatModel
+
+USER = {"id": "benchmark", "aboutMe": "", "englishLevel": "B2", "motherTongue": "Korean"}
+INPUTS = {
+    ResponseType.CORRECTION.value: "I go store everyday",
+    ResponseType.VOCABULARY.value: "buoy",
+    ResponseType.BREAKDOWN.value: "Did I say anything completely out in left field?",
+    ResponseType.GENERAL.value: "What is the difference between affect and effect?",
+}
+
+
+async def save_nothing(result):
+    pass
+
+
+async def run(type: str, stream: str) -> tuple:
+    data = {"input": INPUTS[type]}
+    if stream:
+        data["stream"] = stream
+    start = time.perf_counter()
+    ttfb = None
+    async for frame in handlers.HANDLERS[type](USER, data):
+        if ttfb is None:
+            ttfb = (time.perf_counter() - start) * 1000
+    return ttfb, (time.perf_counter() - start) * 1000
+
+
+async def main(runs: int, token_latency: float):
+    llm.chat_model = FakeChatModel(token_latency=token_latency, response_tokens=40)
+    handlers.save_result = save_nothing
+    await compile_workflows(
+        {
+            ResponseType.CORRECTION.value: handlers.correction_graph,
+            ResponseType.VOCABULARY.value: handlers.vocabulary_graph,
+            ResponseType.BREAKDOWN.value: handlers.breakdown_graph,
+        },
+        checkpointer=MemorySaver(),
+    )
+
+    for type in INPUTS:
+        for stream in ("", "delta"):
+            results = [await run(type, stream) for _ in range(runs)]
+            ttfb = statistics.median(ttfb for ttfb, _ in results)
+            total = statistics.median(total for _, total in results)
+            print(
+                f"{type:<11} {stream or 'values':<7} ttfb={ttfb:8.1f}ms total={total:8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.token_latency))
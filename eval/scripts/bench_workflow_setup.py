@@ -0,0 +1,82 @@
+"""
+Benchmark the per-request cost of getting a runnable workflow.
+
+before: compile the graph and render its Mermaid PNG on every request (old request path)
+after:  look the workflow up in the registry compiled at startup
+
+Run from the backend directory:
+    python ../eval/scripts/bench_workflow_setup.py --requests 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+# Benchmarks measure the app, not the provider rate limits
+os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.utils.compile_graph import compile_workflows, get_workflow
+from app.utils.export_diagrams import find_graphs
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def summarize(name, timings):
+    print(
+        f"{name:<8} p50={percentile(timings, 50):9.2f}ms "
+        f"p99={percentile(timings, 99):9.2f}ms "
+        f"mean={statistics.mean(timings):9.2f}ms"
+    )
+
+
+async def main(requests: int, render: bool):
+    graphs = find_graphs()
+    checkpointer = MemorySaver()
+
+    before = []
+    for i in range(requests):
+        graph_name, graph = list(graphs.items())[i % len(graphs)]
+        start = time.perf_counter()
+        workflow = graph.compile(checkpointer=checkpointer)
+        if render:
+            try:
+                workflow.get_graph(xray=1).draw_mermaid_png()
+            except Exception as e:
+                print(f"render failed ({e}); rerun with --no-render")
+                return
+        before.append((time.perf_counter() - start) * 1000)
+
+    await compile_workflows(graphs, checkpointer)
+    after = []
+    for i in range(requests):
+        graph_name, graph = list(graphs.items())[i % len(graphs)]
+        start = time.perf_counter()
+        await get_workflow(graph, graph_name)
+        after.append((time.perf_counter() - start) * 1000)
+
+    summarize("before", before)
+    summarize("after", after)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument(
+        "--no-render",
+        dest="render",
+        action="store_false",
+        help="Only measure compilation (the PNG render needs network access)",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.render))
@@ -0,0 +1,60 @@
+"""
+Measure hit rate and false-hit rate of the general-question semantic cache.
+
+Every question in "cached" is stored first. Each query is labelled with the index of
+the cached question it is a paraphrase of, or null when no stored answer applies.
+A hit on the wrong question (or on a null query) is a false hit.
+
+Run from the backend directory:
+    python ../eval/scripts/eval_semantic_cache.py --thresholds 0.8 0.85 0.9 0.95
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+
+from app.semantic_cache import SemanticCache, make_embedder
+
+DATASET = os.path.join(os.path.dirname(__file__), "..", "dataset", "general_questions.json")
+
+
+def evaluate(dataset: dict, embedder, threshold: float) -> dict:
+    cache = SemanticCache(embedder, threshold=threshold)
+    for i, question in enumerate(dataset["cached"]):
+        cache.add(question, answer=str(i))
+
+    hits = false_hits = missed = 0
+    for query in dataset["queries"]:
+        entry = cache.lookup(query["question"])
+        if entry is None:
+            missed += query["matches"] is not None
+            continue
+        hits += 1
+        if entry["answer"] != str(query["matches"]):
+            false_hits += 1
+
+    answerable = sum(query["matches"] is not None for query in dataset["queries"])
+    return {
+        "threshold": threshold,
+        "hitRate": round(hits / len(dataset["queries"]), 3),
+        "recall": round((answerable - missed) / answerable, 3),
+        "falseHitRate": round(false_hits / hits, 3) if hits else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default=DATASET)
+    parser.add_argument("--embedder", default="auto", choices=["auto", "hashing", "fastembed"])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.85, 0.9, 0.95])
+    args = parser.parse_args()
+
+    with open(args.dataset) as f:
+        dataset = json.load(f)
+    embedder = make_embedder(args.embedder)
+    print(f"embedder: {embedder.name}")
+    for threshold in args.thresholds:
+        print(evaluate(dataset, embedder, threshold))
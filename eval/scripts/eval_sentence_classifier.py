@@ -0,0 +1,61 @@
+"""
+Measure the local sentence classifier on a labelled set.
+
+accuracy:    of the inputs decided locally, how many match the label
+llmAvoided:  share of inputs that didn't need the LLM fallback
+effective:   accuracy that matters to the workflow, where only **bold** inputs
+             have an effect (a wrong answer without bold markers changes nothing)
+
+Run from the backend directory:
+    python ../eval/scripts/eval_sentence_classifier.py
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+
+from app.sentence_classifier import SentenceClassifier
+
+DATASET = os.path.join(os.path.dirname(__file__), "..", "dataset", "sentences.json")
+
+
+def evaluate(dataset: list, classifier: SentenceClassifier) -> dict:
+    decided = correct = effective = 0
+    mistakes = []
+    for item in dataset:
+        prediction = classifier.classify(item["input"])
+        if prediction is None:
+            effective += 1  # the LLM decides
+            continue
+        decided += 1
+        if prediction == item["is_sentence"]:
+            correct += 1
+            effective += 1
+        elif "**" not in item["input"]:
+            effective += 1
+        else:
+            mistakes.append(item["input"])
+
+    return {
+        "inputs": len(dataset),
+        "accuracy": round(correct / decided, 3) if decided else 0.0,
+        "llmAvoided": round(decided / len(dataset), 3),
+        "effective": round(effective / len(dataset), 3),
+        "mistakes": mistakes,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default=DATASET)
+    parser.add_argument("--min-context-words", type=int, nargs="+", default=[2, 3, 4])
+    args = parser.parse_args()
+
+    with open(args.dataset) as f:
+        dataset = json.load(f)
+    for min_context_words in args.min_context_words:
+        result = evaluate(dataset, SentenceClassifier(min_context_words))
+        print({"minContextWords": min_context_words, **result})
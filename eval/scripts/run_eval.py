@@ -0,0 +1,348 @@
+"""
+Throughput and latency benchmark of the backend endpoints.
+
+Drives /ws/correction, /ws/vocabulary, /ws/breakdown, /ws/general and /further-questions
+at a fixed concurrency and reports, per endpoint:
+    ttffMs      time to first frame (first streamed chunk for /further-questions)
+    totalMs     time until the socket closes / the response ends
+    throughput  completed requests per second
+    bytesIn     bytes received on the wire
+The report is saved as JSON, with the server's cache and coalescing stats; pass an older
+report with --compare to see regressions.
+
+In-process runs start with the semantic cache, LLM cache, vocabulary store and single-flight
+coalescing off, so every request goes through the workflows. Pass --warm-caches to keep
+them on and measure the cached path instead.
+
+Against a running server started with the fake model:
+    cd backend
+    LLM_PROVIDER=fake FAKE_LLM_TOKEN_LATENCY=0.02 uvicorn main:app --port 8000
+    python ../eval/scripts/run_eval.py --url http://localhost:8000 --user-id <googleId>
+
+Self-contained (fake model, in-memory Mongo, server in this process):
+    python ../eval/scripts/run_eval.py --concurrency 8 --requests 40 --token-latency 0.02
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import httpx
+from websockets.asyncio.client import connect
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "backend")
+DATASET = os.path.join(os.path.dirname(__file__), "..", "dataset", "benchmark_inputs.json")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "..", "results")
+
+WS_ENDPOINTS = ["correction", "vocabulary", "breakdown", "general"]
+ENDPOINTS = WS_ENDPOINTS + ["further-questions"]
+
+
+# ===========================================
+#                  CLIENTS
+# ===========================================
+async def run_websocket(base_url: str, type: str, frame: dict, user_id: str) -> dict:
+    url = base_url.replace("http", "ws", 1) + f"/ws/{type}?user_id={user_id}"
+    sample = {"ttffMs": None, "bytesIn": 0, "frames": 0, "error": None, "resultId": None}
+    start = time.perf_counter()
+    try:
+        async with connect(url, max_size=None) as websocket:
+            await websocket.send(json.dumps(frame))
+            async for message in websocket:
+                if sample["ttffMs"] is None:
+                    sample["ttffMs"] = (time.perf_counter() - start) * 1000
+                sample["bytesIn"] += len(message.encode() if isinstance(message, str) else message)
+                sample["frames"] += 1
+                data = json.loads(message)
+                if "error" in data:
+                    sample["error"] = data["error"]
+                sample["resultId"] = sample["resultId"] or data.get("id")
+    except Exception as e:
+        sample["error"] = str(e)
+    sample["totalMs"] = (time.perf_counter() - start) * 1000
+    return sample
+
+
+async def run_further_question(
+    client: httpx.AsyncClient, base_url: str, payload: dict, user_id: str
+) -> dict:
+    sample = {"ttffMs": None, "bytesIn": 0, "frames": 0, "error": None}
+    start = time.perf_counter()
+    try:
+        async with client.stream(
+            "POST", f"{base_url}/further-questions?user_id={user_id}", json=payload
+        ) as response:
+            async for chunk in response.aiter_bytes():
+                if sample["ttffMs"] is None:
+                    sample["ttffMs"] = (time.perf_counter() - start) * 1000
+                sample["bytesIn"] += len(chunk)
+                sample["frames"] += 1
+            if response.status_code != 200:
+                sample["error"] = f"HTTP {response.status_code}"
+    except Exception as e:
+        sample["error"] = str(e)
+    sample["totalMs"] = (time.perf_counter() - start) * 1000
+    return sample
+
+
+# ===========================================
+#                   LOAD
+# ===========================================
+def percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def at(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "p50": round(at(50), 2),
+        "p90": round(at(90), 2),
+        "p95": round(at(95), 2),
+        "p99": round(at(99), 2),
+        "mean": round(statistics.fmean(ordered), 2),
+    }
+
+
+def summarize(samples: list, wall_seconds: float) -> dict:
+    ok = [sample for sample in samples if not sample["error"]]
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "firstError": next((s["error"] for s in samples if s["error"]), None),
+        "throughputRps": round(len(ok) / wall_seconds, 2) if wall_seconds else 0.0,
+        "ttffMs": percentiles([s["ttffMs"] for s in ok if s["ttffMs"] is not None]),
+        "totalMs": percentiles([s["totalMs"] for s in ok]),
+        "bytesIn": sum(s["bytesIn"] for s in samples),
+        "bytesPerRequest": round(statistics.fmean(s["bytesIn"] for s in ok)) if ok else 0,
+        "framesPerRequest": round(statistics.fmean(s["frames"] for s in ok), 1) if ok else 0,
+    }
+
+
+async def run_load(jobs: list, concurrency: int) -> tuple[list, float]:
+    """Run the job coroutine factories with at most `concurrency` in flight."""
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    samples = []
+
+    async def worker():
+        while not queue.empty():
+            job = queue.get_nowait()
+            samples.append(await job())
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return samples, time.perf_counter() - start
+
+
+async def benchmark(args, base_url: str, user_id: str) -> dict:
+    with open(args.dataset) as f:
+        inputs = json.load(f)
+    extra = {"stream": args.stream} if args.stream else {}
+    report = {}
+
+    for type in args.endpoints:
+        if type in WS_ENDPOINTS:
+            jobs = [
+                (lambda input=inputs[type][i % len(inputs[type])]: run_websocket(
+                    base_url, type, {"input": input, **extra}, user_id
+                ))
+                for i in range(args.requests)
+            ]
+            samples, wall = await run_load(jobs, args.concurrency)
+        else:
+            # Follow-up questions need a saved result to append to
+            seed = await run_websocket(
+                base_url, "correction", {"input": inputs["correction"][0]}, user_id
+            )
+            if seed["error"] or not seed["resultId"]:
+                report[type] = {"error": f"Could not create a result: {seed['error']}"}
+                continue
+            await asyncio.sleep(args.settle)  # let the background writer persist it
+            async with httpx.AsyncClient(timeout=None) as client:
+                questions = inputs[type]
+                jobs = [
+                    (lambda question=questions[i % len(questions)]: run_further_question(
+                        client,
+                        base_url,
+                        {
+                            "resultId": seed["resultId"],
+                            "type": "correction",
+                            "input": inputs["correction"][0],
+                            "context": "",
+                            "question": question,
+                        },
+                        user_id,
+                    ))
+                    for i in range(args.requests)
+                ]
+                samples, wall = await run_load(jobs, args.concurrency)
+        report[type] = summarize(samples, wall)
+        print(f"{type:<18} {json.dumps(report[type])}", file=sys.stderr)
+    return report
+
+
+# ===========================================
+#              IN-PROCESS SERVER
+# ===========================================
+@contextlib.asynccontextmanager
+async def local_server(token_latency: float, warm_caches: bool = False):
+    """
+    Serve the real app with uvicorn in this process, with the fake chat model and
+    mongomock instead of Mongo.
+    """
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_TOKEN_LATENCY"] = str(token_latency)
+    os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    # Benchmarks measure the app, not the provider rate limits
+    os.environ.setdefault("LLM_GOVERNOR_ENABLED", "false")
+    os.environ.setdefault("TRACE_EXPORTER", "none")
+    os.environ.setdefault("LLM_CACHE_BACKEND", "memory")
+    if not warm_caches:
+        # The dataset repeats a few inputs, which would otherwise mostly be cache hits
+        os.environ.setdefault("SEMANTIC_CACHE_ENABLED", "false")
+        os.environ.setdefault("SINGLE_FLIGHT_ENABLED", "false")
+        os.environ.setdefault("LLM_CACHE_STAGES", "")
+        os.environ.setdefault("VOCABULARY_STORE_ENABLED", "false")
+    sys.path.insert(0, BACKEND_DIR)
+
+    import uvicorn
+    from mongomock_motor import AsyncMongoMockClient
+
+    import main
+    import app.db.results
+    import app.db.users
+    import app.db.vocabulary_store
+
+    db = AsyncMongoMockClient().get_database("benchmark")
+    for module in (main, app.db.results, app.db.users, app.db.vocabulary_store):
+        module.main_db = db
+    user_id = "benchmark-user"
+    await db.users.insert_one(
+        {"googleId": user_id, "aboutMe": "I'm a jazz pianist.", "englishLevel": "B2"}
+    )
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(
+            main.app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"
+        )
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}", user_id
+    finally:
+        server.should_exit = True
+        await task
+
+
+# ===========================================
+#                  REPORT
+# ===========================================
+async def cache_stats(base_url: str) -> dict:
+    """Hit rates of the caches and coalescing, which decide what the latencies measure."""
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            stats = (await client.get(f"{base_url}/stats")).json()
+    except Exception as e:
+        return {"error": str(e)}
+    return {
+        key: stats.get(key)
+        for key in ("llmCache", "semanticCache", "singleFlight", "vocabularyStore")
+    }
+
+
+def compare(report: dict, baseline: dict):
+    print(f"\n{'endpoint':<18} {'metric':<14} {'baseline':>10} {'current':>10} {'change':>8}")
+    for type, current in report["endpoints"].items():
+        before = baseline["endpoints"].get(type)
+        if not before or "error" in current or "error" in before:
+            continue
+        for metric, key in (
+            ("ttff p50", ("ttffMs", "p50")),
+            ("total p50", ("totalMs", "p50")),
+            ("total p95", ("totalMs", "p95")),
+            ("throughput", ("throughputRps", None)),
+            ("bytes/request", ("bytesPerRequest", None)),
+        ):
+            old = before[key[0]][key[1]] if key[1] else before[key[0]]
+            new = current[key[0]][key[1]] if key[1] else current[key[0]]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "-"
+            print(f"{type:<18} {metric:<14} {old:>10} {new:>10} {change:>8}")
+
+
+async def main(args):
+    config = {
+        "url": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "tokenLatency": args.token_latency if not args.url else None,
+        "stream": args.stream,
+        "warmCaches": args.warm_caches if not args.url else None,
+    }
+    if args.url:
+        endpoints = await benchmark(args, args.url.rstrip("/"), args.user_id)
+        caches = await cache_stats(args.url.rstrip("/"))
+    else:
+        async with local_server(args.token_latency, args.warm_caches) as (base_url, user_id):
+            # Node logs go to stdout, the report to stderr and the JSON file
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                endpoints = await benchmark(args, base_url, user_id)
+            caches = await cache_stats(base_url)
+    print(f"caches             {json.dumps(caches)}", file=sys.stderr)
+
+    report = {
+        "createdAt": datetime.now().isoformat(timespec="seconds"),
+        "config": config,
+        "endpoints": endpoints,
+        "caches": caches,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"run-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="base URL of a running server, in-process if omitted")
+    parser.add_argument("--user-id", help="googleId of an existing user (with --url)")
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=20, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--stream", choices=["delta"], help="request token deltas")
+    parser.add_argument("--settle", type=float, default=1.0)
+    parser.add_argument(
+        "--warm-caches",
+        action="store_true",
+        help="in-process: keep the caches and coalescing on (off by default)",
+    )
+    parser.add_argument("--dataset", default=DATASET)
+    parser.add_argument("--output")
+    parser.add_argument("--compare", help="an earlier report to compare against")
+    args = parser.parse_args()
+    if args.url and not args.user_id:
+        parser.error("--user-id is required with --url")
+    asyncio.run(main(args))
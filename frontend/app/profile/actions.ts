@@ -27,5 +27,25 @@ export async function updateProfile(formData: FormData) {
     }
   );
 
+  // Drop the backend's cached copy of the profile
+  try {
+    await fetch(
+      new URL(
+        `users/${session.user.id}/invalidate`,
+        process.env.NEXT_PUBLIC_BACKEND_URL
+      ).toString(),
+      {
+        method: "POST",
+        headers: {
+          // INTERNAL_API_SECRET (server-only) must match the backend's; without it
+          // the backend rejects the call and the cached profile expires by TTL
+          "x-internal-secret": process.env.INTERNAL_API_SECRET ?? "",
+        },
+      }
+    );
+  } catch (error) {
+    console.error("Failed to invalidate the cached profile:", error);
+  }
+
   revalidatePath('/profile');
 }